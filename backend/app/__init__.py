@@ -56,6 +56,10 @@ def create_app(config_class=Config):
         logger.debug(f"响应: {response.status_code}")
         return response
     
+    # 响应压缩（gzip / brotli）
+    from .utils.compression import init_compression
+    init_compression(app)
+    
     # 注册蓝图
     from .api import fortune_bp, recruit_bp
     app.register_blueprint(fortune_bp, url_prefix='/api/fortune')
@@ -3,10 +3,11 @@
 提供推演启动、状态查询、报告获取等接口
 """
 
-from flask import request, jsonify
+from flask import Response, request, jsonify
 from . import fortune_bp
 from ..services.fortune_service import FortuneService
 from ..utils.logger import get_logger
+from ..utils.sse import sse_response
 
 logger = get_logger('wannian.api.fortune')
 
@@ -64,19 +65,57 @@ def analyze_fate():
         logger.error(f"分析请求失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def _conditional_json(session_id, kind, build):
+    """按会话版本号生成弱 ETag；If-None-Match 命中时直接返回 304，不再读取和序列化响应体"""
+    service = get_fortune_service()
+    version = service.get_session_version(session_id)
+    if version is not None:
+        etag = f"{session_id}-{kind}-{version}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+    result = build(service)
+    response = jsonify(result)
+    if result.get("success"):
+        # 以响应体实际对应的版本为准（读取期间会话可能又有更新）
+        response.set_etag(f"{session_id}-{kind}-{result.get('version', version)}", weak=True)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @fortune_bp.route('/status/<session_id>', methods=['GET'])
 def get_status(session_id):
-    """查询分析进度"""
+    """查询分析进度（精简版，不含汇总图谱）"""
+    return _conditional_json(session_id, "status", lambda service: service.get_session_status(session_id))
+
+@fortune_bp.route('/summary/<session_id>', methods=['GET'])
+def get_summary(session_id):
+    """获取汇总结果（图谱与总结）"""
+    return _conditional_json(session_id, "summary", lambda service: service.get_session_summary(session_id))
+
+@fortune_bp.route('/stream/<session_id>', methods=['GET'])
+def stream_session(session_id):
+    """以 SSE 推送推演进度、大师报告与最终汇总（替代轮询 /status）"""
     service = get_fortune_service()
-    result = service.get_session_status(session_id)
-    return jsonify(result)
+    return sse_response(service.iter_session_events(session_id))
 
 @fortune_bp.route('/report/<session_id>', methods=['GET'])
 def get_report(session_id):
     """获取完整报告内容"""
+    return _conditional_json(session_id, "report", lambda service: service.get_full_report(session_id))
+
+@fortune_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """大师报告缓存统计（运维用）"""
+    service = get_fortune_service()
+    return jsonify(service.get_cache_stats())
+
+@fortune_bp.route('/scheduler/stats', methods=['GET'])
+def get_scheduler_stats():
+    """LLM 调度器队列深度统计（运维用）"""
     service = get_fortune_service()
-    result = service.get_full_report(session_id)
-    return jsonify(result)
+    return jsonify(service.get_scheduler_stats())
 
 @fortune_bp.route('/masters', methods=['GET'])
 def list_masters():
@@ -4,17 +4,17 @@ from flask import request, jsonify
 
 from . import recruit_bp
 from ..config import Config
-from ..services.recruit_store import RecruitStore
+from ..services.recruit_store import encode_cursor, get_recruit_store
 from ..services.company_catalog import list_companies
 from ..services.recruit_chat_service import RecruitChatService
 from ..services.oc_resume_service import OcResumeService
 from ..utils.logger import get_logger
+from ..utils.sse import sse_response
 
 
 logger = get_logger('wannian.api.recruit')
 
 _oc_resume_service = None
-_store = None
 _chat_service = None
 
 
@@ -26,10 +26,7 @@ def get_oc_resume_service():
 
 
 def get_store():
-    global _store
-    if _store is None:
-        _store = RecruitStore()
-    return _store
+    return get_recruit_store()
 
 
 def get_chat_service():
@@ -135,8 +132,16 @@ def apply_company():
 def list_applications():
     try:
         resume_id = request.args.get("resume_id")
-        apps = get_store().list_applications(resume_id=resume_id)
-        return jsonify({"success": True, "data": apps})
+        limit = request.args.get("limit", type=int)
+        before = request.args.get("before") or None
+        if limit is not None and not 1 <= limit <= 100:
+            return jsonify({"success": False, "error": "limit 取值范围为 1-100"}), 400
+
+        apps = get_store().list_applications(resume_id=resume_id, limit=limit, before=before)
+        next_cursor = encode_cursor(apps[-1]) if limit is not None and len(apps) == limit else None
+        return jsonify({"success": True, "data": apps, "next_cursor": next_cursor})
+    except ValueError as ve:
+        return jsonify({"success": False, "error": str(ve)}), 400
     except Exception as e:
         logger.error(f"获取投递记录失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -185,3 +190,32 @@ def chat_send():
     except Exception as e:
         logger.error(f"发送聊天失败: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+@recruit_bp.route('/chat/send/stream', methods=['POST'])
+def chat_send_stream():
+    """流式回复（SSE）：逐段推送回复文本，完整回复生成后一次性写入聊天记录"""
+    try:
+        config_errors = Config.validate()
+        if config_errors:
+            return jsonify({
+                "success": False,
+                "error": "配置缺失",
+                "details": config_errors,
+                "hint": "请在项目根目录创建 .env 文件并配置 LLM_API_KEY。具体参考 .env.example 文件。"
+            }), 400
+
+        data = request.get_json(silent=True) or {}
+        application_id = data.get("application_id")
+        message = (data.get("message") or "").strip()
+        if not application_id or not message:
+            return jsonify({"success": False, "error": "缺少 application_id 或 message"}), 400
+
+        service = get_chat_service()
+        events = service.send_stream(application_id=application_id, user_message=message)
+        return sse_response(events)
+    except ValueError as ve:
+        return jsonify({"success": False, "error": str(ve)}), 400
+    except Exception as e:
+        logger.error(f"流式发送聊天失败: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -35,7 +35,104 @@ class Config:
     LLM_BOOST_API_KEY = os.environ.get('LLM_BOOST_API_KEY')
     LLM_BOOST_BASE_URL = os.environ.get('LLM_BOOST_BASE_URL')
     LLM_BOOST_MODEL_NAME = os.environ.get('LLM_BOOST_MODEL_NAME', 'gpt-4o-mini')
-    
+
+    # LLM 调度：进程内同时进行的 LLM 调用上限，以及同时执行的推演会话上限（超出的排队）
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+    FORTUNE_MAX_ACTIVE_SESSIONS = int(os.environ.get('FORTUNE_MAX_ACTIVE_SESSIONS', 32))
+    # 推演编排方式：threads（默认，经由 LLM 调度器的线程池）或 async（AsyncOpenAI，所有调用共用一个事件循环）；
+    # 两种方式共用上面的 LLM 并发上限与会话上限
+    FORTUNE_ORCHESTRATION = os.environ.get('FORTUNE_ORCHESTRATION', 'threads').lower()
+    # 异步客户端的 HTTP 连接池大小
+    LLM_ASYNC_MAX_CONNECTIONS = int(os.environ.get('LLM_ASYNC_MAX_CONNECTIONS', 100))
+    # 客户端限流：每个端点的每分钟请求数 / token 数（0 表示不限），以及 AIMD 自适应并发的下限（上限为 LLM_MAX_CONCURRENCY）
+    LLM_RPM = int(os.environ.get('LLM_RPM', 0))
+    LLM_TPM = int(os.environ.get('LLM_TPM', 0))
+    LLM_BOOST_RPM = int(os.environ.get('LLM_BOOST_RPM', 0))
+    LLM_BOOST_TPM = int(os.environ.get('LLM_BOOST_TPM', 0))
+    LLM_MIN_CONCURRENCY = int(os.environ.get('LLM_MIN_CONCURRENCY', 2))
+    # 大师报告使用流式输出，生成中的内容每隔 FORTUNE_STREAM_FLUSH_INTERVAL 秒写入会话，前端可提前看到
+    LLM_STREAM = os.environ.get('LLM_STREAM', 'True').lower() == 'true'
+    # 合并进行中的相同请求：大师推演按报告缓存 key（与报告缓存一样复用同一份采样）、LLMClient.chat 只合并 temperature 为 0
+    # 或显式 coalesce=True 的完全相同请求，相同调用只发送一次，其余等待共享结果
+    LLM_SINGLE_FLIGHT = os.environ.get('LLM_SINGLE_FLIGHT', 'True').lower() == 'true'
+    FORTUNE_STREAM_FLUSH_INTERVAL = float(os.environ.get('FORTUNE_STREAM_FLUSH_INTERVAL', 0.5))
+    # 提前聚合：已完成的大师数达到 QUORUM（0 表示等待全部 49 位），或推演开始 DEADLINE 秒后已有过半大师完成（0 表示不按时间触发），
+    # 就开始分年图谱生成，其余报告在校验与补充阶段并入
+    FORTUNE_AGGREGATION_QUORUM = int(os.environ.get('FORTUNE_AGGREGATION_QUORUM', 40))
+    FORTUNE_AGGREGATION_DEADLINE = float(os.environ.get('FORTUNE_AGGREGATION_DEADLINE', 0))
+    # 确定性聚合：随机抽取与 impact 评分使用由输入派生的种子，报告按大师 id 顺序处理（此时不提前聚合），
+    # 相同输入与报告得到相同图谱；聚合结果按 输入 + 报告内容 的哈希缓存（内存字节上限、过期时间秒数，0 表示不过期）
+    FORTUNE_DETERMINISTIC_AGGREGATION = os.environ.get('FORTUNE_DETERMINISTIC_AGGREGATION', 'False').lower() == 'true'
+    FORTUNE_AGGREGATION_CACHE_MAX_BYTES = int(os.environ.get('FORTUNE_AGGREGATION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    FORTUNE_AGGREGATION_CACHE_TTL = float(os.environ.get('FORTUNE_AGGREGATION_CACHE_TTL', 24 * 3600))
+    # 慢请求对冲：大师运行超过近期耗时的 P90（不低于 MIN_DELAY，不超过软截止 SOFT_DEADLINE）仍未返回时，
+    # 向加速端点补发一份相同请求，先返回者胜出；超过硬截止 HARD_DEADLINE 秒记为失败不再等待（0 表示不限）
+    FORTUNE_HEDGE = os.environ.get('FORTUNE_HEDGE', 'False').lower() == 'true'
+    FORTUNE_HEDGE_PERCENTILE = float(os.environ.get('FORTUNE_HEDGE_PERCENTILE', 0.9))
+    FORTUNE_HEDGE_MIN_DELAY = float(os.environ.get('FORTUNE_HEDGE_MIN_DELAY', 10))
+    FORTUNE_AGENT_SOFT_DEADLINE = float(os.environ.get('FORTUNE_AGENT_SOFT_DEADLINE', 60))
+    FORTUNE_AGENT_HARD_DEADLINE = float(os.environ.get('FORTUNE_AGENT_HARD_DEADLINE', 300))
+    # 回退节点的相似观点合并：字符 n-gram Jaccard 系数达到 SIMILARITY 即视为同一观点；
+    # MinHash 签名长度 PERMUTATIONS 分为 BANDS 段做 LSH 分桶（需整除）
+    FORTUNE_GROUP_SIMILARITY = float(os.environ.get('FORTUNE_GROUP_SIMILARITY', 0.3))
+    FORTUNE_GROUP_SHINGLE_SIZE = int(os.environ.get('FORTUNE_GROUP_SHINGLE_SIZE', 2))
+    FORTUNE_MINHASH_PERMUTATIONS = int(os.environ.get('FORTUNE_MINHASH_PERMUTATIONS', 32))
+    FORTUNE_LSH_BANDS = int(os.environ.get('FORTUNE_LSH_BANDS', 16))
+    # SSE 推送（/api/fortune/stream/<id>）检查会话变化的间隔（秒）
+    FORTUNE_SSE_POLL_INTERVAL = float(os.environ.get('FORTUNE_SSE_POLL_INTERVAL', 0.5))
+
+    # 响应压缩：超过 RESPONSE_COMPRESSION_MIN_SIZE 字节的 JSON/文本响应按客户端支持使用 brotli 或 gzip
+    RESPONSE_COMPRESSION = os.environ.get('RESPONSE_COMPRESSION', 'True').lower() == 'true'
+    RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get('RESPONSE_COMPRESSION_MIN_SIZE', 1024))
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_LEVEL', 6))
+
+    # 求职数据存储配置：sqlite（默认，WAL 模式）或 json（旧版单文件）
+    RECRUIT_STORE_BACKEND = os.environ.get('RECRUIT_STORE_BACKEND', 'sqlite').lower()
+    RECRUIT_DATA_DIR = os.environ.get(
+        'RECRUIT_DATA_DIR',
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+    )
+    # json 后端的聊天消息日志：单段上限、fsync 批量条数/间隔、触发合并的封存段数
+    RECRUIT_JOURNAL_SEGMENT_BYTES = int(os.environ.get('RECRUIT_JOURNAL_SEGMENT_BYTES', 4 * 1024 * 1024))
+    RECRUIT_JOURNAL_FSYNC_BATCH = int(os.environ.get('RECRUIT_JOURNAL_FSYNC_BATCH', 32))
+    RECRUIT_JOURNAL_FSYNC_INTERVAL = float(os.environ.get('RECRUIT_JOURNAL_FSYNC_INTERVAL', 1.0))
+    RECRUIT_JOURNAL_COMPACT_SEGMENTS = int(os.environ.get('RECRUIT_JOURNAL_COMPACT_SEGMENTS', 8))
+    # 缓存解码后聊天记录的会话数（两种后端都适用，0 表示不缓存）
+    RECRUIT_HISTORY_CACHE_SIZE = int(os.environ.get('RECRUIT_HISTORY_CACHE_SIZE', 256))
+    # 落盘策略：strict（写穿透并 fsync）或 relaxed（json 后端写回合并 / SQLite synchronous=NORMAL）
+    RECRUIT_DURABILITY = os.environ.get('RECRUIT_DURABILITY', 'relaxed').lower()
+    # json 后端写回合并周期（秒）与内存文档的 mtime 校验间隔（秒）
+    RECRUIT_FLUSH_INTERVAL = float(os.environ.get('RECRUIT_FLUSH_INTERVAL', 1.0))
+    RECRUIT_CACHE_STAT_INTERVAL = float(os.environ.get('RECRUIT_CACHE_STAT_INTERVAL', 1.0))
+
+    # 大师报告缓存：内存层字节上限、过期时间（秒，0 表示不过期）、磁盘层 SQLite 路径（留空则只用内存）
+    FORTUNE_CACHE_MAX_BYTES = int(os.environ.get('FORTUNE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    FORTUNE_CACHE_TTL = float(os.environ.get('FORTUNE_CACHE_TTL', 7 * 24 * 3600))
+    FORTUNE_CACHE_PATH = os.environ.get(
+        'FORTUNE_CACHE_PATH',
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'agent_cache.db'))
+    )
+    # 整场推演结果缓存：相同输入（含推演年数）直接返回已完成的会话，进行中的相同请求合并到同一个会话；
+    # 内存字节上限与过期时间（秒，0 表示不过期）
+    FORTUNE_RESULT_CACHE = os.environ.get('FORTUNE_RESULT_CACHE', 'True').lower() == 'true'
+    FORTUNE_RESULT_CACHE_MAX_BYTES = int(os.environ.get('FORTUNE_RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    FORTUNE_RESULT_CACHE_TTL = float(os.environ.get('FORTUNE_RESULT_CACHE_TTL', 24 * 3600))
+
+    # 推演会话后端：sqlite（默认，多个 worker 进程共享，重启后接管未完成的推演）或 memory（单进程）
+    FORTUNE_SESSION_BACKEND = os.environ.get('FORTUNE_SESSION_BACKEND', 'sqlite').lower()
+    # sqlite 后端：执行进程的心跳超过该秒数未刷新，未完成的会话由其他进程接管
+    FORTUNE_SESSION_STALE_SECONDS = float(os.environ.get('FORTUNE_SESSION_STALE_SECONDS', 120))
+    # memory 后端：结束后在内存中保留的秒数、内存中的会话数与字节上限；
+    # 会话数据目录（memory 后端的转存文件 / sqlite 后端的数据库，memory 后端留空则直接丢弃）及保留秒数
+    FORTUNE_SESSION_TTL = float(os.environ.get('FORTUNE_SESSION_TTL', 3600))
+    FORTUNE_SESSION_MAX = int(os.environ.get('FORTUNE_SESSION_MAX', 200))
+    FORTUNE_SESSION_MAX_BYTES = int(os.environ.get('FORTUNE_SESSION_MAX_BYTES', 256 * 1024 * 1024))
+    FORTUNE_SESSION_DIR = os.environ.get(
+        'FORTUNE_SESSION_DIR',
+        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'sessions'))
+    )
+    FORTUNE_SESSION_DISK_TTL = float(os.environ.get('FORTUNE_SESSION_DISK_TTL', 30 * 24 * 3600))
+
     @classmethod
     def validate(cls):
         """验证必要配置"""
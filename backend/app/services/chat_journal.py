@@ -0,0 +1,354 @@
+"""
+聊天消息日志
+分段、只追加的消息日志（每行一条 JSON），内存中按 application_id 维护偏移索引
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.locks import FileLock
+from ..utils.logger import get_logger
+
+logger = get_logger('wannian.chat_journal')
+
+_SEGMENT_RE = re.compile(r'^segment-(\d{6})\.log$')
+
+
+class ChatJournal:
+    """只追加的聊天消息日志
+
+    - 追加一条消息只写一行，I/O 为 O(1)
+    - 索引记录每条消息所在的 (段号, 偏移, 长度)，读取最近 N 条只需读取对应的 N 行
+    - fsync 批量执行：累计 fsync_batch 条或距上次 fsync 超过 fsync_interval 秒时落盘
+    - 封存段数量达到 compact_segments 时，将封存段合并为一段（按会话聚集，便于顺序读取）
+    - 最近读取的 history_cache_size 个会话缓存解码后的消息，稳态下读取历史不打开段文件；
+      追加时同步更新缓存，其他进程追加的新记录只解码增量部分，合并（epoch 变化）后清空
+
+    多个进程可以共享同一目录：追加、轮转与合并都在目录级文件锁内进行，
+    各进程在追加前（以及读取时每隔 refresh_interval 秒）增量扫描其他进程写入的新记录；
+    合并会递增 compaction.epoch，其他进程发现 epoch 变化后重建索引。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        fsync_batch: int = 32,
+        fsync_interval: float = 1.0,
+        compact_segments: int = 8,
+        refresh_interval: float = 1.0,
+        history_cache_size: int = 256
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.compact_segments = max(2, compact_segments)
+        self.refresh_interval = refresh_interval
+        self.history_cache_size = max(0, history_cache_size)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(directory, '.lock'))
+        # application_id -> [(segment_no, offset, length), ...]，按追加顺序
+        self._index: Dict[str, List[Tuple[int, int, int]]] = {}
+        # application_id -> 解码后的消息列表，与索引前缀一一对应（LRU）
+        self._history: "OrderedDict[str, list]" = OrderedDict()
+        self._epoch = 0
+        self._active_no = 0
+        self._active = None
+        self._active_size = 0
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        self._last_refresh = time.monotonic()
+
+        with self._file_lock:
+            self._recover()
+
+    # ------------------------------------------------------------------
+    # 启动恢复与跨进程同步
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, no: int) -> str:
+        return os.path.join(self.directory, f"segment-{no:06d}.log")
+
+    def _epoch_path(self) -> str:
+        return os.path.join(self.directory, 'compaction.epoch')
+
+    def _read_epoch(self) -> int:
+        try:
+            with open(self._epoch_path(), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _segment_numbers(self) -> List[int]:
+        nos = []
+        for name in os.listdir(self.directory):
+            m = _SEGMENT_RE.match(name)
+            if m:
+                nos.append(int(m.group(1)))
+        return sorted(nos)
+
+    def _recover(self) -> None:
+        """重建全部索引（调用方需持有文件锁）"""
+        nos = self._segment_numbers()
+
+        # 合并段以头部记录声明其来源段；若来源段仍存在（合并后删除前崩溃），清理掉
+        for no in list(nos):
+            header = self._read_header(no)
+            if header:
+                for src in header.get("compacted_from", []):
+                    if src != no and src in nos:
+                        os.remove(self._segment_path(src))
+                        nos.remove(src)
+                        logger.warning(f"清理合并残留的聊天日志段: {src}")
+
+        self._index = {}
+        self._history.clear()
+        self._epoch = self._read_epoch()
+        for no in nos:
+            self._scan_segment(no, 0, truncate=True)
+        self._switch_active(nos[-1] if nos else 1)
+
+    def _read_header(self, no: int) -> Optional[dict]:
+        with open(self._segment_path(no), 'rb') as f:
+            first = f.readline()
+        try:
+            record = json.loads(first)
+        except (ValueError, UnicodeDecodeError):
+            return None
+        return record if isinstance(record, dict) and "compacted_from" in record else None
+
+    def _scan_segment(self, no: int, start: int, truncate: bool = False) -> int:
+        """从 start 偏移开始扫描一个段并追加索引，返回已扫描的有效末尾偏移"""
+        path = self._segment_path(no)
+        valid_end = start
+        with open(path, 'rb') as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                length = len(line)
+                if not line.endswith(b"\n"):
+                    break  # 最后一行写入不完整
+                try:
+                    record = json.loads(line)
+                except (ValueError, UnicodeDecodeError):
+                    offset += length
+                    valid_end = offset
+                    continue
+                app_id = record.get("application_id")
+                if app_id:
+                    self._index.setdefault(app_id, []).append((no, offset, length))
+                offset += length
+                valid_end = offset
+        if truncate and valid_end < os.path.getsize(path):
+            logger.warning(f"聊天日志段 {no} 末尾存在不完整记录，已截断")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        return valid_end
+
+    def _switch_active(self, no: int) -> None:
+        if self._active and not self._active.closed:
+            self._active.close()
+        self._active_no = no
+        self._active = open(self._segment_path(no), 'ab')
+        self._active_size = self._active.tell()
+
+    def _catch_up(self) -> None:
+        """索引追上其他进程的写入（调用方需持有 self._lock 与文件锁）"""
+        self._last_refresh = time.monotonic()
+        if self._read_epoch() != self._epoch:
+            logger.info("检测到其他进程合并了聊天日志，重建索引")
+            self._recover()
+            return
+        size = os.path.getsize(self._segment_path(self._active_no))
+        if size > self._active_size:
+            self._active_size = self._scan_segment(self._active_no, self._active_size)
+        newer = [no for no in self._segment_numbers() if no > self._active_no]
+        for no in newer:
+            self._scan_segment(no, 0)
+        if newer:
+            self._switch_active(newer[-1])
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _sync(self) -> None:
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, application_id: str, role: str, content: str, ts: int) -> dict:
+        return self.append_many(application_id, [{"role": role, "content": content}], ts)[0]
+
+    def append_many(self, application_id: str, messages: List[dict], ts: int) -> List[dict]:
+        """在一次加锁内连续追加多条消息，其他线程或进程的消息不会插入其中"""
+        records = [{"role": m["role"], "content": m["content"], "ts": ts} for m in messages]
+        lines = [
+            json.dumps({"application_id": application_id, **r}, ensure_ascii=False).encode('utf-8') + b"\n"
+            for r in records
+        ]
+        with self._lock, self._file_lock:
+            self._catch_up()
+            known = len(self._index.get(application_id) or [])
+            for line in lines:
+                if self._active_size and self._active_size + len(line) > self.segment_max_bytes:
+                    self._rotate()
+                offset = self._active_size
+                self._active.write(line)
+                self._active_size += len(line)
+                self._index.setdefault(application_id, []).append((self._active_no, offset, len(line)))
+            cached = self._history.get(application_id)
+            if cached is not None:
+                if len(cached) == known:
+                    cached.extend(dict(r) for r in records)
+                else:
+                    # 缓存尚未包含其他进程追加的记录，下次读取时整体重新解码
+                    del self._history[application_id]
+            # 释放文件锁前必须写出，其他进程才能看到完整的行
+            self._active.flush()
+
+            self._pending_sync += len(lines)
+            if (self._pending_sync >= self.fsync_batch
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+        return records
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._switch_active(self._active_no + 1)
+        sealed = [no for no in self._segment_numbers() if no < self._active_no]
+        if len(sealed) >= self.compact_segments:
+            self._compact(sealed)
+
+    def _compact(self, sealed: List[int]) -> None:
+        """将封存段合并为一段，按 application_id 聚集，保持每个会话内的消息顺序"""
+        sealed_set = set(sealed)
+        target_no = sealed[-1]
+        tmp_path = os.path.join(self.directory, f"compact-{target_no:06d}.tmp")
+        new_entries: Dict[str, List[Tuple[int, int, int]]] = {}
+
+        # 每个封存段只打开一次，合并期间持有文件锁，不能逐条打开文件
+        handles = {}
+        try:
+            with open(tmp_path, 'wb') as out:
+                header = json.dumps({"compacted_from": sealed}).encode('utf-8') + b"\n"
+                out.write(header)
+                offset = len(header)
+                for app_id, entries in self._index.items():
+                    for no, off, length in entries:
+                        if no not in sealed_set:
+                            continue
+                        f = handles.get(no)
+                        if f is None:
+                            f = handles[no] = open(self._segment_path(no), 'rb')
+                        f.seek(off)
+                        out.write(f.read(length))
+                        new_entries.setdefault(app_id, []).append((target_no, offset, length))
+                        offset += length
+                out.flush()
+                os.fsync(out.fileno())
+        finally:
+            for f in handles.values():
+                f.close()
+
+        os.replace(tmp_path, self._segment_path(target_no))
+        for no in sealed:
+            if no != target_no:
+                os.remove(self._segment_path(no))
+
+        for app_id, entries in list(self._index.items()):
+            kept = [e for e in entries if e[0] not in sealed_set]
+            self._index[app_id] = new_entries.get(app_id, []) + kept
+
+        self._history.clear()
+        self._epoch += 1
+        with open(self._epoch_path(), 'w', encoding='utf-8') as f:
+            f.write(str(self._epoch))
+        logger.info(f"聊天日志合并完成: {len(sealed)} 段 -> 段 {target_no}")
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _read_entries(self, application_id: str, entries: List[Tuple[int, int, int]]) -> list:
+        messages = []
+        handles = {}
+        try:
+            for no, offset, length in entries:
+                f = handles.get(no)
+                if f is None:
+                    f = handles[no] = open(self._segment_path(no), 'rb')
+                f.seek(offset)
+                record = json.loads(f.read(length))
+                if record.get("application_id") != application_id:
+                    raise ValueError("聊天日志索引已过期")
+                messages.append({"role": record.get("role"), "content": record.get("content"), "ts": record.get("ts")})
+        finally:
+            for f in handles.values():
+                f.close()
+        return messages
+
+    def _history_for(self, application_id: str, entries: List[Tuple[int, int, int]]) -> list:
+        """返回会话的全部消息：命中缓存时只解码缓存之后新增的记录"""
+        cached = self._history.get(application_id)
+        if cached is None or len(cached) > len(entries):
+            cached = []
+        if len(cached) < len(entries):
+            if entries[-1][0] == self._active_no:
+                self._active.flush()
+            cached = cached + self._read_entries(application_id, entries[len(cached):])
+        if self.history_cache_size:
+            self._history[application_id] = cached
+            self._history.move_to_end(application_id)
+            while len(self._history) > self.history_cache_size:
+                self._history.popitem(last=False)
+        return cached
+
+    def read(self, application_id: str, limit: Optional[int] = None) -> list:
+        with self._lock:
+            if time.monotonic() - self._last_refresh >= self.refresh_interval:
+                with self._file_lock:
+                    self._catch_up()
+            if limit is not None and limit <= 0:
+                return []
+            for attempt in range(2):
+                entries = self._index.get(application_id) or []
+                try:
+                    if limit is not None and application_id not in self._history:
+                        # 未缓存的会话只取最近 limit 条时，不为此解码全部历史
+                        entries = entries[-limit:]
+                        if entries and entries[-1][0] == self._active_no:
+                            self._active.flush()
+                        messages = self._read_entries(application_id, entries)
+                    else:
+                        messages = self._history_for(application_id, entries)
+                        if limit is not None:
+                            messages = messages[-limit:]
+                except (OSError, ValueError):
+                    # 其他进程在上次同步后合并了日志，强制同步后重试一次
+                    if attempt:
+                        raise
+                    with self._file_lock:
+                        self._catch_up()
+                    continue
+                return [dict(m) for m in messages]
+        return []
+
+    def count(self, application_id: str) -> int:
+        with self._lock:
+            return len(self._index.get(application_id) or [])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._active and not self._active.closed:
+                self._sync()
+                self._active.close()
@@ -3,14 +3,23 @@
 负责聚合 49 位大师的推演结果，提取共识、冲突及图谱数据
 """
 
+import asyncio
 import json
 import concurrent.futures
+import hashlib
 import random
 import re
+import threading
 import datetime
 from typing import Dict, Any, List, Optional
-from ..utils.llm_client import LLMClient
+from ..config import Config
+from ..utils.cache import TieredCache
+from ..utils.llm_client import AsyncLLMClient, LLMClient
+from ..utils.llm_scheduler import LLMScheduler
 from ..utils.logger import get_logger
+from ..utils.near_duplicate import ContainmentIndex, NearDuplicateIndex
+from .paragraph_classifier import classify_paragraph
+from .report_corpus import ReportCorpus
 
 logger = get_logger('wannian.fortune_aggregator')
 
@@ -232,129 +241,361 @@ SUMMARY_PROMPT = """
 ...
 """
 
+# 单个年份压缩文本的长度上限
+YEAR_CONTEXT_MAX_CHARS = 15000
+
+
+class ReportAccumulator:
+    """增量收集大师报告
+
+    每份报告到达时立即分段，并按关键词和年份建立索引，
+    聚合阶段直接拼接已有的分年文本，不必等全部报告到齐后再统一预处理。
+    """
+
+    def __init__(self, user_data: Dict[str, Any]):
+        self.user_data = user_data
+        self.future_years = user_data.get("future_years", 3)
+        current_year = datetime.datetime.now().year
+        self.years = [current_year + i for i in range(self.future_years)]
+        self._lock = threading.Lock()
+        self._reports: Dict[str, Dict[str, Any]] = {}
+        # 全部段落、分类结果与倒排索引，聚合各阶段共用
+        self.corpus = ReportCorpus()
+        # agent_id -> (大师名, 段落, 分类结果)，用于按 agent_id 顺序重建语料
+        self._parsed: Dict[str, tuple] = {}
+        # agent_id -> {年份: 该年份压缩后的文本片段}
+        self._year_chunks: Dict[str, Dict[int, str]] = {}
+
+    def add(self, agent_id: str, report: Dict[str, Any]) -> None:
+        name = report.get("name", "未知大师")
+        content = report.get("content") or ""
+        paras = [p.strip() for p in re.split(r'[\n。！？]', content) if p.strip()]
+        # 每个段落只匹配一次，后续各阶段直接使用 features
+        features = [classify_paragraph(p) for p in paras]
+
+        year_chunks = {}
+        for year in self.years:
+            year_short = str(year)
+            relevant = [p for p, f in zip(paras, features) if f.year_context or year_short in f.years]
+            if relevant:
+                year_chunks[year] = f"\n--- 【{name}】 ---\n" + "。".join(relevant) + "。\n"
+
+        with self._lock:
+            if agent_id in self._reports:
+                return
+            self._reports[agent_id] = report
+            self.corpus.add(name, paras, features)
+            self._parsed[agent_id] = (name, paras, features)
+            self._year_chunks[agent_id] = year_chunks
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return len(self._reports)
+
+    def reports(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._reports)
+
+    def ordered_corpus(self) -> ReportCorpus:
+        """按 agent_id 顺序重建的语料，与报告到达的先后无关（确定性聚合使用）"""
+        with self._lock:
+            parsed = sorted(self._parsed.items())
+        corpus = ReportCorpus()
+        for _, (name, paras, features) in parsed:
+            corpus.add(name, paras, features)
+        return corpus
+
+    def user_context(self) -> str:
+        # 使用完整内容，确保不丢失任何信息
+        reports_text_full = "".join(
+            f"\n--- 【{data['name']}】 ---\n{data['content']}\n" for data in self.reports().values()
+        )
+        return f"用户信息: {json.dumps(self.user_data, ensure_ascii=False)}\n\n=== 49位大师完整推演文本 ===\n{reports_text_full}"
+
+    def year_tasks(self) -> List[tuple]:
+        """每个年份的 (year_str, year_context)，基于当前已到达的报告"""
+        with self._lock:
+            chunks = [self._year_chunks[agent_id] for agent_id in sorted(self._year_chunks)]
+        tasks = []
+        for year in self.years:
+            year_str = f"{year}年"
+            compressed_reports_text = "".join(c[year] for c in chunks if year in c)
+            if len(compressed_reports_text) > YEAR_CONTEXT_MAX_CHARS:
+                compressed_reports_text = compressed_reports_text[:YEAR_CONTEXT_MAX_CHARS] + "...(内容过多已截断)"
+            year_context = f"用户信息: {json.dumps(self.user_data, ensure_ascii=False)}\n\n=== 49位大师 {year_str} 相关推演文本 ===\n{compressed_reports_text}"
+            tasks.append((year_str, year_context))
+        return tasks
+
+
 class FortuneAggregator:
     """命运总结官"""
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        schedule_key: str = "aggregate",
+        async_llm: Optional[AsyncLLMClient] = None,
+        deterministic: Optional[bool] = None,
+        result_cache: Optional[TieredCache] = None
+    ):
         self.llm = llm_client or LLMClient()
+        # aggregate_reports_async 使用的异步客户端
+        self.async_llm = async_llm
+        # 指定调度器时，分年生成的 LLM 调用与大师推演共用全局并发上限
+        self.scheduler = scheduler
+        self.schedule_key = schedule_key
+        # 确定性模式：随机抽取与 impact 评分使用由输入派生的种子，语料按 agent_id 顺序处理，相同输入与报告得到相同图谱
+        self.deterministic = (
+            Config.FORTUNE_DETERMINISTIC_AGGREGATION if deterministic is None else deterministic
+        )
+        # 聚合结果缓存（只在使用种子时读写），key 由输入、年份、种子与全部报告内容的哈希组成
+        self.result_cache = result_cache
+        self._rng = random.Random()
     
     def aggregate_reports(
         self, 
         user_data: Dict[str, Any], 
         reports: Dict[str, Dict[str, Any]],
-        on_progress: Optional[callable] = None
+        on_progress: Optional[callable] = None,
+        seed: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         聚合报告：使用分年生成策略，避免单次LLM调用超时
+
+        seed 为随机种子；未指定时确定性模式使用 aggregation_seed(user_data)，否则每次随机
         """
+        accumulator = ReportAccumulator(user_data)
+        for agent_id, report in reports.items():
+            accumulator.add(agent_id, report)
+        return self.aggregate_accumulated(accumulator, on_progress=on_progress, seed=seed)
+
+    @staticmethod
+    def aggregation_seed(user_data: Dict[str, Any]) -> int:
+        """由规范化输入派生的随机种子，跨进程稳定"""
+        input_str = json.dumps(user_data, sort_keys=True, ensure_ascii=False)
+        return int(hashlib.sha256(input_str.encode("utf-8")).hexdigest()[:16], 16)
+
+    def _seed_rng(self, accumulator: ReportAccumulator, seed: Optional[int]) -> Optional[int]:
+        if seed is None and self.deterministic:
+            seed = self.aggregation_seed(accumulator.user_data)
+        # seed 为 None 时从系统熵源重新初始化
+        self._rng.seed(seed)
+        return seed
+
+    def _result_cache_key(self, accumulator: ReportAccumulator, seed: Optional[int]) -> Optional[str]:
+        """输入 + 年份 + 种子 + 全部报告内容的哈希；未使用种子或未配置缓存时返回 None"""
+        if seed is None or self.result_cache is None:
+            return None
+        reports = accumulator.reports()
+        digest = hashlib.sha256(json.dumps(
+            {"input": accumulator.user_data, "years": accumulator.years, "seed": seed},
+            sort_keys=True, ensure_ascii=False
+        ).encode("utf-8"))
+        for agent_id in sorted(reports):
+            report = reports[agent_id]
+            digest.update(f"\0{agent_id}\0{report.get('name', '')}\0{report.get('content') or ''}".encode("utf-8"))
+        return f"aggregate:{digest.hexdigest()}"
+
+    def _cached_result(self, cache_key: Optional[str], on_progress: Optional[callable] = None) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        cached = self.result_cache.get(cache_key)
+        if cached is None:
+            return None
+        logger.info("命中聚合结果缓存，跳过图谱生成与校验")
         if on_progress:
-            on_progress(92, "正在拨动星盘，萃取 49 位大师推演精要...")
+            on_progress(100, "天机已现，全案推演编撰完成")
+        return json.loads(cached)
+
+    def _store_result(self, cache_key: Optional[str], result: Dict[str, Any], collected: Dict[str, List]) -> None:
+        # 有年份生成失败（使用了回退节点）的结果不缓存，下次请求重新生成
+        if cache_key is None or collected["failed"]:
+            return
+        self.result_cache.set(cache_key, json.dumps(result, ensure_ascii=False))
+
+    def submit_year_graphs(self, accumulator: ReportAccumulator) -> Dict[concurrent.futures.Future, str]:
+        """按当前已到达的报告提交各年份的图谱生成，返回 {future: year_str}；可在全部大师完成前调用"""
+        if self.scheduler:
+            executor = self.scheduler.executor(self.schedule_key)
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=accumulator.future_years)
+        year_jobs = {
+            executor.submit(self._generate_year_graph, year_str, year_context, accumulator.corpus): year_str
+            for year_str, year_context in accumulator.year_tasks()
+        }
+        if isinstance(executor, concurrent.futures.ThreadPoolExecutor):
+            executor.shutdown(wait=False)
+        return year_jobs
+
+    def aggregate_accumulated(
+        self,
+        accumulator: ReportAccumulator,
+        year_jobs: Optional[Dict[concurrent.futures.Future, str]] = None,
+        on_progress: Optional[callable] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """由累计的报告完成聚合
+
+        year_jobs 为提前提交的分年生成任务（见 IncrementalAggregation），未提供时在此提交。
+        提前提交时分年图谱只基于当时已到达的报告，之后到达的报告在回退节点、原文引用与节点补充阶段并入。
+        """
+        seed = self._seed_rng(accumulator, seed)
+        cache_key = self._result_cache_key(accumulator, seed)
+        cached = self._cached_result(cache_key, on_progress)
+        if cached is not None:
+            for future in year_jobs or ():
+                future.cancel()
+            return cached
+
+        prepared = self._prepare_aggregation(accumulator, on_progress)
+        future_years = prepared["future_years"]
+        corpus = prepared["corpus"]
+        collected = {"nodes": [], "edges": [], "consensus": [], "conflicts": [], "failed": []}
+        
+        # 并行执行年份生成
+        if year_jobs is None:
+            year_jobs = self.submit_year_graphs(accumulator)
             
-        future_years = user_data.get("future_years", 3)
-        current_year = datetime.datetime.now().year
+        completed_count = 0
+        for future in concurrent.futures.as_completed(year_jobs):
+            year_str = year_jobs[future]
+            completed_count += 1
+            
+            if on_progress:
+                progress = 94 + (completed_count * 5 // future_years)
+                on_progress(progress, f"正在凝聚 {year_str} 的天机图谱 ({completed_count}/{future_years})...")
         
-        # 准备大师报告文本 - 使用完整内容，不截断
-        reports_text_full = ""
-        for agent_id, data in reports.items():
-            # 使用完整内容，确保不丢失任何信息
-            reports_text_full += f"\n--- 【{data['name']}】 ---\n{data['content']}\n"
-        
-        user_context = f"用户信息: {json.dumps(user_data, ensure_ascii=False)}\n\n=== 49位大师完整推演文本 ===\n{reports_text_full}"
-        reports_list = list(reports.values())
-        
-        # 预处理报告列表
-        preprocessed_reports = []
-        for r in reports_list:
-            content = r.get('content', '')
-            paras = [p.strip() for p in re.split(r'[\n。！？]', content) if p.strip()]
-            preprocessed_reports.append({
-                "name": r.get('name', '未知大师'),
-                "paragraphs": paras
-            })
+        # 按年份顺序合并，节点顺序与回退节点的随机抽取不受各年份完成先后影响
+        for future, year_str in year_jobs.items():
+            self._collect_year_result(collected, year_str, future.result, corpus)
+        
+        result = self._finalize_aggregation(prepared, collected, on_progress)
+        self._store_result(cache_key, result, collected)
+        return result
+
+    async def aggregate_reports_async(
+        self,
+        user_data: Dict[str, Any],
+        reports: Dict[str, Dict[str, Any]],
+        on_progress: Optional[callable] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """aggregate_reports 的异步版本：各年份图谱在同一个事件循环上并发生成"""
+        accumulator = ReportAccumulator(user_data)
+        for agent_id, report in reports.items():
+            accumulator.add(agent_id, report)
+        seed = self._seed_rng(accumulator, seed)
+        cache_key = self._result_cache_key(accumulator, seed)
+        cached = self._cached_result(cache_key, on_progress)
+        if cached is not None:
+            return cached
+
+        prepared = self._prepare_aggregation(accumulator, on_progress)
+        future_years = prepared["future_years"]
+        corpus = prepared["corpus"]
+        collected = {"nodes": [], "edges": [], "consensus": [], "conflicts": [], "failed": []}
+
+        async def run_year(year_str: str, year_context: str):
+            try:
+                return year_str, await self._generate_year_graph_async(year_str, year_context, corpus), None
+            except Exception as e:
+                return year_str, None, e
+
+        completed_count = 0
+        outcomes = {}
+        for next_done in asyncio.as_completed([run_year(y, ctx) for y, ctx in prepared["year_tasks"]]):
+            year_str, year_result, error = await next_done
+            outcomes[year_str] = (year_result, error)
+            completed_count += 1
+
+            if on_progress:
+                progress = 94 + (completed_count * 5 // future_years)
+                on_progress(progress, f"正在凝聚 {year_str} 的天机图谱 ({completed_count}/{future_years})...")
+
+        # 按年份顺序合并，与同步版本一致
+        for year_str, _ in prepared["year_tasks"]:
+            year_result, error = outcomes[year_str]
+
+            def get_result(result=year_result, error=error):
+                if error:
+                    raise error
+                return result
+
+            self._collect_year_result(collected, year_str, get_result, corpus)
+
+        # 清洗与校验是纯计算，放到线程中执行，避免阻塞事件循环
+        result = await asyncio.to_thread(self._finalize_aggregation, prepared, collected, on_progress)
+        self._store_result(cache_key, result, collected)
+        return result
+
+    def _prepare_aggregation(
+        self,
+        accumulator: ReportAccumulator,
+        on_progress: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """准备聚合所需的上下文、预处理段落与每年的生成参数"""
+        if on_progress:
+            on_progress(92, "正在拨动星盘，萃取 49 位大师推演精要...")
+        
+        # 段落切分、分类与分年压缩在报告到达时已完成（ReportAccumulator.add）
+        prepared = {
+            "future_years": accumulator.future_years,
+            "user_context": accumulator.user_context(),
+            "corpus": accumulator.ordered_corpus() if self.deterministic else accumulator.corpus
+        }
         
         # 使用分年生成策略 - 每年单独生成，避免超时
         if on_progress:
             on_progress(94, "正在校准天星方位，采用分年凝聚策略...")
         
-        all_nodes = []
-        all_edges = []
-        all_consensus = []
-        all_conflicts = []
-        
-        # 准备每年生成的参数
-        year_tasks = []
-        for i in range(future_years):
-            year = current_year + i
-            year_str = f"{year}年"
+        prepared["year_tasks"] = accumulator.year_tasks()
+        return prepared
+
+    def _collect_year_result(
+        self,
+        collected: Dict[str, List],
+        year_str: str,
+        get_result: callable,
+        corpus: ReportCorpus
+    ) -> None:
+        """合并单年份的生成结果；get_result 抛出异常时使用回退节点"""
+        try:
+            year_result = get_result()
             
-            # 针对当前年份进行 Token 智能压缩
-            compressed_reports_text = ""
-            current_year_short = str(year)
-            # 扩充关键词，涵盖更多维度的同义词
-            all_keywords = [
-                "事业", "工作", "晋升", "职场", "创业", "职位", "名声", "学业",
-                "财富", "金钱", "投资", "收益", "破财", "财运", "收入", "理财",
-                "情感", "感情", "婚姻", "恋爱", "桃花", "伴侣", "家庭", "姻缘",
-                "健康", "身体", "疾病", "养生", "平安", "体质", "调养", "医疗",
-                "运势", "机遇", "风险", "变数", "抉择", "转折", "突破", "挑战"
-            ]
+            # 合并结果
+            year_nodes = year_result.get("graph_data", {}).get("nodes", [])
+            year_edges = year_result.get("graph_data", {}).get("edges", [])
             
-            for agent_id, report_data in reports.items():
-                content = report_data.get('content', '')
-                paragraphs = re.split(r'[\n。！？]', content)
-                relevant_paras = []
-                for p in paragraphs:
-                    p = p.strip()
-                    if not p: continue
-                    # 只要包含年份，或者包含任何维度关键词，就保留
-                    if current_year_short in p or any(kw in p for kw in all_keywords):
-                        relevant_paras.append(p)
-                
-                if relevant_paras:
-                    compressed_reports_text += f"\n--- 【{report_data['name']}】 ---\n" + "。".join(relevant_paras) + "。\n"
-
-            if len(compressed_reports_text) > 15000:
-                compressed_reports_text = compressed_reports_text[:15000] + "...(内容过多已截断)"
-
-            year_context = f"用户信息: {json.dumps(user_data, ensure_ascii=False)}\n\n=== 49位大师 {year_str} 相关推演文本 ===\n{compressed_reports_text}"
-            year_tasks.append((year_str, year_context))
-
-        # 并行执行年份生成
-        with concurrent.futures.ThreadPoolExecutor(max_workers=future_years) as executor:
-            future_to_year = {
-                executor.submit(self._generate_year_graph, year_str, year_context, preprocessed_reports): year_str 
-                for year_str, year_context in year_tasks
-            }
+            collected["nodes"].extend(year_nodes)
+            collected["edges"].extend(year_edges)
+            collected["consensus"].extend(year_result.get("consensus", []))
+            collected["conflicts"].extend(year_result.get("conflicts", []))
             
-            completed_count = 0
-            for future in concurrent.futures.as_completed(future_to_year):
-                year_str = future_to_year[future]
-                completed_count += 1
-                
-                if on_progress:
-                    progress = 94 + (completed_count * 5 // future_years)
-                    on_progress(progress, f"正在凝聚 {year_str} 的天机图谱 ({completed_count}/{future_years})...")
-                
-                try:
-                    year_result = future.result()
-                    
-                    # 合并结果
-                    year_nodes = year_result.get("graph_data", {}).get("nodes", [])
-                    year_edges = year_result.get("graph_data", {}).get("edges", [])
-                    
-                    all_nodes.extend(year_nodes)
-                    all_edges.extend(year_edges)
-                    all_consensus.extend(year_result.get("consensus", []))
-                    all_conflicts.extend(year_result.get("conflicts", []))
-                    
-                    logger.info(f"{year_str} 并行生成完成: {len(year_nodes)} 个节点")
-                    
-                except Exception as e:
-                    logger.error(f"{year_str} 图谱并行生成失败: {str(e)}")
-                    # 回退逻辑
-                    year_nodes = self._generate_fallback_year_nodes(year_str, preprocessed_reports)
-                    all_nodes.extend(year_nodes)
-        
+            logger.info(f"{year_str} 并行生成完成: {len(year_nodes)} 个节点")
+            
+        except Exception as e:
+            logger.error(f"{year_str} 图谱并行生成失败: {str(e)}")
+            collected.setdefault("failed", []).append(year_str)
+            # 回退逻辑
+            year_nodes = self._generate_fallback_year_nodes(year_str, corpus)
+            collected["nodes"].extend(year_nodes)
+
+    def _finalize_aggregation(
+        self,
+        prepared: Dict[str, Any],
+        collected: Dict[str, List],
+        on_progress: Optional[callable] = None
+    ) -> Dict[str, Any]:
+        """由各年份结果构建图谱、生成总结并清洗校验"""
+        future_years = prepared["future_years"]
+        user_context = prepared["user_context"]
+        corpus = prepared["corpus"]
+        all_nodes = collected["nodes"]
+        all_edges = collected["edges"]
+        all_consensus = collected["consensus"]
+        all_conflicts = collected["conflicts"]
         
         # 构建完整的图谱结果
         graph_result = {
@@ -386,19 +627,7 @@ class FortuneAggregator:
         logger.info(f"清洗前图谱节点数: {len(all_nodes)}")
         logger.info(f"清洗前图谱边数: {len(all_edges)}")
         
-        graph_result = self._sanitize_result(graph_result, future_years, preprocessed_reports)
-            
-        # 预处理报告列表，提取段落
-        preprocessed_reports = []
-        for r in reports_list:
-            content = r.get('content', '')
-            paras = [p.strip() for p in re.split(r'[\n。！？]', content) if p.strip()]
-            preprocessed_reports.append({
-                "name": r.get('name', '未知大师'),
-                "paragraphs": paras
-            })
-
-        graph_result = self._sanitize_result(graph_result, future_years, preprocessed_reports)
+        graph_result = self._sanitize_result(graph_result, future_years, corpus)
         
         final_result = graph_result
         final_result["summary_text"] = summary_text
@@ -427,7 +656,7 @@ class FortuneAggregator:
         self, 
         year: str, 
         user_context: str,
-        preprocessed_reports: List[Dict[str, Any]]
+        corpus: ReportCorpus
     ) -> Dict[str, Any]:
         """生成单年份的图谱
         
@@ -435,36 +664,64 @@ class FortuneAggregator:
         """
         logger.info(f"开始生成 {year} 的图谱...")
         
-        # 构建提示词
-        prompt = YEARLY_GRAPH_PROMPT.replace("{{year}}", year)
-        
-        messages = [
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": f"请基于以下大师推演，生成 {year} 的命理图谱：\n{user_context}"}
-        ]
-        
         # 调用LLM生成，使用较短的超时（120秒）
         try:
-            result = self.llm.chat_json(messages, temperature=0.3, use_boost=True)
+            result = self.llm.chat_json(self._year_graph_messages(year, user_context), temperature=0.3, use_boost=True)
             logger.info(f"{year} LLM生成成功")
-            
-            # 确保节点ID包含年份前缀，避免冲突
-            nodes = result.get("graph_data", {}).get("nodes", [])
-            for i, node in enumerate(nodes):
-                if not node.get("id", "").startswith(year.replace("年", "")):
-                    node["id"] = f"{year.replace('年', '')}_n{i+1}"
-                # 确保time字段正确
-                node["properties"]["time"] = year
-            
-            return result
+            return self._normalize_year_graph(year, result)
             
         except Exception as e:
             logger.error(f"{year} LLM生成失败: {str(e)}")
             raise
 
-    def _extract_aggregated_consensus(self, preprocessed_reports: List[Dict[str, Any]], dimension: str, year: str) -> tuple:
+    async def _generate_year_graph_async(
+        self,
+        year: str,
+        user_context: str,
+        corpus: ReportCorpus
+    ) -> Dict[str, Any]:
+        """_generate_year_graph 的异步版本"""
+        if self.async_llm is None:
+            self.async_llm = AsyncLLMClient()
+        logger.info(f"开始生成 {year} 的图谱...")
+        messages = self._year_graph_messages(year, user_context)
+        try:
+            if self.scheduler:
+                # 与线程版本一样经调度器排队，计入全局并发上限
+                result = await self.scheduler.run_async(
+                    self.schedule_key, self.async_llm.chat_json, messages, temperature=0.3, use_boost=True
+                )
+            else:
+                result = await self.async_llm.chat_json(messages, temperature=0.3, use_boost=True)
+            logger.info(f"{year} LLM生成成功")
+            return self._normalize_year_graph(year, result)
+        except Exception as e:
+            logger.error(f"{year} LLM生成失败: {str(e)}")
+            raise
+
+    @staticmethod
+    def _year_graph_messages(year: str, user_context: str) -> List[Dict[str, str]]:
+        # 构建提示词
+        prompt = YEARLY_GRAPH_PROMPT.replace("{{year}}", year)
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"请基于以下大师推演，生成 {year} 的命理图谱：\n{user_context}"}
+        ]
+
+    @staticmethod
+    def _normalize_year_graph(year: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        # 确保节点ID包含年份前缀，避免冲突
+        nodes = result.get("graph_data", {}).get("nodes", [])
+        for i, node in enumerate(nodes):
+            if not node.get("id", "").startswith(year.replace("年", "")):
+                node["id"] = f"{year.replace('年', '')}_n{i+1}"
+            # 确保time字段正确
+            node["properties"]["time"] = year
+        return result
+
+    def _extract_aggregated_consensus(self, corpus: ReportCorpus, dimension: str, year: str) -> tuple:
         """从多位大师报告中聚合共识内容"""
-        all_candidates = self._extract_all_relevant_paragraphs(preprocessed_reports, dimension, year)
+        all_candidates = self._extract_all_relevant_paragraphs(corpus, dimension, year)
         if not all_candidates:
             return "", "综合推演"
         master_paras = {}
@@ -477,27 +734,48 @@ class FortuneAggregator:
         return aggregated_desc, master_names
 
     def _group_similar_candidates(self, candidates: List[tuple]) -> List[Dict]:
-        """将相似的观点合并，体现多大师印证"""
+        """将相似的观点合并，体现多大师印证
+
+        相似度为字符 n-gram 的 Jaccard 系数（阈值 FORTUNE_GROUP_SIMILARITY），与组内最长的一条比较；
+        MinHash + LSH 分桶后只与可能相似的组比较，耗时随候选数近似线性增长。
+        """
+        index = NearDuplicateIndex(
+            threshold=Config.FORTUNE_GROUP_SIMILARITY,
+            num_perm=Config.FORTUNE_MINHASH_PERMUTATIONS,
+            bands=Config.FORTUNE_LSH_BANDS,
+            shingle_size=Config.FORTUNE_GROUP_SHINGLE_SIZE
+        )
         groups = []
+        sketches = []
         for para, master in candidates:
+            sketch = index.sketch(para)
             found_group = False
-            for group in groups:
+            # 按建组顺序检查候选组，与逐组比较时"加入第一个相似的组"一致
+            for group_id in index.candidates(sketch):
+                group = groups[group_id]
                 if master in group['masters']: continue
-                common_chars = set(para) & set(group['para'])
-                if len(common_chars) > 25:
+                if index.is_similar(sketch, sketches[group_id]):
                     group['masters'].append(master)
-                    if len(para) > len(group['para']): group['para'] = para
+                    if len(para) > len(group['para']):
+                        group['para'] = para
+                        sketches[group_id] = sketch
+                    # 组内每条观点都进入索引，代表文本更换后仍能召回
+                    index.add(group_id, sketch)
                     found_group = True
                     break
-            if not found_group: groups.append({'para': para, 'masters': [master]})
+            if not found_group:
+                index.add(len(groups), sketch)
+                groups.append({'para': para, 'masters': [master]})
+                sketches.append(sketch)
         return groups
 
-    def _generate_fallback_year_nodes(self, year: str, preprocessed_reports: List[Dict[str, Any]]) -> List[Dict]:
+    def _generate_fallback_year_nodes(self, year: str, corpus: ReportCorpus) -> List[Dict]:
         """当LLM生成失败时，使用规则生成该年的节点
         
         逻辑更新：聚合多大师观点，并严格限制每个维度的节点数量（Unique<=10, Variable<=5）。
         """
         logger.warning(f"使用聚合逻辑fallback生成 {year} 的节点")
+        corpus = ReportCorpus.ensure(corpus)
         nodes = []
         node_id = 1
         dimensions = ["career", "wealth", "emotion", "health"]
@@ -506,7 +784,7 @@ class FortuneAggregator:
 
         for dim in dimensions:
             # 1. 共识节点：每个维度 1 个，聚合前 5 位大师
-            consensus_desc, consensus_masters = self._extract_aggregated_consensus(preprocessed_reports, dim, year)
+            consensus_desc, consensus_masters = self._extract_aggregated_consensus(corpus, dim, year)
             consensus_para = ""
             if consensus_desc:
                 # 提取共识文本内容用于去重校验
@@ -528,15 +806,12 @@ class FortuneAggregator:
                 node_id += 1
 
             # 2. 独特观点与变数：按维度收集并筛选
-            all_candidates = self._extract_all_relevant_paragraphs(preprocessed_reports, dim, year)
+            all_candidates = self._extract_all_relevant_paragraphs(corpus, dim, year)
             grouped_candidates = self._group_similar_candidates(all_candidates)
             
             dim_unique = []
             dim_variable = []
             
-            # 强化变数识别关键词
-            strict_variable_kws = ["若", "如果", "一旦", "除非", "取决于", "抉择", "变数", "转折点", "机遇与风险并存"]
-            
             for group in grouped_candidates:
                 para = group['para']
                 masters = group['masters']
@@ -547,7 +822,8 @@ class FortuneAggregator:
                     if len(common_chars) > len(para) * 0.6: # 超过60%重合视为雷同
                         continue
 
-                is_variable = any(kw in para for kw in strict_variable_kws)
+                # 强化变数识别关键词（STRICT_VARIABLE_KEYWORDS）
+                is_variable = classify_paragraph(para).variable
                 
                 candidate_data = {
                     "para": para,
@@ -576,7 +852,7 @@ class FortuneAggregator:
                         "source_quote": para[:150],
                         "source_master": masters[0],
                         "type": "unique",
-                        "impact": random.randint(5, 8),
+                        "impact": self._rng.randint(5, 8),
                         "dimension": dim
                     }
                 })
@@ -598,7 +874,7 @@ class FortuneAggregator:
                         "source_quote": para[:150],
                         "source_master": masters[0],
                         "type": "variable",
-                        "impact": random.randint(7, 9),
+                        "impact": self._rng.randint(7, 9),
                         "dimension": dim
                     }
                 })
@@ -608,43 +884,15 @@ class FortuneAggregator:
 
     def _extract_all_relevant_paragraphs(
         self, 
-        preprocessed_reports: List[Dict[str, Any]], 
+        corpus: ReportCorpus, 
         dimension: str, 
         year: str
     ) -> List[tuple]:
-        """提取所有相关的段落，不进行评分排序，只过滤无效内容"""
-        keywords = {
-            "career": ["事业", "工作", "晋升", "职场", "创业", "名声", "官", "学业", "职位", "升迁", "业绩"],
-            "wealth": ["财富", "金钱", "投资", "收益", "破财", "财运", "金", "利", "理财", "资产", "收入"],
-            "emotion": ["感情", "婚姻", "恋爱", "桃花", "伴侣", "家庭", "情", "缘", "爱情", "配偶", "姻缘"],
-            "health": ["健康", "身体", "疾病", "养生", "平安", "疾", "安", "体质", "调养", "医"]
-        }
-        
-        target_keys = keywords.get(dimension, [])
-        candidates = []
-        
-        for report in preprocessed_reports:
-            master_name = report.get('name', '未知大师')
-            paragraphs = report.get('paragraphs', [])
-            
-            for para in paragraphs:
-                # 过滤太短的内容
-                if len(para) < 15: 
-                    continue
-                
-                # 必须包含年份（如果有指定年份）
-                has_year = year[:4] in para if year else False
-                # 必须包含至少一个维度关键词
-                has_keyword = any(k in para for k in target_keys)
-                
-                # 如果没有年份，也没有关键词，则视为无关
-                if not has_year and not has_keyword:
-                    continue
-                
-                # 只要相关就加入候选
-                candidates.append((para, master_name))
-        
-        return candidates
+        """提取所有相关的段落，不进行评分排序，只过滤无效内容
+
+        相关 = 包含该维度关键词或提到该年份，且不短于 15 字；结果来自按 (维度, 年份) 缓存的候选池
+        """
+        return list(ReportCorpus.ensure(corpus).candidate_pool(dimension, year).entries)
 
     def _generate_summary_text(self, future_years: int, all_nodes: List[Dict], user_context: str) -> str:
         """生成总结文本
@@ -690,7 +938,7 @@ class FortuneAggregator:
 
     def _extract_rich_description(
         self, 
-        preprocessed_reports: List[Dict[str, Any]], 
+        corpus: ReportCorpus, 
         dimension: str, 
         year: str, 
         exclude_texts: List[str] = None,
@@ -699,7 +947,7 @@ class FortuneAggregator:
         """从上下文中抓取内容丰富的描述文本及对应的大师姓名
         
         Args:
-            preprocessed_reports: 预处理后的报告列表 [{'name': '...', 'paragraphs': [...]}, ...]
+            corpus: 报告语料（也接受 [{'name': '...', 'paragraphs': [...]}, ...] 形式的预处理报告）
             exclude_texts: 已使用的描述列表，避免重复提取相同内容
             exclude_masters: 已使用过的大师列表，避免重复使用同一位大师
         """
@@ -707,81 +955,24 @@ class FortuneAggregator:
             exclude_texts = []
         if exclude_masters is None:
             exclude_masters = []
-            
-        keywords = {
-            "career": ["事业", "工作", "晋升", "职场", "创业", "名声", "官", "学业", "职位", "升迁", "业绩"],
-            "wealth": ["财富", "金钱", "投资", "收益", "破财", "财运", "金", "利", "理财", "资产", "收入"],
-            "emotion": ["感情", "婚姻", "恋爱", "桃花", "伴侣", "家庭", "情", "缘", "爱情", "配偶", "姻缘"],
-            "health": ["健康", "身体", "疾病", "养生", "平安", "疾", "安", "体质", "调养", "医"]
-        }
+        corpus = ReportCorpus.ensure(corpus)
         
-        target_keys = keywords.get(dimension, [])
-        candidates = []
-        
-        for report in preprocessed_reports:
-            master_name = report.get('name', '未知大师')
-            
-            # 跳过已使用过的大师
-            if master_name in exclude_masters:
-                continue
-            
-            paragraphs = report.get('paragraphs', [])
-            
-            for para in paragraphs:
-                if len(para) < 15: 
-                    continue
-                
-                # 检查是否已被使用
-                if any(para[:50] in used for used in exclude_texts):
-                    continue
-                
-                # 不再计算分数，直接收集所有符合条件的候选者
-                # 分数逻辑已废弃，改用上层逻辑动态筛选
-                score = 0
-                has_year = year[:4] in para if year else False
-                key_count = sum(1 for k in target_keys if k in para)
-                
-                # 简单过滤：必须包含关键词或年份
-                if has_year or key_count > 0:
-                    score = 1 # 标记为有效
-                
-                if score > 0:
-                    candidates.append((score, para, master_name))
+        # 候选池按 (维度, 年份) 只构建一次；已使用的大师与文本作为排除条件
+        pool = corpus.candidate_pool(dimension, year)
+        available = pool.available(exclude_texts, exclude_masters)
         
-        if candidates:
-            # 不再按分数排序，保持原始顺序或随机
-            # 但为了 _extract_rich_description 的兼容性，这里暂时保留随机选择逻辑
-            
-            # 优化：先按大师分组，取每位大师的一条（随机），确保 Top N 来自不同大师
-            master_candidates = {}
-            for score, para, master_name in candidates:
-                if master_name not in master_candidates:
-                    master_candidates[master_name] = []
-                master_candidates[master_name].append((score, para, master_name))
-            
-            # 从每位大师的候选列表中随机选一条
-            unique_candidates = []
-            for m_name, m_list in master_candidates.items():
-                unique_candidates.append(random.choice(m_list))
-            
-            # 随机打乱顺序
-            random.shuffle(unique_candidates)
-            
-            # 只要有多个候选者，就尝试随机
-            # 此时 unique_candidates 中的每个元素都来自不同大师
-            if unique_candidates:
-                best_candidate = unique_candidates[0]
-                
-            full_text = best_candidate[1]
-            master_name = best_candidate[2]
+        if available:
+            # 先随机选一位大师，再从其候选中随机选一条，多次抽取尽量来自不同大师
+            master_name = self._rng.choice(list(available))
+            master_ids = available[master_name]
+            full_text = pool.entries[self._rng.choice(master_ids)][0]
             
             # 如果段落太短，尝试从同一位大师合并后续相关段落
             if len(full_text) < 200:
-                # 找到该大师的所有原始段落
-                original_paras = [c for c in candidates if c[2] == master_name]
-                for other_candidate in original_paras:
-                    if other_candidate[1] != full_text and other_candidate[1] not in full_text:
-                        full_text += " " + other_candidate[1]
+                for i in master_ids:
+                    para = pool.entries[i][0]
+                    if para != full_text and para not in full_text:
+                        full_text += " " + para
                         if len(full_text) >= 200:
                             break
             
@@ -790,17 +981,17 @@ class FortuneAggregator:
         # 如果没有找到新的大师，尝试从已排除的大师中找（兜底）
         if exclude_masters:
             logger.warning(f"未找到新的大师来源，尝试从已排除的大师中查找: {dimension}-{year}")
-            return self._extract_rich_description(preprocessed_reports, dimension, year, exclude_texts, [])
+            return self._extract_rich_description(corpus, dimension, year, exclude_texts, [])
         
         return "", "大师共鸣"
     
-    def _extract_multiple_descriptions(self, preprocessed_reports: List[Dict[str, Any]], dimension: str, year: str, count: int) -> List[tuple]:
+    def _extract_multiple_descriptions(self, corpus: ReportCorpus, dimension: str, year: str, count: int) -> List[tuple]:
         """从报告中提取多个不同的描述"""
         results = []
         exclude_texts = []
         
         for _ in range(count * 2):
-            desc, master = self._extract_rich_description(preprocessed_reports, dimension, year, exclude_texts)
+            desc, master = self._extract_rich_description(corpus, dimension, year, exclude_texts)
             if desc and desc not in exclude_texts:
                 results.append((desc, master))
                 exclude_texts.append(desc)
@@ -996,7 +1187,7 @@ class FortuneAggregator:
         
         return full_title
 
-    def _sanitize_result(self, result: Dict[str, Any], future_years: int, preprocessed_reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _sanitize_result(self, result: Dict[str, Any], future_years: int, corpus: ReportCorpus) -> Dict[str, Any]:
         """清洗和校验数据，确保节点数量、原文引用、年份覆盖等要求
         
         主要功能：
@@ -1008,7 +1199,8 @@ class FortuneAggregator:
         logger.info("="*60)
         logger.info("开始清洗和校验图谱数据...")
         logger.info(f"输入result keys: {list(result.keys())}")
-        logger.info(f"preprocessed_reports 长度: {len(preprocessed_reports)}")
+        corpus = ReportCorpus.ensure(corpus)
+        logger.info(f"报告数: {len(corpus)}，段落数: {len(corpus.paragraphs)}")
         
         current_year = datetime.datetime.now().year
         graph_data = result.get("graph_data", {"nodes": [], "edges": []})
@@ -1054,7 +1246,7 @@ class FortuneAggregator:
                 
                 # 提取更多内容，确保达到200字以上，排除已使用的大师
                 extra_desc, source_master = self._extract_rich_description(
-                    preprocessed_reports, dimension, year, 
+                    corpus, dimension, year, 
                     exclude_masters=used_masters_by_year_dim[key]
                 )
                 if extra_desc:
@@ -1065,7 +1257,7 @@ class FortuneAggregator:
                     # 如果提取的内容还不够长，尝试再提取一段（从其他大师）
                     if len(extra_desc) < 150:
                         extra_desc2, master2 = self._extract_rich_description(
-                            preprocessed_reports, dimension, year, 
+                            corpus, dimension, year, 
                             [extra_desc], used_masters_by_year_dim[key]
                         )
                         if extra_desc2:
@@ -1127,10 +1319,10 @@ class FortuneAggregator:
         logger.info(f"基础校验后节点数量: {len(valid_nodes)}")
         
         # 第二步：为节点附加原文引用
-        valid_nodes = self._attach_source_quotes(valid_nodes, preprocessed_reports)
+        valid_nodes = self._attach_source_quotes(valid_nodes, corpus)
         
         # 第三步：验证并补充节点数量（每年至少20个）
-        valid_nodes = self._verify_and_supplement_nodes(valid_nodes, future_years, preprocessed_reports)
+        valid_nodes = self._verify_and_supplement_nodes(valid_nodes, future_years, corpus)
         
         # 重建边（只保留两端节点都存在的边）
         valid_node_ids = {n["id"] for n in valid_nodes}
@@ -1216,24 +1408,21 @@ class FortuneAggregator:
         
         return edges
 
-    def _attach_source_quotes(self, nodes: List[Dict], preprocessed_reports: List[Dict]) -> List[Dict]:
+    def _attach_source_quotes(self, nodes: List[Dict], corpus: ReportCorpus) -> List[Dict]:
         """为每个节点附加原文引用
         
         Args:
             nodes: 节点列表
-            preprocessed_reports: 预处理后的报告列表
+            corpus: 报告语料
             
         Returns:
             附加了原文引用的节点列表
         """
         logger.info("开始为节点附加原文引用...")
         
-        # 构建大师名到内容的映射
-        master_content_map = {}
-        for report in preprocessed_reports:
-            master_name = report.get('name', '未知大师')
-            content = ' '.join(report.get('paragraphs', []))
-            master_content_map[master_name] = content
+        corpus = ReportCorpus.ensure(corpus)
+        # 每位大师的候选引用只计算一次，多个节点引用同一位大师时直接复用
+        quote_paragraphs: Dict[str, List[str]] = {}
         
         for node in nodes:
             props = node.get("properties", {})
@@ -1255,10 +1444,14 @@ class FortuneAggregator:
             
             # 尝试从大师内容中提取匹配的段落
             source_master = props.get("source_master", master_name)
-            if source_master in master_content_map:
-                content = master_content_map[source_master]
-                # 提取完整段落，不截断
-                paragraphs = [p.strip() for p in re.split(r'[。！？\n]', content) if len(p.strip()) >= 50]
+            if corpus.has_master(source_master):
+                paragraphs = quote_paragraphs.get(source_master)
+                if paragraphs is None:
+                    content = corpus.master_text(source_master)
+                    # 提取完整段落，不截断
+                    paragraphs = quote_paragraphs[source_master] = [
+                        p.strip() for p in re.split(r'[。！？\n]', content) if len(p.strip()) >= 50
+                    ]
                 if paragraphs:
                     # 选择最长的段落作为原文引用
                     best_para = max(paragraphs, key=len)
@@ -1277,11 +1470,19 @@ class FortuneAggregator:
         logger.info("原文引用附加完成")
         return nodes
 
+    @staticmethod
+    def _build_quote_index(nodes: List[Dict]) -> ContainmentIndex:
+        """节点原文引用的子串索引（与 any(q in n["properties"]["source_quote"] for n in nodes) 等价）"""
+        index = ContainmentIndex(prefix_len=50)
+        for node in nodes:
+            index.add(node.get("properties", {}).get("source_quote", ""))
+        return index
+
     def _verify_and_supplement_nodes(
         self, 
         nodes: List[Dict], 
         future_years: int, 
-        preprocessed_reports: List[Dict]
+        corpus: ReportCorpus
     ) -> List[Dict]:
         """验证节点数量并补充缺失的节点
         
@@ -1291,6 +1492,7 @@ class FortuneAggregator:
         3. 尽可能多地保留 unique 和 variable 节点
         """
         logger.info("开始验证并补充节点数量...")
+        corpus = ReportCorpus.ensure(corpus)
         
         current_year = datetime.datetime.now().year
         target_years = [f"{current_year + i}年" for i in range(future_years)]
@@ -1354,6 +1556,10 @@ class FortuneAggregator:
         # 之前可能因为 node_count 的分类导致部分节点丢失
         # 我们不再重置 nodes 列表，而是直接向其中添加新节点
         
+        # 已有节点的原文引用建立子串索引，新节点加入时同步登记；
+        # 判断候选段落是否重复（source_quote[:50] 出现在任一节点的引用中）不再逐个扫描节点
+        quote_index = self._build_quote_index(nodes)
+        
         for year in target_years:
             year_total = 0
             for dim in required_dims:
@@ -1371,7 +1577,7 @@ class FortuneAggregator:
                     logger.info(f"{year}-{dim} 缺少共识节点，正在补充...")
                     
                     desc, master = self._extract_rich_description(
-                        preprocessed_reports, dim, year, 
+                        corpus, dim, year, 
                         exclude_masters=used_masters_by_year_dim[key]
                     )
                     
@@ -1393,11 +1599,12 @@ class FortuneAggregator:
                             "source_master": master,
                             "school_source": "综合推演",
                             "type": "consensus",
-                            "impact": random.randint(6, 9),
+                            "impact": self._rng.randint(6, 9),
                             "dimension": dim
                         }
                     }
                     nodes.append(new_node)
+                    quote_index.add(source_quote)
                     node_id_counter += 1
                     dim_total += 1
                     year_total += 1
@@ -1408,7 +1615,7 @@ class FortuneAggregator:
                     logger.info(f"{year}-{dim} 节点较少({dim_total})，尝试补充 {needed} 个节点以达到饱和状态")
                     
                     # 尝试提取更多相关的段落
-                    all_candidates = self._extract_all_relevant_paragraphs(preprocessed_reports, dim, year)
+                    all_candidates = self._extract_all_relevant_paragraphs(corpus, dim, year)
                     # 按照长度排序，优先选择内容丰富的
                     all_candidates.sort(key=lambda x: len(x[0]), reverse=True)
                     
@@ -1419,12 +1626,11 @@ class FortuneAggregator:
                         
                         # 检查内容是否重复（与已有节点比较）
                         source_quote = para[:800] if len(para) > 800 else para
-                        if any(source_quote[:50] in n.get("properties", {}).get("source_quote", "") for n in nodes):
+                        if quote_index.contains(source_quote[:50]):
                             continue
 
                         # 简单判断是否为变数
-                        strict_variable_kws = ["若", "如果", "一旦", "除非", "取决于", "抉择", "变数", "转折点", "机遇与风险并存"]
-                        is_variable = any(kw in para for kw in strict_variable_kws)
+                        is_variable = classify_paragraph(para).variable
                         node_type = "variable" if is_variable else "unique"
                         
                         # 检查该维度的配额 (Unique 10, Variable 5)
@@ -1458,11 +1664,12 @@ class FortuneAggregator:
                                 "source_master": master_name,
                                 "school_source": "深度补充",
                                 "type": node_type,
-                                "impact": random.randint(5, 9),
+                                "impact": self._rng.randint(5, 9),
                                 "dimension": dim
                             }
                         }
                         nodes.append(new_node)
+                        quote_index.add(source_quote)
                         node_id_counter += 1
                         added += 1
                         dim_total += 1
@@ -1480,7 +1687,7 @@ class FortuneAggregator:
                 # 搜集所有该年份的候选段落
                 all_year_candidates = []
                 for d in required_dims:
-                    all_year_candidates.extend(self._extract_all_relevant_paragraphs(preprocessed_reports, d, year))
+                    all_year_candidates.extend(self._extract_all_relevant_paragraphs(corpus, d, year))
                 
                 all_year_candidates.sort(key=lambda x: len(x[0]), reverse=True)
                 
@@ -1489,15 +1696,11 @@ class FortuneAggregator:
                     if added >= remaining_needed: break
                     
                     source_quote = para[:800] if len(para) > 800 else para
-                    if any(source_quote[:50] in n.get("properties", {}).get("source_quote", "") for n in nodes):
+                    if quote_index.contains(source_quote[:50]):
                         continue
                         
                     # 识别维度
-                    dim = "career"
-                    for d_key, d_name in dim_names.items():
-                        if any(kw in para for kw in [d_name, d_key]):
-                            dim = d_key
-                            break
+                    dim = classify_paragraph(para).named_dimension
                     
                     new_node = {
                         "id": f"n{node_id_counter}",
@@ -1509,14 +1712,88 @@ class FortuneAggregator:
                             "source_quote": source_quote,
                             "source_master": master_name,
                             "type": "unique",
-                            "impact": random.randint(5, 7),
+                            "impact": self._rng.randint(5, 7),
                             "dimension": dim
                         }
                     }
                     nodes.append(new_node)
+                    quote_index.add(source_quote)
                     node_id_counter += 1
                     added += 1
                     year_total += 1
         
         logger.info(f"节点补充完成，当前总节点数: {len(nodes)}")
         return nodes
+
+
+class IncrementalAggregation:
+    """边接收大师报告边准备聚合
+
+    报告通过 add() 逐份加入 ReportAccumulator；已到达的报告数达到 quorum，
+    或推演开始 deadline 秒后已有过半报告时，立即按已有报告提交分年图谱生成，
+    与尾部较慢的大师并行执行。finish() 在全部报告到齐后完成聚合，迟到的报告在此并入。
+    quorum <= 0 或不小于 total 时不提前启动；deadline <= 0 表示不按时间触发。
+    """
+
+    def __init__(
+        self,
+        aggregator: FortuneAggregator,
+        user_data: Dict[str, Any],
+        total: int,
+        quorum: int = 0,
+        deadline: float = 0
+    ):
+        self.aggregator = aggregator
+        self.accumulator = ReportAccumulator(user_data)
+        self.total = total
+        # 确定性聚合要求分年图谱基于全部报告，不提前启动
+        self.quorum = quorum if 0 < quorum < total and not aggregator.deterministic else 0
+        self.min_reports = max(1, (total + 1) // 2)
+        self.year_jobs: Optional[Dict[concurrent.futures.Future, str]] = None
+        self.started_with = 0
+        self._deadline_passed = False
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        if deadline and deadline > 0 and not aggregator.deterministic:
+            self._timer = threading.Timer(deadline, self._on_deadline)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def add(self, agent_id: str, report: Dict[str, Any]) -> None:
+        self.accumulator.add(agent_id, report)
+        count = self.accumulator.count
+        if self.quorum and count >= self.quorum:
+            self._start(f"已有 {count}/{self.total} 位大师完成")
+        elif self._deadline_passed and count >= self.min_reports:
+            self._start(f"已到截止时间且有 {count}/{self.total} 位大师完成")
+
+    def _on_deadline(self) -> None:
+        self._deadline_passed = True
+        count = self.accumulator.count
+        if count >= self.min_reports:
+            self._start(f"已到截止时间且有 {count}/{self.total} 位大师完成")
+
+    def _start(self, reason: str) -> None:
+        with self._lock:
+            if self.year_jobs is not None or self.accumulator.count >= self.total:
+                return
+            self.started_with = self.accumulator.count
+            self.year_jobs = self.aggregator.submit_year_graphs(self.accumulator)
+        logger.info(f"{reason}，提前启动分年图谱生成")
+
+    @property
+    def started_early(self) -> bool:
+        return self.year_jobs is not None
+
+    def finish(self, on_progress: Optional[callable] = None) -> Dict[str, Any]:
+        """全部报告到齐后完成聚合；未提前启动时与 aggregate_reports 相同"""
+        if self._timer:
+            self._timer.cancel()
+        with self._lock:
+            year_jobs = self.year_jobs
+        if year_jobs is not None:
+            logger.info(
+                f"分年图谱基于 {self.started_with}/{self.total} 份报告提前生成，"
+                f"其余 {self.accumulator.count - self.started_with} 份在校验与补充阶段并入"
+            )
+        return self.aggregator.aggregate_accumulated(self.accumulator, year_jobs=year_jobs, on_progress=on_progress)
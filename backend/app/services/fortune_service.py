@@ -3,28 +3,158 @@
 负责 49 位大师 Agent 的并行调度与结果汇总
 """
 
+import asyncio
 import threading
+import time
 import concurrent.futures
 import json
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
 
-from ..utils.llm_client import LLMClient
+from ..config import Config
+from ..utils.cache import TieredCache
+from ..utils.async_runtime import get_async_runtime
+from ..utils.hedging import HedgeCancelled, HedgePolicy, HedgeRace
+from ..utils.llm_client import AsyncLLMClient, LLMClient
+from ..utils.llm_scheduler import LLMScheduler, get_llm_scheduler
+from ..utils.rate_limiter import get_rate_limit_stats
+from ..utils.single_flight import SingleFlight
 from ..utils.logger import get_logger
 from ..utils.fortune_utils import FortuneUtils
 from .fortune_agents import MASTER_PERSONAS, get_agent_system_prompt
+from .fortune_sessions import FINISHED_STATUSES, SessionStore, create_session_store
 
 logger = get_logger('wannian.fortune_service')
 
+# 大师推演失败时以该前缀开头的错误说明作为报告
+AGENT_ERROR_PREFIX = "推演过程中发生错误"
+
+class _PartialReport:
+    """流式生成中的大师报告；按 FORTUNE_STREAM_FLUSH_INTERVAL 节流写入会话存储（publish=False 时只拼接不写入）
+
+    session_ids 为接收中间结果的会话：合并推演时是参与同一推演的全部会话，生成期间可能有新的会话加入；
+    write 为执行写入的方式，默认在当前线程直接调用；异步编排传入会话写入队列，避免阻塞事件循环
+    """
+
+    def __init__(
+        self,
+        sessions: SessionStore,
+        session_ids: List[str],
+        persona: Dict[str, Any],
+        publish: bool = True,
+        write: Optional[Callable[..., Any]] = None
+    ):
+        self.sessions = sessions
+        self.session_ids = session_ids
+        self.persona = persona
+        self.publish = publish
+        self._write = write or (lambda method, *args: method(*args))
+        self._parts: List[str] = []
+        self._flushed_at = 0.0
+
+    def append(self, delta: str) -> None:
+        self._parts.append(delta)
+        if not self.publish:
+            return
+        now = time.monotonic()
+        if now - self._flushed_at >= Config.FORTUNE_STREAM_FLUSH_INTERVAL:
+            self._flushed_at = now
+            report = {"name": self.persona["name"], "content": self.text()}
+            for session_id in list(self.session_ids):
+                self._write(self.sessions.update_partial_report, session_id, self.persona["id"], report)
+
+    def text(self) -> str:
+        return "".join(self._parts)
+
+
 class FortuneService:
     """命理服务调度器"""
     
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        agent_cache: Optional[TieredCache] = None,
+        session_store: Optional[SessionStore] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        result_cache: Optional[TieredCache] = None
+    ):
         self.llm = llm_client or LLMClient()
-        self.sessions: Dict[str, Dict[str, Any]] = {}
-        # 添加简单的内存缓存，避免重复计算
+        # 所有 LLM 调用经由进程级调度器执行：全局并发上限，多个会话之间轮转排队
+        self.scheduler = scheduler or get_llm_scheduler()
+        # FORTUNE_ORCHESTRATION=async 时使用的异步客户端（首次使用时创建）
+        self._async_llm: Optional[AsyncLLMClient] = None
+        # 会话协调线程（等待大师结果、触发聚合）数量有上限，超出的会话排队等待
+        self._coordinators = concurrent.futures.ThreadPoolExecutor(
+            max_workers=Config.FORTUNE_MAX_ACTIVE_SESSIONS, thread_name_prefix="fortune-session"
+        )
+        # 异步编排下的会话写入队列：单线程按提交顺序执行存储写入，事件循环不等待磁盘 I/O
+        self._session_writer = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="fortune-session-writer"
+        )
+        # 推演会话状态：sqlite 后端可由多个 worker 进程共享；memory 后端结束后按 TTL / 容量移出内存并转存磁盘
+        self.sessions = session_store or create_session_store()
+        # 大师报告缓存，避免重复计算（按字节数 LRU 淘汰、按 TTL 过期，可选磁盘层跨重启保留）
         # Key: md5(agent_id + sorted_input_json), Value: report_str
-        self.agent_cache: Dict[str, str] = {}
+        self.agent_cache = agent_cache or TieredCache(
+            max_bytes=Config.FORTUNE_CACHE_MAX_BYTES,
+            ttl=Config.FORTUNE_CACHE_TTL,
+            disk_path=Config.FORTUNE_CACHE_PATH
+        )
+        # 进行中的大师推演按报告缓存 key 合并（LLM_SINGLE_FLIGHT）：不同会话同时推演相同输入时每位大师只调用一次 LLM
+        # 合并发生在提交给调度器之前，等待方不占用执行槽；流式中间结果写入参与同一推演的全部会话
+        self.agent_flights = SingleFlight("fortune_agents")
+        # 报告缓存 key -> 参与该推演的会话 id（执行者与等待者）
+        self._flight_sessions: Dict[str, List[str]] = {}
+        self._flight_lock = threading.Lock()
+        # 整场推演结果缓存（FORTUNE_RESULT_CACHE）：相同输入直接返回已完成的会话
+        # Key: md5("session:<当前年份>" + sorted_input_json)，Value: {"reports": ..., "summary": ...} 的 JSON
+        self.result_cache = result_cache or TieredCache(
+            max_bytes=Config.FORTUNE_RESULT_CACHE_MAX_BYTES,
+            ttl=Config.FORTUNE_RESULT_CACHE_TTL
+        )
+        # 进行中的推演：结果缓存 key -> 会话 id，相同输入的并发请求合并到同一个会话
+        self._inflight: Dict[str, str] = {}
+        self._inflight_lock = threading.Lock()
+        # 确定性聚合（FORTUNE_DETERMINISTIC_AGGREGATION）的结果缓存：相同输入与报告直接返回已聚合的图谱
+        self.aggregation_cache = TieredCache(
+            max_bytes=Config.FORTUNE_AGGREGATION_CACHE_MAX_BYTES,
+            ttl=Config.FORTUNE_AGGREGATION_CACHE_TTL
+        )
+        # 慢请求对冲（FORTUNE_HEDGE）：按近期大师耗时决定何时补发请求
+        self.hedging = HedgePolicy(
+            soft_deadline=Config.FORTUNE_AGENT_SOFT_DEADLINE,
+            hard_deadline=Config.FORTUNE_AGENT_HARD_DEADLINE,
+            percentile=Config.FORTUNE_HEDGE_PERCENTILE,
+            min_delay=Config.FORTUNE_HEDGE_MIN_DELAY
+        )
+        self._start_orphan_watcher()
+
+    def _start_orphan_watcher(self) -> None:
+        """定期接管遗留的未完成会话（执行它们的进程已退出），在本进程中继续推演"""
+        if self.sessions.name == "memory":
+            return
+
+        def watch():
+            while True:
+                try:
+                    self.resume_orphaned_sessions()
+                except Exception as e:
+                    logger.error(f"接管遗留会话失败: {str(e)}")
+                time.sleep(Config.FORTUNE_SESSION_STALE_SECONDS)
+
+        threading.Thread(target=watch, name="fortune-orphan-watcher", daemon=True).start()
+
+    def resume_orphaned_sessions(self) -> List[str]:
+        """接管并继续执行遗留会话，已完成的大师报告不会重复推演"""
+        resumed = []
+        for session in self.sessions.claim_orphaned():
+            session_id = session.get("id")
+            normalized_data = session.get("input") or {}
+            done_agents = set((session.get("reports") or {}).keys())
+            logger.info(f"[推演任务 {session_id}] 接管遗留会话，已有 {len(done_agents)} 份报告")
+            self._start_session(session_id, normalized_data, session.get("future_years") or 3, done_agents)
+            resumed.append(session_id)
+        return resumed
     
     def _get_cache_key(self, agent_id: str, input_data: Dict[str, Any]) -> str:
         """生成缓存键"""
@@ -52,7 +182,11 @@ class FortuneService:
     ) -> Dict[str, Any]:
         """
         开始 49 位大师的并行推演
+
+        开启 FORTUNE_RESULT_CACHE 时，相同输入命中结果缓存则直接创建已完成的会话；
+        未指定 session_id 且相同输入的推演正在进行时，返回进行中的会话 id，不再重复推演
         """
+        requested_session_id = session_id
         if not session_id:
             import uuid
             session_id = f"fate_{uuid.uuid4().hex[:12]}"
@@ -66,169 +200,918 @@ class FortuneService:
         if "error" in normalized_data:
             return {"success": False, "error": normalized_data["error"]}
         
-        self.sessions[session_id] = {
+        result_key = self._session_cache_key(normalized_data)
+        if Config.FORTUNE_RESULT_CACHE:
+            cached = self._create_cached_session(session_id, result_key, normalized_data, future_years)
+            if cached is not None:
+                return cached
+            if not requested_session_id:
+                with self._inflight_lock:
+                    leader = self._inflight.get(result_key)
+                    if leader is None:
+                        self._inflight[result_key] = session_id
+                if leader is not None:
+                    logger.info(f"[推演任务 {leader}] 相同输入的推演正在进行，合并请求")
+                    return {
+                        "success": True,
+                        "session_id": leader,
+                        "status": "processing",
+                        "message": "相同命盘的推演正在进行，已合并到该任务，请稍后查询结果"
+                    }
+        
+        try:
+            self.sessions.create(session_id, {
+                "status": "processing",
+                "status_msg": "正在初始化推演序列...",
+                "input": normalized_data,
+                "reports": {},
+                "summary": None,
+                "created_at": datetime.now().isoformat(),
+                "progress": 0,
+                "future_years": future_years
+            })
+
+            # 2. 后台并行请求 49 位大师，报告达到 quorum 后即提前开始分年图谱生成
+            self._start_session(session_id, normalized_data, future_years)
+        except Exception:
+            # 会话未能启动，解除合并登记，否则相同输入的请求会一直合并到这个不存在的会话
+            self._release_inflight(result_key, session_id)
+            raise
+        
+        return {
+            "success": True,
+            "session_id": session_id,
             "status": "processing",
-            "status_msg": "正在初始化推演序列...",
+            "message": "49位大师已开始并行推演，多数大师完成后即开始绘制图谱，请稍后查询结果"
+        }
+
+    def _session_cache_key(self, normalized_data: Dict[str, Any]) -> str:
+        """整场推演的结果缓存 key；推演年份从当前年份起算，跨年后不再命中"""
+        return self._get_cache_key(f"session:{datetime.now().year}", normalized_data)
+
+    def _create_cached_session(
+        self,
+        session_id: str,
+        result_key: str,
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ) -> Optional[Dict[str, Any]]:
+        """命中结果缓存时创建已完成的会话并返回响应，未命中返回 None"""
+        cached = self.result_cache.get(result_key)
+        if cached is None:
+            return None
+        result = json.loads(cached)
+        self.sessions.create(session_id, {
+            "status": "completed",
+            "status_msg": "天机已现，全案推演编撰完成",
             "input": normalized_data,
-            "reports": {},
-            "summary": None,
+            "reports": result["reports"],
+            "summary": result["summary"],
             "created_at": datetime.now().isoformat(),
-            "progress": 0,
+            "progress": 100,
             "future_years": future_years
+        })
+        self.sessions.finish(session_id, summary=result["summary"], status="completed")
+        logger.info(f"[推演任务 {session_id}] 命中推演结果缓存，直接完成")
+        return {
+            "success": True,
+            "session_id": session_id,
+            "status": "completed",
+            "message": "相同命盘已有推演结果，直接返回"
         }
+
+    def _session_done(self, session_id: str, normalized_data: Dict[str, Any]) -> None:
+        """推演结束：49 位大师全部成功且聚合完成时写入结果缓存（含失败大师的结果不缓存），然后解除进行中的合并"""
+        result_key = self._session_cache_key(normalized_data)
+        try:
+            if Config.FORTUNE_RESULT_CACHE:
+                session = self.sessions.get(session_id)
+                if (
+                    session
+                    and session.get("status") == "completed"
+                    and session.get("summary")
+                    and len(session.get("reports") or {}) == len(MASTER_PERSONAS)
+                    and not any(
+                        (r.get("content") or "").startswith(AGENT_ERROR_PREFIX) for r in session["reports"].values()
+                    )
+                ):
+                    self.result_cache.set(result_key, json.dumps(
+                        {"reports": session["reports"], "summary": session["summary"]}, ensure_ascii=False
+                    ))
+        except Exception as e:
+            logger.error(f"[推演任务 {session_id}] 写入推演结果缓存失败: {str(e)}")
+        finally:
+            self._release_inflight(result_key, session_id)
+
+    def _release_inflight(self, result_key: str, session_id: str) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(result_key) == session_id:
+                del self._inflight[result_key]
+
+    @staticmethod
+    def _agent_messages(
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ) -> List[Dict[str, str]]:
+        system_prompt = get_agent_system_prompt(persona["id"])
         
-        # 2. 并行请求 49 位大师
-        def run_agent_task(persona: Dict[str, Any]):
-            try:
+        # 填充变量
+        for key, value in normalized_data.items():
+            system_prompt = system_prompt.replace(f"{{{{{key}}}}}", str(value))
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"请根据我的出生信息进行深度推演，并重点预测未来 {future_years} 年的运势走向。"}
+        ]
+
+    def _run_agent_task(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        flight: Optional[concurrent.futures.Future] = None
+    ):
+        """单个大师的推演，返回 (agent_id, agent_name, report)"""
+        try:
+            return self._agent_attempt(session_id, persona, normalized_data, future_years, flight=flight)
+        except Exception as e:
+            logger.error(f"Agent {persona['id']} 推演失败: {str(e)}")
+            return persona["id"], persona["name"], f"{AGENT_ERROR_PREFIX}: {str(e)}"
+
+    def _agent_attempt(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        race: Optional[HedgeRace] = None,
+        hedge: bool = False,
+        flight: Optional[concurrent.futures.Future] = None
+    ):
+        """一次大师推演，失败时抛出异常
+
+        race 不为空时属于对冲竞争：hedge=False 为主请求，hedge=True 为发往加速端点的对冲请求
+        （不写中间结果）；另一份请求胜出后在下一个增量处抛出 HedgeCancelled。
+        flight 为本会话作为执行者登记的合并推演（见 _coalesce），结束时把结果或异常交给等待的会话。
+        """
+        cache_key = self._get_cache_key(persona["id"], normalized_data)
+        try:
+            if race is not None and race.cancelled.is_set():
+                raise HedgeCancelled()
+            report = None
+            if not hedge:
+                if race is not None:
+                    race.started_at = time.monotonic()
                 # 检查缓存
-                cache_key = self._get_cache_key(persona["id"], normalized_data)
-                if cache_key in self.agent_cache:
-                    return persona["id"], persona["name"], self.agent_cache[cache_key]
-
-                self.sessions[session_id]["status_msg"] = f"大师 {persona['name']} 正在接入星盘..."
-                system_prompt = get_agent_system_prompt(persona["id"])
-                
-                # 填充变量
-                for key, value in normalized_data.items():
-                    system_prompt = system_prompt.replace(f"{{{{{key}}}}}", str(value))
-                
-                messages = [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"请根据我的出生信息进行深度推演，并重点预测未来 {future_years} 年的运势走向。"}
-                ]
-                
-                report = self.llm.chat(messages, temperature=0.7)
-                
-                # 写入缓存
-                self.agent_cache[cache_key] = report
-                
-                return persona["id"], persona["name"], report
-            except Exception as e:
-                logger.error(f"Agent {persona['id']} 推演失败: {str(e)}")
-                return persona["id"], persona["name"], f"推演过程中发生错误: {str(e)}"
-
-        def background_execution():
-            # 增加并发数到 49，实现真正意义上的全大师并行
-            # 49位大师同时推演，将第一阶段耗时压缩到单次LLM调用的时间
-            with concurrent.futures.ThreadPoolExecutor(max_workers=49) as executor:
-                future_to_agent = {executor.submit(run_agent_task, p): p for p in MASTER_PERSONAS}
-                
-                completed = 0
-                failed = 0
-                total_masters = len(MASTER_PERSONAS)
-                total_futures = len(future_to_agent)
-                
-                logger.info(f"[推演任务 {session_id}] 已提交 {total_futures} 个任务，开始等待完成...")
-                
-                # 等待所有 49 位大师完成，不设置超时
-                # 重要：必须等待49位大师全部完成后才能绘制图谱和生成报告
-                for future in concurrent.futures.as_completed(future_to_agent):
-                    persona = future_to_agent[future]
-                    try:
-                        agent_id, agent_name, report = future.result()
-                        self.sessions[session_id]["reports"][agent_id] = {
-                            "name": agent_name,
-                            "content": report
-                        }
-                        completed += 1
-                        logger.debug(f"[{session_id}] 大师 {agent_name} 完成 ({completed}/{total_masters})")
-                    except Exception as e:
-                        failed += 1
-                        logger.error(f"[{session_id}] 大师 {persona['name']} 推演失败: {e}")
-                    
-                    # 推演阶段占 90% 进度
-                    total_done = completed + failed
-                    self.sessions[session_id]["progress"] = int((total_done / total_masters) * 90)
-                    self.sessions[session_id]["status_msg"] = f"已完成 {total_done}/{total_masters} 位大师的推演..."
-                
-                # 确认所有49位大师都已完成
-                final_count = completed + failed
-                logger.info(f"[推演任务 {session_id}] for循环结束，成功: {completed}，失败: {failed}，总计: {final_count}/{total_masters}")
-                
-                # 如果实际完成数小于总数，等待剩余的 future 完成
-                if final_count < total_masters:
-                    logger.warning(f"[推演任务 {session_id}] 警告：实际完成数({final_count})小于总数({total_masters})，尝试等待剩余任务...")
-                    
-                    # 显式等待所有未完成的 future
-                    for future, persona in future_to_agent.items():
-                        if not future.done():
-                            logger.info(f"[推演任务 {session_id}] 等待未完成的大师: {persona['name']}")
-                            try:
-                                agent_id, agent_name, report = future.result(timeout=120)  # 最多等待2分钟
-                                self.sessions[session_id]["reports"][agent_id] = {
-                                    "name": agent_name,
-                                    "content": report
-                                }
-                                completed += 1
-                            except Exception as e:
-                                failed += 1
-                                logger.error(f"[推演任务 {session_id}] 大师 {persona['name']} 最终失败: {e}")
-                    
-                    final_count = completed + failed
-                    logger.info(f"[推演任务 {session_id}] 二次等待后，成功: {completed}，失败: {failed}，总计: {final_count}/{total_masters}")
-                
-                logger.info(f"推演任务 {session_id}: 所有 {total_masters} 位大师已完成，开始图谱绘制")
-                self.sessions[session_id]["status_msg"] = f"{total_masters}位大师推演完毕，正在启动图谱绘制..."
-                self.sessions[session_id]["progress"] = 90
-                
-            # 3. 触发聚合
-            try:
-                self.sessions[session_id]["status"] = "aggregating"
-                from .fortune_aggregator import FortuneAggregator
-                aggregator = FortuneAggregator(self.llm)
-                
-                def update_aggregator_progress(p, msg):
-                    self.sessions[session_id]["progress"] = p
-                    self.sessions[session_id]["status_msg"] = msg
-                
-                summary = aggregator.aggregate_reports(
-                    normalized_data, 
-                    self.sessions[session_id]["reports"],
-                    on_progress=update_aggregator_progress
+                report = self.agent_cache.get(cache_key)
+                if report is not None and race is not None:
+                    race.cached = True
+            if report is None:
+                if not hedge:
+                    self.sessions.update(session_id, status_msg=f"大师 {persona['name']} 正在接入星盘...")
+                report = self._generate_report(
+                    session_id, persona, normalized_data, future_years, cache_key, race, hedge,
+                    publish_to=self._flight_sessions.get(cache_key) if flight is not None else None
                 )
-                
-                # 调试日志：确认聚合返回数据
-                logger.info(f"[{session_id}] 聚合返回类型: {type(summary)}, keys: {list(summary.keys()) if isinstance(summary, dict) else 'N/A'}")
-                if isinstance(summary, dict):
-                    logger.info(f"[{session_id}] summary_text 存在: {'summary_text' in summary}, 长度: {len(summary.get('summary_text', '')) if summary.get('summary_text') else 0}")
-                
-                self.sessions[session_id]["summary"] = summary
-                self.sessions[session_id]["status"] = "completed"
-                logger.info(f"[{session_id}] 已设置 session summary, 状态: completed")
+        except BaseException as e:
+            if flight is not None:
+                self._end_flight(cache_key, session_id, flight, error=e)
+            raise
+        if flight is not None:
+            self._end_flight(cache_key, session_id, flight, report)
+        return persona["id"], persona["name"], report
+
+    def _generate_report(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        cache_key: str,
+        race: Optional[HedgeRace] = None,
+        hedge: bool = False,
+        publish_to: Optional[List[str]] = None
+    ) -> str:
+        """调用 LLM 生成大师报告并写入缓存；流式中间结果写入 publish_to 中的会话（默认只写本会话）"""
+        messages = self._agent_messages(persona, normalized_data, future_years)
+        if Config.LLM_STREAM:
+            report = self._collect_stream(
+                publish_to or [session_id], persona,
+                self.llm.chat_stream(messages, temperature=0.7, use_boost=hedge),
+                cancelled=race.cancelled if race is not None else None,
+                publish=not hedge
+            )
+        else:
+            report = self.llm.chat(messages, temperature=0.7, use_boost=hedge)
+        if race is not None and race.cancelled.is_set():
+            raise HedgeCancelled()
+
+        # 写入缓存（空结果不缓存）
+        if report:
+            self.agent_cache.set(cache_key, report)
+
+        return report
+
+    def _collect_stream(
+        self,
+        session_ids: List[str],
+        persona: Dict[str, Any],
+        stream,
+        cancelled: Optional[threading.Event] = None,
+        publish: bool = True
+    ) -> str:
+        """拼接流式输出，期间把已生成的内容写入各会话的 partial_reports（publish=False 时不写）"""
+        partial = _PartialReport(self.sessions, session_ids, persona, publish=publish)
+        try:
+            for delta in stream:
+                if cancelled is not None and cancelled.is_set():
+                    raise HedgeCancelled()
+                partial.append(delta)
+        finally:
+            # 提前结束时关闭生成器，释放连接与限流额度
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        return partial.text()
+
+    def _join_flight_sessions(self, cache_key: str, session_id: str) -> List[str]:
+        """登记会话参与 cache_key 的推演，返回参与该推演的全部会话（执行者据此写入流式中间结果）"""
+        with self._flight_lock:
+            sessions = self._flight_sessions.setdefault(cache_key, [])
+            sessions.append(session_id)
+            return sessions
+
+    def _leave_flight_sessions(self, cache_key: str, session_id: str) -> None:
+        with self._flight_lock:
+            sessions = self._flight_sessions.get(cache_key)
+            if sessions is not None and session_id in sessions:
+                sessions.remove(session_id)
+                if not sessions:
+                    del self._flight_sessions[cache_key]
+
+    def _end_flight(
+        self,
+        cache_key: str,
+        session_id: str,
+        flight: concurrent.futures.Future,
+        report: Optional[str] = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        self._leave_flight_sessions(cache_key, session_id)
+        self.agent_flights.end(cache_key, flight, report, error)
+
+    def _coalesce(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ):
+        """提交给调度器之前合并相同的大师推演（LLM_SINGLE_FLIGHT），返回 (flight, shared)
+
+        本会话成为执行者时返回 flight，交给推演任务在结束时登记结果；
+        其他会话正在推演同一位大师的相同输入时返回 shared：结果为 (agent_id, agent_name, report) 的 future，
+        等待期间不占用调度器执行槽。对方失败或被取消（如对冲落选、超过硬截止）时先查缓存，未命中再重新提交。
+        未开启合并时两者均为 None。
+        """
+        if not Config.LLM_SINGLE_FLIGHT:
+            return None, None
+        cache_key = self._get_cache_key(persona["id"], normalized_data)
+        self._join_flight_sessions(cache_key, session_id)
+        flight, leader = self.agent_flights.begin(cache_key)
+        if leader:
+            return flight, None
+
+        logger.info(f"[推演任务 {session_id}] 大师 {persona['name']} 与进行中的相同推演合并，等待共享其结果")
+        shared = concurrent.futures.Future()
+
+        def forward(future: concurrent.futures.Future) -> None:
+            if future.cancelled():
+                shared.set_result((persona["id"], persona["name"], f"{AGENT_ERROR_PREFIX}: 推演已取消"))
+            else:
+                shared.set_result(future.result())
+
+        def on_done(future: concurrent.futures.Future) -> None:
+            self._leave_flight_sessions(cache_key, session_id)
+            error = future.exception()
+            if error is None:
+                shared.set_result((persona["id"], persona["name"], future.result()))
+                return
+            # 对冲落选的一方被取消时胜出的报告已写入缓存
+            cached = self.agent_cache.get(cache_key)
+            if cached is not None:
+                shared.set_result((persona["id"], persona["name"], cached))
+                return
+            self.agent_flights.note_retry(cache_key)
+            self._submit_agent(session_id, persona, normalized_data, future_years).add_done_callback(forward)
+
+        flight.add_done_callback(on_done)
+        return None, shared
+
+    def _submit_agent(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ) -> concurrent.futures.Future:
+        """非对冲模式下提交一位大师的推演，返回结果为 (agent_id, agent_name, report) 的 future"""
+        flight, shared = self._coalesce(session_id, persona, normalized_data, future_years)
+        if shared is not None:
+            return shared
+        future = self.scheduler.submit(
+            session_id, self._run_agent_task, session_id, persona, normalized_data, future_years, flight
+        )
+        self._end_flight_if_cancelled(future, session_id, persona, normalized_data, flight)
+        return future
+
+    def _end_flight_if_cancelled(
+        self,
+        future: concurrent.futures.Future,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        flight: Optional[concurrent.futures.Future]
+    ) -> None:
+        """执行者的任务在开始前被取消时同样结束合并，等待的会话不会一直挂起"""
+        if flight is None:
+            return
+        cache_key = self._get_cache_key(persona["id"], normalized_data)
+
+        def on_done(f: concurrent.futures.Future) -> None:
+            if f.cancelled():
+                self._end_flight(cache_key, session_id, flight, error=concurrent.futures.CancelledError())
+
+        future.add_done_callback(on_done)
+
+    @staticmethod
+    def _error_result(persona: Dict[str, Any], error: Any) -> concurrent.futures.Future:
+        """与 _run_agent_task 一致：失败的大师以错误说明作为报告"""
+        future = concurrent.futures.Future()
+        future.set_result((persona["id"], persona["name"], f"{AGENT_ERROR_PREFIX}: {str(error)}"))
+        return future
+
+    def _hedged_results(
+        self,
+        session_id: str,
+        pending: List[Dict[str, Any]],
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ):
+        """对冲模式：逐个产出 (persona, 已完成的 future)
+
+        主请求运行超过对冲延迟仍未返回时，以 "<session_id>:hedge" 为 key 向加速端点补发一份，
+        先成功返回者胜出，另一份收到取消信号；运行超过硬截止时间的大师记为失败，不再等待。
+        任务直接提交给调度器而不经 KeyedExecutor，落选的请求不会拖住会话。
+        与其他会话合并的大师（见 _coalesce）只等待对方的结果，不计入耗时统计，也不对冲。
+        """
+        policy = self.hedging
+        races: Dict[str, Any] = {}
+        attempts: Dict[concurrent.futures.Future, Any] = {}
+
+        def submit(persona, race, hedge, flight=None):
+            key = f"{session_id}:hedge" if hedge else session_id
+            future = self.scheduler.submit(
+                key, self._agent_attempt, session_id, persona, normalized_data, future_years, race, hedge, flight
+            )
+            self._end_flight_if_cancelled(future, session_id, persona, normalized_data, flight)
+            race.futures.append(future)
+            attempts[future] = (persona, race, "boost" if hedge else "main")
+
+        hedged: List[str] = []
+        for persona in pending:
+            race = HedgeRace()
+            races[persona["id"]] = (persona, race)
+            flight, shared = self._coalesce(session_id, persona, normalized_data, future_years)
+            if shared is not None:
+                race.cached = True
+                attempts[shared] = (persona, race, "shared")
+            else:
+                submit(persona, race, False, flight)
+
+        while races:
+            delay = policy.hedge_delay()
+            now = time.monotonic()
+            # 等到下一个需要对冲或超过硬截止的时间点（仍在排队的大师尚无开始时间，按 0.5 秒轮询）
+            timeout = 0.5
+            for persona, race in races.values():
+                if race.started_at is None:
+                    continue
+                if not race.hedged:
+                    timeout = min(timeout, race.started_at + delay - now)
+                if policy.hard_deadline:
+                    timeout = min(timeout, race.started_at + policy.hard_deadline - now)
+            done, _ = concurrent.futures.wait(
+                list(attempts), timeout=max(timeout, 0.01), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            # 同一批完成的尝试里先处理成功的，避免失败的一份抢先定局
+            for future in sorted(done, key=lambda f: f.cancelled() or f.exception() is not None):
+                persona, race, label = attempts.pop(future)
+                if race.winner or future.cancelled():
+                    continue
+                error = future.exception()
+                if error is not None and race.in_flight:
+                    logger.warning(f"[{session_id}] 大师 {persona['name']} 的 {label} 请求失败，等待另一份请求: {error}")
+                    continue
+                race.settle(label)
+                del races[persona["id"]]
+                if error is None and not race.cached:
+                    policy.record(time.monotonic() - race.started_at)
+                elif error is not None:
+                    logger.error(f"Agent {persona['id']} 推演失败: {str(error)}")
+                    future = self._error_result(persona, error)
+                if race.hedged:
+                    policy.note(
+                        "hedge_wins" if label == "boost" else "primary_wins",
+                        session_id=session_id, agent_id=persona["id"], name=persona["name"], winner=label
+                    )
+                yield persona, future
+
+            now = time.monotonic()
+            for agent_id, (persona, race) in list(races.items()):
+                if race.started_at is None:
+                    continue
+                elapsed = now - race.started_at
+                if policy.hard_deadline and elapsed >= policy.hard_deadline:
+                    race.settle("deadline")
+                    del races[agent_id]
+                    policy.note("deadline_exceeded", session_id=session_id, agent_id=agent_id, name=persona["name"])
+                    logger.warning(f"[{session_id}] 大师 {persona['name']} 超过 {policy.hard_deadline:.0f} 秒未返回，不再等待")
+                    yield persona, self._error_result(persona, f"超过 {policy.hard_deadline:.0f} 秒未返回")
+                elif not race.hedged and elapsed >= delay:
+                    race.hedged = True
+                    hedged.append(persona["name"])
+                    policy.note(
+                        "hedged", session_id=session_id, agent_id=agent_id, name=persona["name"],
+                        after_seconds=round(elapsed, 3)
+                    )
+                    logger.info(f"[{session_id}] 大师 {persona['name']} 已运行 {elapsed:.1f} 秒（对冲阈值 {delay:.1f} 秒），补发对冲请求")
+                    submit(persona, race, True)
+
+        if hedged:
+            logger.info(f"[{session_id}] 本次推演对冲了 {len(hedged)} 位大师: {', '.join(hedged)}")
+
+    def _start_session(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        """按 FORTUNE_ORCHESTRATION 选择线程编排或异步编排
+
+        两种编排都先占用一个协调名额（FORTUNE_MAX_ACTIVE_SESSIONS），超出的会话排队等待；
+        提交前 attach 会话（排队等待协调线程期间同样刷新心跳，避免被其他进程重复接管），
+        协调结束后在 _run_session / _run_session_async 的 finally 中 detach
+        """
+        self.sessions.attach(session_id)
+        try:
+            if Config.FORTUNE_ORCHESTRATION == "async":
+                self._coordinators.submit(
+                    self._run_session_in_runtime, session_id, normalized_data, future_years, done_agents
+                )
+            else:
+                self._coordinators.submit(self._run_session, session_id, normalized_data, future_years, done_agents)
+        except Exception:
+            self.sessions.detach(session_id)
+            raise
+
+    def _run_session(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        try:
+            self._execute_session(session_id, normalized_data, future_years, done_agents)
+        finally:
+            self.sessions.detach(session_id)
+            self._session_done(session_id, normalized_data)
+
+    def _run_session_in_runtime(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        """异步编排：在协调名额内把会话交给异步运行时执行，直到会话结束才归还名额"""
+        get_async_runtime().run(self._run_session_async(session_id, normalized_data, future_years, done_agents))
+
+    async def _run_session_async(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        try:
+            await self._execute_session_async(session_id, normalized_data, future_years, done_agents)
+        finally:
+            self.sessions.detach(session_id)
+            await self._write_session(self._session_done, session_id, normalized_data)
+
+    def _queue_session_write(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> concurrent.futures.Future:
+        """把会话存储写入排入写入队列（不等待）；同一队列内按提交顺序执行，失败只记录日志"""
+        future = self._session_writer.submit(method, *args, **kwargs)
+
+        def log_error(f: concurrent.futures.Future) -> None:
+            if not f.cancelled() and f.exception() is not None:
+                logger.error(f"会话写入失败: {str(f.exception())}")
+
+        future.add_done_callback(log_error)
+        return future
+
+    async def _write_session(self, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """经写入队列执行并等待完成，排在此前已入队的写入之后"""
+        return await asyncio.wrap_future(self._session_writer.submit(method, *args, **kwargs))
+
+    async def _run_agent_task_async(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int
+    ):
+        """_run_agent_task 的异步版本"""
+        try:
+            cache_key = self._get_cache_key(persona["id"], normalized_data)
+            # 缓存可能有磁盘层，与会话写入一样不在事件循环上执行
+            cached = await asyncio.to_thread(self.agent_cache.get, cache_key)
+            if cached is not None:
+                return persona["id"], persona["name"], cached
+
+            self._queue_session_write(self.sessions.update, session_id, status_msg=f"大师 {persona['name']} 正在接入星盘...")
+            if Config.LLM_SINGLE_FLIGHT:
+                # 等待方是协程，不占用调度器执行槽；执行者的流式中间结果同样写入等待的会话
+                sessions = self._join_flight_sessions(cache_key, session_id)
+                try:
+                    report, shared = await self.agent_flights.do_async(
+                        cache_key, self._generate_report_async, session_id, persona, normalized_data, future_years,
+                        cache_key, sessions
+                    )
+                finally:
+                    self._leave_flight_sessions(cache_key, session_id)
+                if shared:
+                    logger.info(f"[推演任务 {session_id}] 大师 {persona['name']} 与进行中的相同推演合并，共享其结果")
+            else:
+                report = await self._generate_report_async(session_id, persona, normalized_data, future_years, cache_key)
+
+            return persona["id"], persona["name"], report
+        except Exception as e:
+            logger.error(f"Agent {persona['id']} 推演失败: {str(e)}")
+            return persona["id"], persona["name"], f"{AGENT_ERROR_PREFIX}: {str(e)}"
+
+    async def _generate_report_async(
+        self,
+        session_id: str,
+        persona: Dict[str, Any],
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        cache_key: str,
+        publish_to: Optional[List[str]] = None
+    ) -> str:
+        """_generate_report 的异步版本；LLM 调用经调度器排队，与线程编排共享全局并发上限与按会话轮转"""
+        messages = self._agent_messages(persona, normalized_data, future_years)
+        if Config.LLM_STREAM:
+            partial = _PartialReport(
+                self.sessions, publish_to or [session_id], persona, write=self._queue_session_write
+            )
+
+            async def consume() -> str:
+                async for delta in self._get_async_llm().chat_stream(messages, temperature=0.7):
+                    partial.append(delta)
+                return partial.text()
+
+            report = await self.scheduler.run_async(session_id, consume)
+        else:
+            report = await self.scheduler.run_async(session_id, self._get_async_llm().chat, messages, temperature=0.7)
+
+        if report:
+            await asyncio.to_thread(self.agent_cache.set, cache_key, report)
+        return report
+
+    async def _execute_session_async(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        """_execute_session 的异步版本：49 位大师与分年图谱的 LLM 调用都在同一个事件循环上并发执行，
+        并经调度器排队（全局并发上限、按会话轮转）"""
+        done_agents = done_agents or set()
+        pending = [p for p in MASTER_PERSONAS if p["id"] not in done_agents]
+        total_masters = len(MASTER_PERSONAS)
+        completed = len(done_agents)
+        logger.info(f"[推演任务 {session_id}] 异步提交 {len(pending)} 个任务，开始等待完成...")
+
+        tasks = [
+            self._run_agent_task_async(session_id, p, normalized_data, future_years)
+            for p in pending
+        ]
+        # 会话存储的读写都经写入队列执行，事件循环只负责调度 LLM 调用
+        for next_done in asyncio.as_completed(tasks):
+            agent_id, agent_name, report = await next_done
+            await self._write_session(self.sessions.add_report, session_id, agent_id, {"name": agent_name, "content": report})
+            completed += 1
+            self._queue_session_write(
+                self.sessions.update,
+                session_id,
+                progress=int((completed / total_masters) * 90),
+                status_msg=f"已完成 {completed}/{total_masters} 位大师的推演..."
+            )
+
+        logger.info(f"推演任务 {session_id}: 所有 {total_masters} 位大师已完成，开始图谱绘制")
+        self._queue_session_write(
+            self.sessions.update,
+            session_id,
+            status_msg=f"{total_masters}位大师推演完毕，正在启动图谱绘制...",
+            progress=90
+        )
+
+        try:
+            self._queue_session_write(self.sessions.update, session_id, status="aggregating")
+            from .fortune_aggregator import FortuneAggregator
+            aggregator = FortuneAggregator(
+                self.llm,
+                async_llm=self._get_async_llm(),
+                scheduler=self.scheduler,
+                schedule_key=f"{session_id}:aggregate",
+                result_cache=self.aggregation_cache
+            )
+
+            def update_aggregator_progress(p, msg):
+                self._queue_session_write(self.sessions.update, session_id, progress=p, status_msg=msg)
+
+            reports = (await self._write_session(self.sessions.get, session_id))["reports"]
+            summary = await aggregator.aggregate_reports_async(
+                normalized_data,
+                reports,
+                on_progress=update_aggregator_progress
+            )
+            await self._write_session(self.sessions.finish, session_id, summary=summary, status="completed")
+            logger.info(f"[{session_id}] 已设置 session summary, 状态: completed")
+        except Exception as e:
+            import traceback
+            logger.error(f"聚合报告失败: {str(e)}")
+            logger.error(f"堆栈: {traceback.format_exc()}")
+            await self._write_session(self.sessions.finish, session_id, status="failed", error=str(e))
+
+    def _get_async_llm(self) -> AsyncLLMClient:
+        # 异步客户端绑定异步运行时的事件循环，只在该循环内创建与使用
+        if self._async_llm is None:
+            self._async_llm = AsyncLLMClient()
+        return self._async_llm
+
+    def _execute_session(
+        self,
+        session_id: str,
+        normalized_data: Dict[str, Any],
+        future_years: int,
+        done_agents: Optional[set] = None
+    ) -> None:
+        """后台执行推演与聚合；done_agents 为已有报告的大师（接管遗留会话时跳过）"""
+        from .fortune_aggregator import FortuneAggregator, IncrementalAggregation
+
+        done_agents = done_agents or set()
+        pending = [p for p in MASTER_PERSONAS if p["id"] not in done_agents]
+        # 报告到达即分段建索引，达到 quorum（或截止时间）后提前开始分年图谱生成；
+        # 分年任务使用单独的调度 key，不必排在本会话剩余的大师任务之后
+        aggregator = FortuneAggregator(
+            self.llm,
+            scheduler=self.scheduler,
+            schedule_key=f"{session_id}:aggregate",
+            result_cache=self.aggregation_cache
+        )
+        aggregation = IncrementalAggregation(
+            aggregator,
+            normalized_data,
+            total=len(MASTER_PERSONAS),
+            quorum=Config.FORTUNE_AGGREGATION_QUORUM,
+            deadline=Config.FORTUNE_AGGREGATION_DEADLINE
+        )
+        if done_agents:
+            for agent_id, report in self.sessions.get(session_id)["reports"].items():
+                aggregation.add(agent_id, report)
+        # 49 位大师的任务以会话 id 为 key 提交到全局调度器，
+        # 在并发上限内与其他会话的任务轮转执行；其他会话正在推演的相同大师只等待结果，不再提交
+        if Config.FORTUNE_HEDGE:
+            # 对冲模式：慢的大师向加速端点补发请求，超过硬截止时间不再等待
+            results = self._hedged_results(session_id, pending, normalized_data, future_years)
+        else:
+            future_to_agent = {
+                self._submit_agent(session_id, p, normalized_data, future_years): p
+                for p in pending
+            }
+            results = ((future_to_agent[f], f) for f in concurrent.futures.as_completed(future_to_agent))
+
+        completed = len(done_agents)
+        failed = 0
+        total_masters = len(MASTER_PERSONAS)
+
+        logger.info(f"[推演任务 {session_id}] 已提交 {len(pending)} 个任务，开始等待完成...")
+
+        # 逐个接收大师结果（对冲模式下每位大师最多等待 FORTUNE_AGENT_HARD_DEADLINE 秒）：
+        # 报告到达即加入增量聚合，达到 quorum 或截止时间后分年图谱在后台提前生成，
+        # 本循环仍等待全部大师返回，迟到的报告在 aggregation.finish() 中并入
+        for persona, future in results:
+            try:
+                agent_id, agent_name, report = future.result()
+                self.sessions.add_report(session_id, agent_id, {
+                    "name": agent_name,
+                    "content": report
+                })
+                aggregation.add(agent_id, {"name": agent_name, "content": report})
+                completed += 1
+                logger.debug(f"[{session_id}] 大师 {agent_name} 完成 ({completed}/{total_masters})")
             except Exception as e:
-                import traceback
-                logger.error(f"聚合报告失败: {str(e)}")
-                logger.error(f"堆栈: {traceback.format_exc()}")
-                self.sessions[session_id]["status"] = "failed"
-                self.sessions[session_id]["error"] = str(e)
-
-        # 启动异步线程执行
-        thread = threading.Thread(target=background_execution)
-        thread.start()
+                failed += 1
+                logger.error(f"[{session_id}] 大师 {persona['name']} 推演失败: {e}")
+
+            # 推演阶段占 90% 进度
+            total_done = completed + failed
+            self.sessions.update(
+                session_id,
+                progress=int((total_done / total_masters) * 90),
+                status_msg=f"已完成 {total_done}/{total_masters} 位大师的推演..."
+            )
+
+        stage = "正在合并提前生成的分年图谱" if aggregation.started_early else "正在启动图谱绘制"
+        logger.info(f"推演任务 {session_id}: 成功 {completed}，失败 {failed}，共 {total_masters} 位大师，{stage}")
+        self.sessions.update(
+            session_id,
+            status_msg=f"{total_masters}位大师推演完毕，{stage}...",
+            progress=90
+        )
+
+        # 3. 触发聚合
+        try:
+            self.sessions.update(session_id, status="aggregating")
+            
+            def update_aggregator_progress(p, msg):
+                self.sessions.update(session_id, progress=p, status_msg=msg)
+            
+            summary = aggregation.finish(on_progress=update_aggregator_progress)
+            
+            # 调试日志：确认聚合返回数据
+            logger.info(f"[{session_id}] 聚合返回类型: {type(summary)}, keys: {list(summary.keys()) if isinstance(summary, dict) else 'N/A'}")
+            if isinstance(summary, dict):
+                logger.info(f"[{session_id}] summary_text 存在: {'summary_text' in summary}, 长度: {len(summary.get('summary_text', '')) if summary.get('summary_text') else 0}")
+            
+            self.sessions.finish(session_id, summary=summary, status="completed")
+            logger.info(f"[{session_id}] 已设置 session summary, 状态: completed")
+        except Exception as e:
+            import traceback
+            logger.error(f"聚合报告失败: {str(e)}")
+            logger.error(f"堆栈: {traceback.format_exc()}")
+            self.sessions.finish(session_id, status="failed", error=str(e))
+
+    def get_session_status(self, session_id: str) -> Dict[str, Any]:
+        """查询推演进度（精简版：只读取状态投影，不含汇总与报告正文，汇总通过 get_session_summary 单独获取）"""
+        session = self.sessions.get_status(session_id)
+        if not session:
+            return {"success": False, "error": "未找到推演任务"}
         
         return {
             "success": True,
-            "session_id": session_id,
-            "status": "processing",
-            "message": "49位大师已开始并行推演，请稍后查询结果"
+            "status": session["status"],
+            "status_msg": session.get("status_msg") or "",
+            "progress": session["progress"],
+            "reports_count": session["reports_count"],
+            "partial_count": session["partial_count"],
+            "has_summary": session["has_summary"],
+            "created_at": session["created_at"],
+            "version": session.get("version", 0)
         }
 
-    def get_session_status(self, session_id: str) -> Dict[str, Any]:
-        """查询推演进度与结果"""
-        session = self.sessions.get(session_id)
+    def get_session_summary(self, session_id: str) -> Dict[str, Any]:
+        """获取汇总结果（图谱与总结），推演未完成时 summary 为 None"""
+        session = self.sessions.get(session_id, include_reports=False)
         if not session:
             return {"success": False, "error": "未找到推演任务"}
-        
+
         return {
             "success": True,
+            "session_id": session_id,
             "status": session["status"],
-            "status_msg": session.get("status_msg", ""),
-            "progress": session["progress"],
-            "reports_count": len(session["reports"]),
-            "summary": session["summary"],
-            "created_at": session["created_at"]
+            "summary": session.get("summary"),
+            "version": session.get("version", 0)
         }
+
+    def get_session_version(self, session_id: str) -> Optional[int]:
+        """会话版本号（用于 ETag），会话不存在时返回 None"""
+        return self.sessions.version(session_id)
     
+    def iter_session_events(self, session_id: str, poll_interval: Optional[float] = None):
+        """推演会话的事件流（供 SSE 推送）
+
+        依次产出 (event, data)：
+        - status：状态、进度或提示语变化时
+        - partial：流式生成中的报告新增的文本（offset 为 delta 在全文中的起始位置）
+        - report：每位大师的完整报告，每位只发送一次
+        - summary：汇总结果，会话完成时发送一次
+        - end：会话结束（completed / failed），随后事件流关闭
+        - error：会话不存在
+        某一轮没有新事件时产出 None，调用方可借此发送心跳。
+        会话状态可能由其他 worker 进程更新，因此按 poll_interval 轮询存储的状态投影，
+        只在版本号变化时读取报告与流式内容，汇总只在结束时读取一次。
+        """
+        interval = poll_interval or Config.FORTUNE_SSE_POLL_INTERVAL
+        # 读取状态投影之后会话仍可能被淘汰或删除，后续读取不到时同样以 error 结束
+        missing = ("error", {"error": "未找到推演任务"})
+        last_status = None
+        last_version = None
+        sent_reports = set()
+        sent_partials: Dict[str, int] = {}
+        while True:
+            session = self.sessions.get_status(session_id)
+            if not session:
+                yield missing
+                return
+            if session.get("version") == last_version:
+                yield None
+                time.sleep(interval)
+                continue
+            last_version = session.get("version")
+
+            changed = False
+            status = {
+                "status": session["status"],
+                "status_msg": session.get("status_msg") or "",
+                "progress": session["progress"],
+                "reports_count": session["reports_count"]
+            }
+            if status != last_status:
+                last_status = status
+                changed = True
+                yield "status", status
+
+            if status["reports_count"] != len(sent_reports):
+                full = self.sessions.get(session_id)
+                if not full:
+                    yield missing
+                    return
+                reports = full["reports"]
+                for agent_id, report in list(reports.items()):
+                    if agent_id in sent_reports:
+                        continue
+                    sent_reports.add(agent_id)
+                    sent_partials.pop(agent_id, None)
+                    changed = True
+                    yield "report", {"agent_id": agent_id, "name": report.get("name"), "content": report.get("content")}
+
+            partials = self.sessions.get_partial_reports(session_id) if session["partial_count"] else {}
+            if session["partial_count"] and not partials and session_id not in self.sessions:
+                yield missing
+                return
+            for agent_id, report in partials.items():
+                content = report.get("content") or ""
+                offset = sent_partials.get(agent_id, 0)
+                if agent_id in sent_reports or len(content) <= offset:
+                    continue
+                sent_partials[agent_id] = len(content)
+                changed = True
+                yield "partial", {
+                    "agent_id": agent_id, "name": report.get("name"), "offset": offset, "delta": content[offset:]
+                }
+
+            if session["status"] in FINISHED_STATUSES:
+                if session["has_summary"]:
+                    full = self.sessions.get(session_id, include_reports=False)
+                    if not full:
+                        yield missing
+                        return
+                    summary = full.get("summary")
+                    if summary:
+                        yield "summary", summary
+                yield "end", {"status": session["status"], "error": session.get("error")}
+                return
+
+            if not changed:
+                yield None
+            time.sleep(interval)
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """大师报告缓存的命中/淘汰统计（results 为整场推演结果缓存）"""
+        stats = self.agent_cache.stats()
+        stats["results"] = self.result_cache.stats()
+        with self._inflight_lock:
+            stats["results"]["inflight"] = len(self._inflight)
+        return {"success": True, "data": stats}
+
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """LLM 调度器的队列深度与并发统计，以及限流与对冲统计"""
+        stats = self.scheduler.stats()
+        stats["rate_limits"] = get_rate_limit_stats()
+        stats["hedging"] = self.hedging.stats()
+        stats["single_flight"] = self.agent_flights.stats()
+        return {"success": True, "data": stats}
+
     def get_full_report(self, session_id: str) -> Dict[str, Any]:
         """获取完整报告内容"""
         session = self.sessions.get(session_id)
@@ -240,6 +1123,9 @@ class FortuneService:
             "session_id": session_id,
             "input": session["input"],
             "reports": session["reports"],
+            # 仍在流式生成中的大师报告（完成后移入 reports）
+            "partial_reports": session.get("partial_reports") or {},
             "summary": session["summary"],
-            "status": session["status"]
+            "status": session["status"],
+            "version": session.get("version", 0)
         }
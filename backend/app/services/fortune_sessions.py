@@ -0,0 +1,663 @@
+"""
+推演会话存储
+可插拔的会话状态后端：
+- memory：进程内存，结束的会话超过 TTL 或超出数量/字节上限后压缩转存到磁盘，按需读取
+- sqlite：SQLite（WAL 模式）共享文件，多个 worker 进程可同时读取和更新进度，重启后可接管未完成的推演
+"""
+
+import gzip
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ..config import Config
+from ..utils.logger import get_logger
+from ..utils.sqlite_utils import ImmediateTransaction, connect_wal
+
+logger = get_logger('wannian.fortune_sessions')
+
+FINISHED_STATUSES = ("completed", "failed")
+ACTIVE_STATUSES = ("processing", "aggregating")
+
+_SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# 会话的标量字段（sqlite 后端直接存为列；其余字段中只有 summary 与 input 持久化）
+_SCALAR_FIELDS = ("status", "status_msg", "progress", "error", "future_years", "created_at")
+
+
+def _status_projection(session: Dict[str, Any]) -> Dict[str, Any]:
+    status = {field: session.get(field) for field in _SCALAR_FIELDS}
+    status.update({
+        "version": session.get("version", 0),
+        "reports_count": session.get("reports_count", len(session.get("reports") or {})),
+        "partial_count": len(session.get("partial_reports") or {}),
+        "has_summary": bool(session.get("summary"))
+    })
+    return status
+
+
+class SessionStore:
+    """会话状态后端接口"""
+
+    name = "base"
+
+    def create(self, session_id: str, session: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def get(self, session_id: str, include_reports: bool = True) -> Optional[Dict[str, Any]]:
+        """返回会话；include_reports=False 时可以不加载 reports，但需提供 reports_count"""
+        raise NotImplementedError
+
+    def get_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """会话的精简投影：状态字段、version、reports_count、partial_count 与 has_summary，
+        不含 input、summary 与报告正文（供 /status 与事件流轮询）；会话不存在时返回 None"""
+        session = self.get(session_id, include_reports=False)
+        if session is None:
+            return None
+        return _status_projection(session)
+
+    def get_partial_reports(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """流式生成中的大师报告"""
+        session = self.get(session_id, include_reports=False)
+        return dict((session or {}).get("partial_reports") or {})
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get_status(session_id) is not None
+
+    def version(self, session_id: str) -> Optional[int]:
+        """会话的版本号：每次写入（进度、报告、结果）都会递增，可用作 ETag；会话不存在时返回 None"""
+        session = self.get(session_id, include_reports=False)
+        return session.get("version", 0) if session else None
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        raise NotImplementedError
+
+    def add_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        """写入完整的大师报告，同时清除该大师的流式中间结果"""
+        raise NotImplementedError
+
+    def update_partial_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        """写入流式生成中的大师报告（get 时在 partial_reports 中返回）"""
+        raise NotImplementedError
+
+    def finish(self, session_id: str, **fields: Any) -> None:
+        """写入最终状态，此后会话可被淘汰"""
+        raise NotImplementedError
+
+    def claim_orphaned(self) -> List[Dict[str, Any]]:
+        """接管其他进程遗留的未完成会话（进程退出或崩溃），返回需要继续执行的会话"""
+        return []
+
+    def attach(self, session_id: str) -> None:
+        """本进程开始负责执行该会话（已交给协调线程）；此后由心跳表明执行者仍然存活"""
+
+    def detach(self, session_id: str) -> None:
+        """本进程不再执行该会话（协调线程已退出，无论成功与否）"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class FortuneSessionManager(SessionStore):
+    """推演会话的生命周期管理（memory 后端）
+
+    - 进行中的会话始终留在内存，不会被淘汰
+    - 结束（completed/failed）的会话在结束 ttl 秒后移出内存；
+      会话总数超过 max_sessions 或结束会话的总字节数超过 max_bytes 时，按结束时间从早到晚提前移出
+    - 配置了 spill_dir 时，移出的会话以 gzip JSON 写入磁盘，get() 按需读取而不放回内存；
+      磁盘文件超过 disk_ttl 秒后删除
+    """
+
+    name = "memory"
+
+    # 两次淘汰扫描之间的最短间隔（秒）
+    SWEEP_INTERVAL = 5.0
+    # 两次清理磁盘文件之间的间隔（秒）
+    DISK_PURGE_INTERVAL = 3600.0
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        max_sessions: int = 200,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        disk_ttl: float = 30 * 24 * 3600
+    ):
+        self.ttl = ttl
+        self.max_sessions = max(1, max_sessions)
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir or None
+        self.disk_ttl = disk_ttl
+        self._lock = threading.RLock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        # 已结束的会话：session_id -> (结束时间, 估算字节数)，按结束先后排列
+        self._finished: "OrderedDict[str, tuple]" = OrderedDict()
+        self._finished_bytes = 0
+        self._last_sweep = 0.0
+        self._last_purge = 0.0
+        self._stats = {"spilled": 0, "dropped": 0, "disk_reads": 0}
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._purge_disk()
+
+    # ------------------------------------------------------------------
+    # 磁盘层
+    # ------------------------------------------------------------------
+
+    def _spill_path(self, session_id: str) -> Optional[str]:
+        if not self.spill_dir or not _SESSION_ID_RE.match(session_id):
+            return None
+        return os.path.join(self.spill_dir, f"{session_id}.json.gz")
+
+    def _write_spill(self, session_id: str, session: Dict[str, Any]) -> bool:
+        path = self._spill_path(session_id)
+        if not path:
+            return False
+        tmp = path + ".tmp"
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                json.dump(session, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            return True
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"会话 {session_id} 转存磁盘失败: {str(e)}")
+            return False
+
+    def _read_spill(self, session_id: str) -> Optional[Dict[str, Any]]:
+        path = self._spill_path(session_id)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取已转存的会话 {session_id} 失败: {str(e)}")
+            return None
+        with self._lock:
+            self._stats["disk_reads"] += 1
+        return session
+
+    def _purge_disk(self) -> None:
+        self._last_purge = time.time()
+        if not self.disk_ttl or self.disk_ttl <= 0:
+            return
+        cutoff = time.time() - self.disk_ttl
+        removed = 0
+        for name in os.listdir(self.spill_dir):
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"已删除 {removed} 个过期的会话转存文件")
+
+    # ------------------------------------------------------------------
+    # 淘汰
+    # ------------------------------------------------------------------
+
+    def _evict(self, session_id: str) -> None:
+        """将一个已结束的会话移出内存（调用方需持有 self._lock）"""
+        session = self._sessions.pop(session_id, None)
+        _, size = self._finished.pop(session_id)
+        self._finished_bytes -= size
+        if session is not None and self._write_spill(session_id, session):
+            self._stats["spilled"] += 1
+        else:
+            self._stats["dropped"] += 1
+
+    def _sweep(self, force: bool = False) -> None:
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < self.SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+            while self._finished:
+                session_id, (finished_at, _) = next(iter(self._finished.items()))
+                over_limit = (len(self._sessions) > self.max_sessions
+                              or self._finished_bytes > self.max_bytes)
+                expired = self.ttl is not None and self.ttl >= 0 and now - finished_at >= self.ttl
+                if not (over_limit or expired):
+                    break
+                self._evict(session_id)
+        if self.spill_dir and now - self._last_purge >= self.DISK_PURGE_INTERVAL:
+            self._purge_disk()
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def create(self, session_id: str, session: Dict[str, Any]) -> None:
+        """创建会话；复用已结束会话的 session_id 时，清除旧会话的淘汰记录与磁盘转存"""
+        with self._lock:
+            old = self._finished.pop(session_id, None)
+            if old:
+                self._finished_bytes -= old[1]
+            session["version"] = session.get("version", 0) + 1
+            self._sessions[session_id] = session
+        path = self._spill_path(session_id)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"删除会话 {session_id} 的旧转存文件失败: {str(e)}")
+        self._sweep(force=True)
+
+    def get(self, session_id: str, include_reports: bool = True) -> Optional[Dict[str, Any]]:
+        """返回会话的浅拷贝（reports 与 partial_reports 也复制一层），调用方遍历时不受并发写入影响；
+        已移出内存的会话从磁盘读取（不会放回内存）"""
+        self._sweep()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                copy = dict(session)
+                for key in ("reports", "partial_reports"):
+                    if isinstance(copy.get(key), dict):
+                        copy[key] = dict(copy[key])
+                return copy
+        return self._read_spill(session_id)
+
+    def get_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self._sweep()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                return _status_projection(session)
+        session = self._read_spill(session_id)
+        return _status_projection(session) if session is not None else None
+
+    def get_partial_reports(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return dict((session or {}).get("partial_reports") or {})
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.update(fields)
+                session["version"] = session.get("version", 0) + 1
+
+    def add_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session["reports"][agent_id] = report
+                session.get("partial_reports", {}).pop(agent_id, None)
+                session["version"] = session.get("version", 0) + 1
+
+    def update_partial_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and agent_id not in session["reports"]:
+                session.setdefault("partial_reports", {})[agent_id] = report
+                session["version"] = session.get("version", 0) + 1
+
+    def finish(self, session_id: str, **fields: Any) -> None:
+        """写入最终状态并记录结束时间，此后会话可被淘汰"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.update(fields)
+            session.pop("partial_reports", None)
+            session["version"] = session.get("version", 0) + 1
+            try:
+                size = len(json.dumps(session, ensure_ascii=False).encode('utf-8'))
+            except (TypeError, ValueError):
+                size = 0
+            old = self._finished.pop(session_id, None)
+            if old:
+                self._finished_bytes -= old[1]
+            self._finished[session_id] = (time.time(), size)
+            self._finished_bytes += size
+        self._sweep(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "in_memory": len(self._sessions),
+                "finished_in_memory": len(self._finished),
+                "finished_bytes": self._finished_bytes
+            })
+        return stats
+
+
+SQLITE_SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    status_msg TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    input TEXT,
+    summary BLOB,
+    error TEXT,
+    future_years INTEGER,
+    created_at TEXT,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat REAL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_status_heartbeat ON sessions (status, heartbeat);
+CREATE INDEX IF NOT EXISTS idx_sessions_finished ON sessions (finished_at);
+CREATE TABLE IF NOT EXISTS session_reports (
+    session_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    name TEXT,
+    content TEXT,
+    PRIMARY KEY (session_id, agent_id)
+);
+CREATE TABLE IF NOT EXISTS session_partial_reports (
+    session_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    name TEXT,
+    content TEXT,
+    PRIMARY KEY (session_id, agent_id)
+);
+"""
+
+
+
+def _pack(value: Any) -> Optional[bytes]:
+    if value is None:
+        return None
+    return gzip.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+
+def _unpack(blob: Optional[bytes]) -> Any:
+    if blob is None:
+        return None
+    return json.loads(gzip.decompress(blob).decode('utf-8'))
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite 实现：多个 worker 进程共享同一个数据库文件
+
+    - 每个线程持有独立连接，写操作使用 BEGIN IMMEDIATE
+    - 大师报告逐条写入 session_reports（流式生成中的内容写入 session_partial_reports），汇总结果以 gzip JSON 存储
+    - 本进程协调线程仍在负责的会话（attach 之后、detach 之前）每隔 heartbeat_interval 秒刷新心跳；
+      心跳超过 stale_after 秒的未完成会话视为遗留，可由其他进程通过 claim_orphaned() 接管
+    - 结束超过 retention 秒的会话在启动时及每小时清理一次
+    """
+
+    name = "sqlite"
+
+    PURGE_INTERVAL = 3600.0
+
+    def __init__(
+        self,
+        path: str,
+        stale_after: float = 120,
+        heartbeat_interval: float = 15,
+        retention: float = 30 * 24 * 3600
+    ):
+        self.path = path
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self.retention = retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._local = threading.local()
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_lock = threading.Lock()
+        # 本进程有存活的协调线程的会话，只有这些会话刷新心跳
+        self._attached = set()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SQLITE_SESSION_SCHEMA)
+        # 旧版数据库没有 version 列
+        if "version" not in {r["name"] for r in conn.execute("PRAGMA table_info(sessions)").fetchall()}:
+            conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._purge()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect_wal(self.path)
+        return conn
+
+    def _transaction(self):
+        return ImmediateTransaction(self._connect())
+
+    # ------------------------------------------------------------------
+    # 心跳与清理
+    # ------------------------------------------------------------------
+
+    def _ensure_heartbeat(self) -> None:
+        with self._heartbeat_lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="session-heartbeat", daemon=True)
+                self._heartbeat.start()
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._heartbeat_lock:
+                attached = list(self._attached)
+            if not attached:
+                continue
+            try:
+                now = time.time()
+                with self._transaction() as conn:
+                    conn.executemany(
+                        f"UPDATE sessions SET heartbeat = ? WHERE id = ? AND owner = ? "
+                        f"AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                        [(now, session_id, self.owner, *ACTIVE_STATUSES) for session_id in attached]
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"刷新会话心跳失败: {str(e)}")
+
+    def _purge(self) -> None:
+        self._last_purge = time.time()
+        if not self.retention or self.retention <= 0:
+            return
+        cutoff = time.time() - self.retention
+        with self._transaction() as conn:
+            expired = [r["id"] for r in conn.execute(
+                "SELECT id FROM sessions WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            ).fetchall()]
+            for session_id in expired:
+                conn.execute("DELETE FROM session_reports WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM session_partial_reports WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        if expired:
+            logger.info(f"已清理 {len(expired)} 个过期的推演会话")
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def create(self, session_id: str, session: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, status, status_msg, progress, input, summary, error, "
+                "future_years, created_at, finished_at, owner, heartbeat, version) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, 1)",
+                (
+                    session_id, session.get("status"), session.get("status_msg"), session.get("progress") or 0,
+                    json.dumps(session.get("input"), ensure_ascii=False), _pack(session.get("summary")),
+                    session.get("error"), session.get("future_years"), session.get("created_at"),
+                    self.owner, time.time()
+                )
+            )
+            conn.execute("DELETE FROM session_reports WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM session_partial_reports WHERE session_id = ?", (session_id,))
+            for agent_id, report in (session.get("reports") or {}).items():
+                self._insert_report(conn, session_id, agent_id, report)
+        if time.time() - self._last_purge >= self.PURGE_INTERVAL:
+            self._purge()
+
+    def get(self, session_id: str, include_reports: bool = True) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if not row:
+            return None
+        session = {"id": row["id"], "version": row["version"], **{field: row[field] for field in _SCALAR_FIELDS}}
+        session["input"] = json.loads(row["input"]) if row["input"] else None
+        session["summary"] = _unpack(row["summary"])
+        if include_reports:
+            session["reports"] = {
+                r["agent_id"]: {"name": r["name"], "content": r["content"]}
+                for r in conn.execute(
+                    "SELECT agent_id, name, content FROM session_reports WHERE session_id = ?", (session_id,)
+                ).fetchall()
+            }
+            session["reports_count"] = len(session["reports"])
+        else:
+            session["reports"] = {}
+            session["reports_count"] = conn.execute(
+                "SELECT COUNT(*) FROM session_reports WHERE session_id = ?", (session_id,)
+            ).fetchone()[0]
+        session["partial_reports"] = self.get_partial_reports(session_id)
+        return session
+
+    def get_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # 只读标量列与计数，不解压 summary、不读取报告正文
+        row = self._connect().execute(
+            f"SELECT {', '.join(_SCALAR_FIELDS)}, version, summary IS NOT NULL AS has_summary, "
+            "(SELECT COUNT(*) FROM session_reports WHERE session_id = sessions.id) AS reports_count, "
+            "(SELECT COUNT(*) FROM session_partial_reports WHERE session_id = sessions.id) AS partial_count "
+            "FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if not row:
+            return None
+        status = dict(row)
+        status["has_summary"] = bool(status["has_summary"])
+        return status
+
+    def get_partial_reports(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        return {
+            r["agent_id"]: {"name": r["name"], "content": r["content"]}
+            for r in self._connect().execute(
+                "SELECT agent_id, name, content FROM session_partial_reports WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        }
+
+    def _set_fields(self, conn: sqlite3.Connection, session_id: str, fields: Dict[str, Any]) -> None:
+        columns, values = [], []
+        for key, value in fields.items():
+            if key == "summary":
+                columns.append("summary = ?")
+                values.append(_pack(value))
+            elif key in _SCALAR_FIELDS:
+                columns.append(f"{key} = ?")
+                values.append(value)
+        columns.append("heartbeat = ?")
+        values.append(time.time())
+        columns.append("version = version + 1")
+        conn.execute(
+            f"UPDATE sessions SET {', '.join(columns)} WHERE id = ?", (*values, session_id)
+        )
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        with self._transaction() as conn:
+            self._set_fields(conn, session_id, fields)
+
+    @staticmethod
+    def _insert_report(conn: sqlite3.Connection, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO session_reports (session_id, agent_id, name, content) VALUES (?, ?, ?, ?)",
+            (session_id, agent_id, report.get("name"), report.get("content"))
+        )
+
+    def add_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            self._insert_report(conn, session_id, agent_id, report)
+            conn.execute(
+                "DELETE FROM session_partial_reports WHERE session_id = ? AND agent_id = ?", (session_id, agent_id)
+            )
+            self._bump_version(conn, session_id)
+
+    def update_partial_report(self, session_id: str, agent_id: str, report: Dict[str, Any]) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_partial_reports (session_id, agent_id, name, content) "
+                "SELECT ?, ?, ?, ? WHERE NOT EXISTS "
+                "(SELECT 1 FROM session_reports WHERE session_id = ? AND agent_id = ?)",
+                (session_id, agent_id, report.get("name"), report.get("content"), session_id, agent_id)
+            )
+            self._bump_version(conn, session_id)
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection, session_id: str) -> None:
+        conn.execute("UPDATE sessions SET version = version + 1 WHERE id = ?", (session_id,))
+
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._connect().execute("SELECT version FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row["version"] if row else None
+
+    def finish(self, session_id: str, **fields: Any) -> None:
+        with self._transaction() as conn:
+            self._set_fields(conn, session_id, fields)
+            conn.execute("UPDATE sessions SET finished_at = ? WHERE id = ?", (time.time(), session_id))
+            conn.execute("DELETE FROM session_partial_reports WHERE session_id = ?", (session_id,))
+
+    def claim_orphaned(self) -> List[Dict[str, Any]]:
+        cutoff = time.time() - self.stale_after
+        claimed = []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM sessions WHERE status IN ({', '.join('?' for _ in ACTIVE_STATUSES)}) "
+                "AND (heartbeat IS NULL OR heartbeat < ?)",
+                (*ACTIVE_STATUSES, cutoff)
+            ).fetchall()
+            for row in rows:
+                conn.execute(
+                    "UPDATE sessions SET owner = ?, heartbeat = ? WHERE id = ?",
+                    (self.owner, time.time(), row["id"])
+                )
+                claimed.append(row["id"])
+        if claimed:
+            logger.info(f"接管 {len(claimed)} 个遗留的推演会话: {claimed}")
+        return [s for s in (self.get(session_id) for session_id in claimed) if s]
+
+    def attach(self, session_id: str) -> None:
+        with self._heartbeat_lock:
+            self._attached.add(session_id)
+        self._ensure_heartbeat()
+
+    def detach(self, session_id: str) -> None:
+        with self._heartbeat_lock:
+            self._attached.discard(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        counts = {r["status"]: r["n"] for r in conn.execute(
+            "SELECT status, COUNT(*) AS n FROM sessions GROUP BY status"
+        ).fetchall()}
+        with self._heartbeat_lock:
+            attached = len(self._attached)
+        return {"owner": self.owner, "attached": attached, "sessions_by_status": counts}
+
+
+def create_session_store(kind: Optional[str] = None) -> SessionStore:
+    kind = (kind or Config.FORTUNE_SESSION_BACKEND or "sqlite").lower()
+    if kind == "memory":
+        return FortuneSessionManager(
+            ttl=Config.FORTUNE_SESSION_TTL,
+            max_sessions=Config.FORTUNE_SESSION_MAX,
+            max_bytes=Config.FORTUNE_SESSION_MAX_BYTES,
+            spill_dir=Config.FORTUNE_SESSION_DIR,
+            disk_ttl=Config.FORTUNE_SESSION_DISK_TTL
+        )
+    if kind == "sqlite":
+        return SqliteSessionStore(
+            os.path.join(Config.FORTUNE_SESSION_DIR, 'sessions.db'),
+            stale_after=Config.FORTUNE_SESSION_STALE_SECONDS,
+            retention=Config.FORTUNE_SESSION_DISK_TTL
+        )
+    raise ValueError(f"未知的 FORTUNE_SESSION_BACKEND: {kind}")
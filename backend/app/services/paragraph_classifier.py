@@ -0,0 +1,123 @@
+"""
+段落分类
+一次扫描得出段落的维度关键词命中、提到的年份与变数标记，
+聚合各阶段直接查表，不再对每个年份、每个维度重复做子串匹配
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+# 各维度的关键词（提取节点候选段落）
+DIMENSION_KEYWORDS = {
+    "career": ["事业", "工作", "晋升", "职场", "创业", "名声", "官", "学业", "职位", "升迁", "业绩"],
+    "wealth": ["财富", "金钱", "投资", "收益", "破财", "财运", "金", "利", "理财", "资产", "收入"],
+    "emotion": ["感情", "婚姻", "恋爱", "桃花", "伴侣", "家庭", "情", "缘", "爱情", "配偶", "姻缘"],
+    "health": ["健康", "身体", "疾病", "养生", "平安", "疾", "安", "体质", "调养", "医"]
+}
+
+DIMENSION_NAMES = {"career": "事业", "wealth": "财富", "emotion": "情感", "health": "健康"}
+
+# 段落包含任一即视为命运变数
+STRICT_VARIABLE_KEYWORDS = ["若", "如果", "一旦", "除非", "取决于", "抉择", "变数", "转折点", "机遇与风险并存"]
+
+# 分年压缩时保留的维度关键词（段落包含年份或任一关键词即保留）
+YEAR_CONTEXT_KEYWORDS = [
+    "事业", "工作", "晋升", "职场", "创业", "职位", "名声", "学业",
+    "财富", "金钱", "投资", "收益", "破财", "财运", "收入", "理财",
+    "情感", "感情", "婚姻", "恋爱", "桃花", "伴侣", "家庭", "姻缘",
+    "健康", "身体", "疾病", "养生", "平安", "体质", "调养", "医疗",
+    "运势", "机遇", "风险", "变数", "抉择", "转折", "突破", "挑战"
+]
+
+# 段落中出现的四位数字（与 "2026" in para 的判断等价）
+_YEAR_PATTERN = re.compile(r'(?=(\d{4}))')
+
+
+class KeywordMatcher:
+    """多关键词匹配器
+
+    所有关键词预编译成一个按长度降序的前瞻正则，一次扫描即可得到段落中出现的全部关键词。
+    某个位置只会匹配到最长的关键词，被它包含的较短关键词（如 "金钱" 里的 "金"）通过预先算好的包含关系补上。
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted(set(keywords), key=len, reverse=True)
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in self.keywords) + "))")
+        self._implied = {kw: frozenset(k for k in self.keywords if k in kw) for kw in self.keywords}
+
+    def find(self, text: str) -> FrozenSet[str]:
+        found = set()
+        for match in self._pattern.finditer(text):
+            found |= self._implied[match.group(1)]
+        return frozenset(found)
+
+
+class ParagraphFeatures:
+    """单个段落的分类结果"""
+
+    __slots__ = ("dimension_hits", "years", "variable", "year_context", "named_dimension")
+
+    def __init__(
+        self,
+        dimension_hits: Dict[str, int],
+        years: FrozenSet[str],
+        variable: bool,
+        year_context: bool,
+        named_dimension: str
+    ):
+        # 维度 -> 命中的关键词个数
+        self.dimension_hits = dimension_hits
+        self.years = years
+        self.variable = variable
+        # 是否包含分年压缩保留的关键词
+        self.year_context = year_context
+        # 段落中最先出现名称的维度（按 事业/财富/情感/健康 顺序），都没有时为 career
+        self.named_dimension = named_dimension
+
+    def mentions_year(self, year: str) -> bool:
+        """year 形如 "2026年" 或 "2026"，为空时返回 False"""
+        return bool(year) and year[:4] in self.years
+
+    def relevant(self, dimension: str, year: str) -> bool:
+        """包含该维度关键词或提到该年份"""
+        return bool(self.dimension_hits.get(dimension)) or self.mentions_year(year)
+
+
+_DIMENSION_SETS = {dim: frozenset(kws) for dim, kws in DIMENSION_KEYWORDS.items()}
+_VARIABLE_SET = frozenset(STRICT_VARIABLE_KEYWORDS)
+_YEAR_CONTEXT_SET = frozenset(YEAR_CONTEXT_KEYWORDS)
+_NAME_SETS = {dim: frozenset((name, dim)) for dim, name in DIMENSION_NAMES.items()}
+_MATCHER = KeywordMatcher(
+    [k for kws in DIMENSION_KEYWORDS.values() for k in kws]
+    + STRICT_VARIABLE_KEYWORDS
+    + YEAR_CONTEXT_KEYWORDS
+    + [k for pair in _NAME_SETS.values() for k in pair]
+)
+
+
+@lru_cache(maxsize=16384)
+def classify_paragraph(paragraph: str) -> ParagraphFeatures:
+    """对段落做一次匹配并缓存结果，同一段落在后续阶段再次查询时直接返回"""
+    found = _MATCHER.find(paragraph)
+    named_dimension = next((dim for dim, names in _NAME_SETS.items() if found & names), "career")
+    return ParagraphFeatures(
+        dimension_hits={dim: len(found & kws) for dim, kws in _DIMENSION_SETS.items()},
+        years=frozenset(_YEAR_PATTERN.findall(paragraph)),
+        variable=bool(found & _VARIABLE_SET),
+        year_context=bool(found & _YEAR_CONTEXT_SET),
+        named_dimension=named_dimension
+    )
+
+
+def paragraph_features(report: Dict[str, Any]) -> List[ParagraphFeatures]:
+    """预处理报告中与 paragraphs 一一对应的分类结果
+
+    ReportAccumulator 分段时已算好并存入 report["features"]；手工构造的报告在首次使用时补算。
+    """
+    paragraphs = report.get("paragraphs", [])
+    features = report.get("features")
+    if features is None or len(features) != len(paragraphs):
+        features = [classify_paragraph(p) for p in paragraphs]
+        report["features"] = features
+    return features
@@ -0,0 +1,661 @@
+"""
+求职数据存储后端
+RecruitStore 的可插拔存储实现：JSON 文件 + 聊天消息日志，以及 SQLite（WAL 模式）
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.locks import FileLock
+from ..utils.logger import get_logger
+from ..utils.sqlite_utils import ImmediateTransaction, connect_wal
+from .chat_journal import ChatJournal
+
+logger = get_logger('wannian.recruit_store')
+
+
+class RecruitBackend:
+    """存储后端接口，方法签名与 RecruitStore 保持一致"""
+
+    name = "base"
+
+    def upsert_resume(self, resume_id: str, resume: dict) -> dict:
+        raise NotImplementedError
+
+    def get_resume(self, resume_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def insert_application(self, record: dict) -> dict:
+        raise NotImplementedError
+
+    def get_application(self, application_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def list_applications(
+        self,
+        resume_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[int, str]] = None
+    ) -> list:
+        """按 (created_at, id) 倒序返回投递记录；before 为游标键，只返回比它更早的记录"""
+        raise NotImplementedError
+
+    def get_or_create_chat(self, application: dict) -> dict:
+        raise NotImplementedError
+
+    def list_chat_messages(self, application_id: str, limit: Optional[int] = None) -> list:
+        raise NotImplementedError
+
+    def append_chat_message(self, application_id: str, role: str, content: str) -> dict:
+        raise NotImplementedError
+
+    def append_chat_messages(self, application_id: str, messages: List[dict]) -> dict:
+        """按顺序追加多条消息（每条含 role、content），返回会话"""
+        chat = None
+        for m in messages:
+            chat = self.append_chat_message(application_id, m["role"], m["content"])
+        return chat
+
+    def flush(self) -> None:
+        """将缓冲中的修改落盘；写穿透的实现无需处理"""
+
+
+def _application_key(application: dict, app_id: Optional[str] = None) -> Tuple[int, str]:
+    return (application.get("created_at") or 0, app_id or application["id"])
+
+
+def _new_chat(application: dict, now: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "application_id": application["id"],
+        "company_id": application.get("company_id"),
+        "company_name": application.get("company_name"),
+        "contact_type": application.get("contact_type") or "hr",
+        "created_at": now,
+    }
+
+
+class JsonRecruitBackend(RecruitBackend):
+    """文件实现：简历、投递、会话元数据保存在一个 JSON 文件中，聊天消息写入只追加的 ChatJournal
+
+    解析后的文档常驻内存（读穿透缓存），只有文件 mtime/大小变化时才重新解析；
+    写操作递增 generation 并按 durability 落盘：
+    - strict：写穿透，每次写入立即保存并 fsync
+    - relaxed：写回，标记为脏后由后台线程在 flush_interval 秒内合并写入
+
+    self._lock 只保护内存中的文档，不在其中做文件写入。落盘时持有跨进程文件锁；
+    若文件已被其他进程改写，先重新读取磁盘版本，再覆盖本进程修改过的记录，避免丢失对方的更新。
+    """
+
+    name = "json"
+
+    def __init__(
+        self,
+        path: str,
+        journal: Optional[ChatJournal] = None,
+        durability: str = "relaxed",
+        flush_interval: float = 1.0,
+        stat_interval: float = 1.0
+    ):
+        if durability not in ("strict", "relaxed"):
+            raise ValueError(f"未知的 durability: {durability}")
+        self.path = path
+        self.durability = durability
+        self.flush_interval = flush_interval
+        # 稳态下读请求不访问磁盘：两次 stat 检查之间直接使用内存中的文档
+        self.stat_interval = stat_interval
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._file_lock = FileLock(path + ".lock")
+        self._data: Optional[dict] = None
+        self._disk_sig = None
+        self._last_stat = 0.0
+        self._dirty = False
+        # 自上次落盘以来修改过的 (section, key)
+        self._dirty_keys = set()
+        self._flush_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.journal = journal or ChatJournal(os.path.join(os.path.dirname(path), 'chat_journal'))
+        # 会话元数据创建后不再变化，缓存已知会话以便追加消息时无需读取 JSON 文件
+        self._known_chats = {}
+        # 二级索引：resume_id -> 按 (created_at, id) 升序的键列表；None 键为全部投递。文档重新加载时重建
+        self._apps_index: Optional[Dict[Optional[str], List[Tuple[int, str]]]] = None
+        self._migrate_embedded_messages()
+        atexit.register(self._flush_at_exit)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_file(self) -> dict:
+        if not os.path.exists(self.path):
+            return {"resumes": {}, "applications": {}, "chats": {}}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data.setdefault("resumes", {})
+        data.setdefault("applications", {})
+        data.setdefault("chats", {})
+        return data
+
+    def _load(self) -> dict:
+        """返回内存中的文档，必要时从磁盘重新解析（调用方需持有 self._lock）"""
+        now = time.monotonic()
+        if self._data is not None and (self._dirty or now - self._last_stat < self.stat_interval):
+            return self._data
+        sig = self._stat()
+        self._last_stat = now
+        if self._data is None or sig != self._disk_sig:
+            self._data = self._read_file()
+            self._disk_sig = sig
+            self._apps_index = None
+            self.generation += 1
+        return self._data
+
+    def _applications_index(self) -> Dict[Optional[str], List[Tuple[int, str]]]:
+        """返回投递二级索引，必要时从内存文档重建（调用方需持有 self._lock）"""
+        data = self._load()
+        if self._apps_index is None:
+            index: Dict[Optional[str], List[Tuple[int, str]]] = {None: []}
+            for app_id, app in data["applications"].items():
+                key = _application_key(app, app_id)
+                index[None].append(key)
+                index.setdefault(app.get("resume_id"), []).append(key)
+            for keys in index.values():
+                keys.sort()
+            self._apps_index = index
+        return self._apps_index
+
+    def _mark_dirty(self, section: str, key: str) -> None:
+        """记录一条修改（调用方需持有 self._lock）"""
+        self._dirty = True
+        self._dirty_keys.add((section, key))
+        self.generation += 1
+
+    def _after_write(self) -> None:
+        """写操作释放 self._lock 后调用：strict 立即落盘，relaxed 交给后台线程"""
+        if self.durability == "strict":
+            self.flush()
+            return
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="recruit-store-flusher", daemon=True)
+            self._flusher.start()
+        self._flush_event.set()
+
+    def _write_payload(self, payload: str) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._flush_event.wait()
+            self._flush_event.clear()
+            # 等待一个刷新周期，把这段时间内的多次写入合并为一次
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"求职数据写回失败: {str(e)}")
+                self._flush_event.set()
+
+    def flush(self) -> None:
+        """将尚未落盘的修改写入文件"""
+        with self._flush_lock, self._file_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                if self._stat() != self._disk_sig:
+                    merged = self._read_file()
+                    for section, key in self._dirty_keys:
+                        merged[section][key] = self._data[section][key]
+                    self._data = merged
+                    self._apps_index = None
+                    logger.info(f"求职数据文件已被其他进程修改，合并 {len(self._dirty_keys)} 条本地修改后写入")
+                payload = json.dumps(self._data, ensure_ascii=False)
+                self._dirty = False
+                self._dirty_keys = set()
+            self._write_payload(payload)
+            sig = self._stat()
+            with self._lock:
+                self._disk_sig = sig
+                self._last_stat = time.monotonic()
+
+    def _flush_at_exit(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"退出时写回求职数据失败: {str(e)}")
+
+    def _migrate_embedded_messages(self) -> None:
+        """旧版文件把消息内嵌在 chats[*].messages 中，首次启动时转存到消息日志"""
+        with self._lock:
+            data = self._load()
+            embedded = [app_id for app_id, chat in data["chats"].items() if "messages" in chat]
+            if not embedded:
+                return
+            moved = 0
+            for app_id in embedded:
+                messages = data["chats"][app_id].pop("messages") or []
+                # 消息日志中已有记录说明上次迁移已写入日志但未来得及保存 JSON，不再重复导入
+                if self.journal.count(app_id) == 0:
+                    for m in messages:
+                        self.journal.append(app_id, m.get("role") or "", m.get("content") or "", m.get("ts") or 0)
+                        moved += 1
+                self._mark_dirty("chats", app_id)
+        self.flush()
+        logger.info(f"已将 {moved} 条内嵌聊天消息迁移到消息日志")
+
+    def upsert_resume(self, resume_id: str, resume: dict) -> dict:
+        with self._lock:
+            data = self._load()
+            data["resumes"][resume_id] = {
+                "id": resume_id,
+                "resume": resume,
+                "created_at": data["resumes"].get(resume_id, {}).get("created_at") or int(time.time()),
+                "updated_at": int(time.time())
+            }
+            self._mark_dirty("resumes", resume_id)
+            record = dict(data["resumes"][resume_id])
+        self._after_write()
+        return record
+
+    def get_resume(self, resume_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._load()["resumes"].get(resume_id)
+            return dict(record) if record else None
+
+    def insert_application(self, record: dict) -> dict:
+        with self._lock:
+            index = self._applications_index()
+            data = self._load()
+            data["applications"][record["id"]] = dict(record)
+            key = _application_key(record)
+            insort(index[None], key)
+            insort(index.setdefault(record.get("resume_id"), []), key)
+            self._mark_dirty("applications", record["id"])
+        self._after_write()
+        return record
+
+    def get_application(self, application_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._load()["applications"].get(application_id)
+            return dict(record) if record else None
+
+    def list_applications(
+        self,
+        resume_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[int, str]] = None
+    ) -> list:
+        with self._lock:
+            keys = self._applications_index().get(resume_id or None) or []
+            end = bisect_left(keys, before) if before else len(keys)
+            start = max(0, end - limit) if limit is not None else 0
+            applications = self._data["applications"]
+            return [dict(applications[app_id]) for _, app_id in reversed(keys[start:end])]
+
+    def _ensure_chat(self, application_id: str, application: Optional[dict] = None) -> Tuple[dict, bool]:
+        """返回 (会话, 是否新建)（调用方需持有 self._lock）"""
+        chat = self._known_chats.get(application_id)
+        if chat:
+            return chat, False
+        data = self._load()
+        chat = data["chats"].get(application_id)
+        created = False
+        if not chat:
+            app = application or data["applications"].get(application_id)
+            if not app:
+                raise ValueError("application_id 不存在")
+            chat = _new_chat(app, int(time.time()))
+            data["chats"][application_id] = chat
+            self._mark_dirty("chats", application_id)
+            created = True
+        self._known_chats[application_id] = chat
+        return chat, created
+
+    def get_or_create_chat(self, application: dict) -> dict:
+        with self._lock:
+            chat, created = self._ensure_chat(application["id"], application)
+        if created:
+            self._after_write()
+        return dict(chat)
+
+    def list_chat_messages(self, application_id: str, limit: Optional[int] = None) -> list:
+        return self.journal.read(application_id, limit)
+
+    def append_chat_message(self, application_id: str, role: str, content: str) -> dict:
+        with self._lock:
+            chat, created = self._ensure_chat(application_id)
+        if created:
+            self._after_write()
+        self.journal.append(application_id, role, content, int(time.time()))
+        return dict(chat)
+
+    def append_chat_messages(self, application_id: str, messages: List[dict]) -> dict:
+        with self._lock:
+            chat, created = self._ensure_chat(application_id)
+        if created:
+            self._after_write()
+        self.journal.append_many(application_id, messages, int(time.time()))
+        return dict(chat)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS resumes (
+    id TEXT PRIMARY KEY,
+    resume TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS applications (
+    id TEXT PRIMARY KEY,
+    resume_id TEXT NOT NULL,
+    company_id TEXT,
+    company_name TEXT,
+    contact_type TEXT,
+    status TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+DROP INDEX IF EXISTS idx_applications_resume;
+DROP INDEX IF EXISTS idx_applications_created;
+CREATE INDEX IF NOT EXISTS idx_applications_resume_created
+    ON applications (resume_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_applications_created_id
+    ON applications (created_at, id);
+CREATE TABLE IF NOT EXISTS chats (
+    application_id TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    company_id TEXT,
+    company_name TEXT,
+    contact_type TEXT,
+    created_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_messages (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    application_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_application
+    ON chat_messages (application_id, seq);
+"""
+
+_APPLICATION_COLUMNS = (
+    "id", "resume_id", "company_id", "company_name",
+    "contact_type", "status", "created_at", "updated_at"
+)
+_CHAT_COLUMNS = ("id", "application_id", "company_id", "company_name", "contact_type", "created_at")
+
+
+class SqliteRecruitBackend(RecruitBackend):
+    """SQLite 实现：WAL 模式，按表与索引存储，单条写入不再重写整个数据集
+
+    每个线程持有独立连接；写操作使用 BEGIN IMMEDIATE，多进程共享同一个数据库文件时由 SQLite 负责加锁。
+    消息只追加、seq 单调递增：最近读取的 history_cache_size 个会话缓存解码后的消息及其最大 seq，
+    再次读取只查询 seq 更大的新消息（稳态下是一次索引探测），本进程与其他进程的追加都能读到。
+    """
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        json_path: Optional[str] = None,
+        durability: str = "relaxed",
+        history_cache_size: int = 256
+    ):
+        self.path = path
+        # strict 时每次提交都 fsync；relaxed 时 WAL 只在检查点 fsync（断电可能丢失最近的提交，但不会损坏数据库）
+        self._synchronous = "FULL" if durability == "strict" else "NORMAL"
+        self._local = threading.local()
+        self.history_cache_size = max(0, history_cache_size)
+        # application_id -> (已缓存的最大 seq, 消息列表)（LRU）
+        self._history: "OrderedDict[str, Tuple[int, list]]" = OrderedDict()
+        self._history_lock = threading.Lock()
+        self._connect().executescript(SQLITE_SCHEMA)
+        if json_path:
+            migrate_json_to_sqlite(json_path, self)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_wal(self.path, self._synchronous)
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return ImmediateTransaction(self._connect())
+
+    @staticmethod
+    def _row_to_resume(row) -> dict:
+        return {
+            "id": row["id"],
+            "resume": json.loads(row["resume"]),
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def upsert_resume(self, resume_id: str, resume: dict) -> dict:
+        now = int(time.time())
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO resumes (id, resume, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET resume = excluded.resume, updated_at = excluded.updated_at",
+                (resume_id, json.dumps(resume, ensure_ascii=False), now, now)
+            )
+            row = conn.execute("SELECT * FROM resumes WHERE id = ?", (resume_id,)).fetchone()
+        return self._row_to_resume(row)
+
+    def get_resume(self, resume_id: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT * FROM resumes WHERE id = ?", (resume_id,)).fetchone()
+        return self._row_to_resume(row) if row else None
+
+    def insert_application(self, record: dict) -> dict:
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT INTO applications ({', '.join(_APPLICATION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _APPLICATION_COLUMNS)})",
+                tuple(record.get(c) for c in _APPLICATION_COLUMNS)
+            )
+        return record
+
+    def get_application(self, application_id: str) -> Optional[dict]:
+        row = self._connect().execute("SELECT * FROM applications WHERE id = ?", (application_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_applications(
+        self,
+        resume_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[Tuple[int, str]] = None
+    ) -> list:
+        where, params = [], []
+        if resume_id:
+            where.append("resume_id = ?")
+            params.append(resume_id)
+        if before:
+            # 键集分页：(created_at, id) < before，可直接沿索引定位
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend([before[0], before[0], before[1]])
+        sql = "SELECT * FROM applications"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(0, limit))
+        return [dict(r) for r in self._connect().execute(sql, params).fetchall()]
+
+    def _get_chat(self, conn: sqlite3.Connection, application_id: str) -> Optional[dict]:
+        row = conn.execute("SELECT * FROM chats WHERE application_id = ?", (application_id,)).fetchone()
+        return dict(row) if row else None
+
+    def _insert_chat(self, conn: sqlite3.Connection, chat: dict) -> None:
+        conn.execute(
+            f"INSERT OR IGNORE INTO chats ({', '.join(_CHAT_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _CHAT_COLUMNS)})",
+            tuple(chat.get(c) for c in _CHAT_COLUMNS)
+        )
+
+    def get_or_create_chat(self, application: dict) -> dict:
+        app_id = application["id"]
+        chat = self._get_chat(self._connect(), app_id)
+        if chat:
+            return chat
+        with self._transaction() as conn:
+            self._insert_chat(conn, _new_chat(application, int(time.time())))
+            return self._get_chat(conn, app_id)
+
+    def list_chat_messages(self, application_id: str, limit: Optional[int] = None) -> list:
+        if limit is not None and limit <= 0:
+            return []
+        conn = self._connect()
+        with self._history_lock:
+            cached = self._history.get(application_id)
+        if cached is None and limit is not None:
+            # 未缓存的会话只取最近 limit 条时，不为此加载全部历史
+            rows = conn.execute(
+                "SELECT role, content, ts FROM chat_messages WHERE application_id = ? ORDER BY seq DESC LIMIT ?",
+                (application_id, limit)
+            ).fetchall()[::-1]
+            return [dict(r) for r in rows]
+
+        last_seq, messages = cached or (0, [])
+        rows = conn.execute(
+            "SELECT seq, role, content, ts FROM chat_messages WHERE application_id = ? AND seq > ? ORDER BY seq",
+            (application_id, last_seq)
+        ).fetchall()
+        if rows:
+            last_seq = rows[-1]["seq"]
+            messages = messages + [{"role": r["role"], "content": r["content"], "ts": r["ts"]} for r in rows]
+        if self.history_cache_size:
+            with self._history_lock:
+                current = self._history.get(application_id)
+                # 并发读取时只保留更新的一份
+                if current is None or current[0] <= last_seq:
+                    self._history[application_id] = (last_seq, messages)
+                self._history.move_to_end(application_id)
+                while len(self._history) > self.history_cache_size:
+                    self._history.popitem(last=False)
+        if limit is not None:
+            messages = messages[-limit:]
+        return [dict(m) for m in messages]
+
+    def append_chat_message(self, application_id: str, role: str, content: str) -> dict:
+        return self.append_chat_messages(application_id, [{"role": role, "content": content}])
+
+    def append_chat_messages(self, application_id: str, messages: List[dict]) -> dict:
+        """在同一个事务中追加多条消息"""
+        now = int(time.time())
+        with self._transaction() as conn:
+            chat = self._get_chat(conn, application_id)
+            if not chat:
+                row = conn.execute("SELECT * FROM applications WHERE id = ?", (application_id,)).fetchone()
+                if not row:
+                    raise ValueError("application_id 不存在")
+                chat = _new_chat(dict(row), now)
+                self._insert_chat(conn, chat)
+            conn.executemany(
+                "INSERT INTO chat_messages (application_id, role, content, ts) VALUES (?, ?, ?, ?)",
+                [(application_id, m["role"], m["content"], now) for m in messages]
+            )
+        return chat
+
+
+def migrate_json_to_sqlite(
+    json_path: str,
+    backend: SqliteRecruitBackend,
+    journal: Optional[ChatJournal] = None
+) -> Optional[dict]:
+    """将旧版 recruit_store.json 一次性导入 SQLite
+
+    导入完成后在 meta 表中记录标记，重复调用不会重复导入；原 JSON 文件保留不动。
+    聊天消息优先从同目录的消息日志（chat_journal/）读取，
+    日志中没有记录的会话再使用更早版本内嵌在 chats[*].messages 中的消息。
+
+    Returns:
+        各表导入条数；未执行导入时返回 None
+    """
+    if not os.path.exists(json_path):
+        return None
+
+    with backend._transaction() as conn:
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if done:
+            return None
+
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if journal is None:
+            journal_dir = os.path.join(os.path.dirname(json_path), 'chat_journal')
+            if os.path.isdir(journal_dir):
+                journal = ChatJournal(journal_dir)
+
+        counts = {"resumes": 0, "applications": 0, "chats": 0, "messages": 0}
+        for resume_id, rec in (data.get("resumes") or {}).items():
+            conn.execute(
+                "INSERT OR IGNORE INTO resumes (id, resume, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (
+                    resume_id,
+                    json.dumps(rec.get("resume") or {}, ensure_ascii=False),
+                    rec.get("created_at") or 0,
+                    rec.get("updated_at") or rec.get("created_at") or 0,
+                )
+            )
+            counts["resumes"] += 1
+
+        for app_id, rec in (data.get("applications") or {}).items():
+            rec = dict(rec, id=app_id)
+            conn.execute(
+                f"INSERT OR IGNORE INTO applications ({', '.join(_APPLICATION_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _APPLICATION_COLUMNS)})",
+                tuple(rec.get(c) for c in _APPLICATION_COLUMNS)
+            )
+            counts["applications"] += 1
+
+        for app_id, chat in (data.get("chats") or {}).items():
+            chat = dict(chat, application_id=app_id)
+            conn.execute(
+                f"INSERT OR IGNORE INTO chats ({', '.join(_CHAT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _CHAT_COLUMNS)})",
+                tuple(chat.get(c) for c in _CHAT_COLUMNS)
+            )
+            counts["chats"] += 1
+            messages = journal.read(app_id) if journal is not None and journal.count(app_id) else None
+            for m in messages or chat.get("messages") or []:
+                conn.execute(
+                    "INSERT INTO chat_messages (application_id, role, content, ts) VALUES (?, ?, ?, ?)",
+                    (app_id, m.get("role") or "", m.get("content") or "", m.get("ts") or 0)
+                )
+                counts["messages"] += 1
+
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+            (json.dumps({"source": json_path, "at": int(time.time()), **counts}),)
+        )
+
+    logger.info(f"已从 {json_path} 迁移求职数据到 SQLite: {counts}")
+    return counts
@@ -1,17 +1,23 @@
+from typing import Any, Iterator, Optional, Tuple
+
 from ..services.company_catalog import list_companies
-from ..services.recruit_store import RecruitStore
+from ..services.recruit_store import RecruitStore, get_recruit_store
 from ..utils.llm_client import LLMClient
+from ..utils.logger import get_logger
+
+logger = get_logger('wannian.recruit_chat_service')
 
 
 class RecruitChatService:
-    def __init__(self):
-        self.store = RecruitStore()
+    def __init__(self, store: Optional[RecruitStore] = None):
+        self.store = store or get_recruit_store()
         self.llm = LLMClient()
 
     def _company(self, company_id: str) -> dict:
         return next((c for c in list_companies() if c["id"] == company_id), None) or {}
 
-    def send(self, application_id: str, user_message: str) -> dict:
+    def _prepare(self, application_id: str, user_message: str) -> Tuple[dict, dict, str, list]:
+        """校验投递记录并构造对话消息，返回 (app, company, contact_type, messages)"""
         app = self.store.get_application(application_id)
         if not app:
             raise ValueError("application_id 不存在")
@@ -31,7 +37,7 @@ class RecruitChatService:
         candidate_title = (resume.get("basics") or {}).get("title") or ""
         summary = resume.get("summary") or ""
 
-        last_msgs = self.store.list_chat_messages(application_id)[-12:]
+        last_msgs = self.store.list_chat_messages(application_id, limit=12)
 
         system = (
             f"你正在扮演 {company_name} 的{persona}，通过类似微信的聊天方式与候选人沟通。\n"
@@ -60,6 +66,17 @@ class RecruitChatService:
                 messages.append({"role": role, "content": content})
 
         messages.append({"role": "user", "content": user_message})
+        return app, company, contact_type, messages
+
+    def _save_turn(self, application_id: str, user_message: str, assistant_text: str) -> None:
+        # 一问一答作为一组写入，并发发送时不会与其他请求的消息交错
+        self.store.append_chat_messages(application_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_text}
+        ])
+
+    def send(self, application_id: str, user_message: str) -> dict:
+        app, company, contact_type, messages = self._prepare(application_id, user_message)
 
         assistant_text = self.llm.chat(
             messages=messages,
@@ -68,9 +85,7 @@ class RecruitChatService:
             use_boost=True
         ) or ""
         assistant_text = assistant_text.strip()
-
-        self.store.append_chat_message(application_id, "user", user_message)
-        self.store.append_chat_message(application_id, "assistant", assistant_text)
+        self._save_turn(application_id, user_message, assistant_text)
 
         return {
             "application": app,
@@ -79,3 +94,35 @@ class RecruitChatService:
             "message": assistant_text
         }
 
+    def send_stream(self, application_id: str, user_message: str) -> Iterator[Tuple[str, Any]]:
+        """流式版本的 send：校验在调用时立即进行（失败抛出 ValueError），返回 (event, data) 事件迭代器
+
+        - meta：投递记录、公司与联系人类型
+        - delta：回复的增量文本
+        - done：完整回复；一问一答在此之前写入存储（只写入一次）
+        - error：生成失败，本轮消息不写入
+        """
+        app, company, contact_type, messages = self._prepare(application_id, user_message)
+
+        def events() -> Iterator[Tuple[str, Any]]:
+            yield "meta", {"application": app, "company": company, "contact_type": contact_type}
+            parts = []
+            try:
+                for delta in self.llm.chat_stream(
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=800,
+                    use_boost=True
+                ):
+                    parts.append(delta)
+                    yield "delta", {"delta": delta}
+            except Exception as e:
+                logger.error(f"流式聊天生成失败: {str(e)}")
+                yield "error", {"error": str(e)}
+                return
+
+            assistant_text = "".join(parts).strip()
+            self._save_turn(application_id, user_message, assistant_text)
+            yield "done", {"message": assistant_text}
+
+        return events()
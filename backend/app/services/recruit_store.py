@@ -1,134 +1,156 @@
-import json
 import os
 import random
 import threading
 import time
 import uuid
-from typing import Optional
+from typing import List, Optional, Tuple
+
+from ..config import Config
+from ..utils.locks import StripedLock
+from .chat_journal import ChatJournal
+from .recruit_backends import JsonRecruitBackend, RecruitBackend, SqliteRecruitBackend
+
+
+_json_backends = {}
+_json_backends_lock = threading.Lock()
+
+
+def _shared_json_backend(data_dir: str) -> JsonRecruitBackend:
+    # 同一数据目录在进程内只能有一个 json 后端实例：
+    # 各实例的内存文档、写回队列与消息日志索引互相不可见，并存会丢失更新
+    with _json_backends_lock:
+        backend = _json_backends.get(data_dir)
+        if backend is None:
+            journal = ChatJournal(
+                os.path.join(data_dir, 'chat_journal'),
+                segment_max_bytes=Config.RECRUIT_JOURNAL_SEGMENT_BYTES,
+                fsync_batch=Config.RECRUIT_JOURNAL_FSYNC_BATCH,
+                fsync_interval=Config.RECRUIT_JOURNAL_FSYNC_INTERVAL,
+                compact_segments=Config.RECRUIT_JOURNAL_COMPACT_SEGMENTS,
+                history_cache_size=Config.RECRUIT_HISTORY_CACHE_SIZE
+            )
+            backend = _json_backends[data_dir] = JsonRecruitBackend(
+                os.path.join(data_dir, 'recruit_store.json'),
+                journal=journal,
+                durability=Config.RECRUIT_DURABILITY,
+                flush_interval=Config.RECRUIT_FLUSH_INTERVAL,
+                stat_interval=Config.RECRUIT_CACHE_STAT_INTERVAL
+            )
+        return backend
+
+
+def create_backend(kind: Optional[str] = None, data_dir: Optional[str] = None) -> RecruitBackend:
+    kind = (kind or Config.RECRUIT_STORE_BACKEND or "sqlite").lower()
+    data_dir = data_dir or Config.RECRUIT_DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    json_path = os.path.join(data_dir, 'recruit_store.json')
+    if kind == "json":
+        return _shared_json_backend(data_dir)
+    if kind == "sqlite":
+        # 首次打开时自动从旧版 JSON 文件迁移
+        return SqliteRecruitBackend(
+            os.path.join(data_dir, 'recruit_store.db'),
+            json_path=json_path,
+            durability=Config.RECRUIT_DURABILITY,
+            history_cache_size=Config.RECRUIT_HISTORY_CACHE_SIZE
+        )
+    raise ValueError(f"未知的 RECRUIT_STORE_BACKEND: {kind}")
+
+
+def encode_cursor(application: dict) -> str:
+    return f"{application.get('created_at') or 0}:{application['id']}"
+
+
+def parse_cursor(cursor: str) -> Tuple[int, str]:
+    created_at, sep, app_id = cursor.partition(":")
+    if not sep or not app_id or not created_at.isdigit():
+        raise ValueError("before 游标格式无效")
+    return int(created_at), app_id
 
 
 class RecruitStore:
-    def __init__(self):
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        data_dir = os.path.join(base_dir, 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        self.path = os.path.join(data_dir, 'recruit_store.json')
-        self._lock = threading.Lock()
-
-    def _load(self) -> dict:
-        if not os.path.exists(self.path):
-            return {"resumes": {}, "applications": {}, "chats": {}}
-        with open(self.path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        data.setdefault("resumes", {})
-        data.setdefault("applications", {})
-        data.setdefault("chats", {})
-        return data
-
-    def _save(self, data: dict) -> None:
-        tmp = self.path + ".tmp"
-        with open(tmp, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        os.replace(tmp, self.path)
+    """求职数据存储
+
+    写操作按 key（简历 id / 投递 id）加分条锁：同一份简历或同一个会话的写入串行执行，
+    不同会话之间互不阻塞。跨进程的互斥由后端负责（SQLite 事务锁 / json 后端的文件锁）。
+    进程内应通过 get_recruit_store() 共享同一个实例。
+    """
+
+    def __init__(self, backend: Optional[RecruitBackend] = None, stripes: int = 64):
+        self.backend = backend or create_backend()
+        self._locks = StripedLock(stripes)
+
+    def lock_for(self, key: str):
+        """返回 key 对应的锁，调用方可用它把“读-生成-写”组合成一次互斥操作"""
+        return self._locks.lock_for(key)
 
     def upsert_resume(self, resume_id: str, resume: dict) -> dict:
-        with self._lock:
-            data = self._load()
-            data["resumes"][resume_id] = {
-                "id": resume_id,
-                "resume": resume,
-                "created_at": data["resumes"].get(resume_id, {}).get("created_at") or int(time.time()),
-                "updated_at": int(time.time())
-            }
-            self._save(data)
-            return data["resumes"][resume_id]
+        with self._locks.hold(f"resume:{resume_id}"):
+            return self.backend.upsert_resume(resume_id, resume)
 
     def get_resume(self, resume_id: str) -> Optional[dict]:
-        with self._lock:
-            data = self._load()
-            return data["resumes"].get(resume_id)
+        return self.backend.get_resume(resume_id)
 
     def create_application(self, resume_id: str, company: dict) -> dict:
         app_id = str(uuid.uuid4())
         now = int(time.time())
         contact_type = random.choice(["hr", "headhunter"])
-        with self._lock:
-            data = self._load()
-            data["applications"][app_id] = {
-                "id": app_id,
-                "resume_id": resume_id,
-                "company_id": company["id"],
-                "company_name": company["name"],
-                "contact_type": contact_type,
-                "status": "applied",
-                "created_at": now,
-                "updated_at": now
-            }
-            self._save(data)
-            return data["applications"][app_id]
+        return self.backend.insert_application({
+            "id": app_id,
+            "resume_id": resume_id,
+            "company_id": company["id"],
+            "company_name": company["name"],
+            "contact_type": contact_type,
+            "status": "applied",
+            "created_at": now,
+            "updated_at": now
+        })
 
     def get_application(self, application_id: str) -> Optional[dict]:
-        with self._lock:
-            data = self._load()
-            return data["applications"].get(application_id)
-
-    def list_applications(self, resume_id: Optional[str] = None) -> list:
-        with self._lock:
-            data = self._load()
-            apps = list(data["applications"].values())
-        if resume_id:
-            apps = [a for a in apps if a.get("resume_id") == resume_id]
-        apps.sort(key=lambda x: x.get("created_at", 0), reverse=True)
-        return apps
+        return self.backend.get_application(application_id)
+
+    def list_applications(
+        self,
+        resume_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        before: Optional[str] = None
+    ) -> list:
+        """按创建时间倒序列出投递记录
+
+        Args:
+            resume_id: 只返回该简历的投递
+            limit: 每页条数，None 表示不分页
+            before: 上一页返回的 next_cursor，只返回比它更早的记录
+        """
+        return self.backend.list_applications(resume_id, limit, parse_cursor(before) if before else None)
 
     def get_or_create_chat(self, application: dict) -> dict:
-        app_id = application["id"]
-        with self._lock:
-            data = self._load()
-            if app_id in data["chats"]:
-                return data["chats"][app_id]
-            chat_id = str(uuid.uuid4())
-            data["chats"][app_id] = {
-                "id": chat_id,
-                "application_id": app_id,
-                "company_id": application.get("company_id"),
-                "company_name": application.get("company_name"),
-                "contact_type": application.get("contact_type") or "hr",
-                "created_at": int(time.time()),
-                "messages": []
-            }
-            self._save(data)
-            return data["chats"][app_id]
-
-    def list_chat_messages(self, application_id: str) -> list:
-        with self._lock:
-            data = self._load()
-            chat = data["chats"].get(application_id)
-            if not chat:
-                return []
-            return list(chat.get("messages") or [])
+        with self._locks.hold(f"application:{application['id']}"):
+            return self.backend.get_or_create_chat(application)
+
+    def list_chat_messages(self, application_id: str, limit: Optional[int] = None) -> list:
+        """获取会话消息；指定 limit 时只返回最近 limit 条"""
+        return self.backend.list_chat_messages(application_id, limit)
 
     def append_chat_message(self, application_id: str, role: str, content: str) -> dict:
-        now = int(time.time())
-        with self._lock:
-            data = self._load()
-            chat = data["chats"].get(application_id)
-            if not chat:
-                app = data["applications"].get(application_id)
-                if not app:
-                    raise ValueError("application_id 不存在")
-                chat = {
-                    "id": str(uuid.uuid4()),
-                    "application_id": application_id,
-                    "company_id": app.get("company_id"),
-                    "company_name": app.get("company_name"),
-                    "contact_type": app.get("contact_type") or "hr",
-                    "created_at": now,
-                    "messages": []
-                }
-                data["chats"][application_id] = chat
-            chat.setdefault("messages", [])
-            chat["messages"].append({"role": role, "content": content, "ts": now})
-            self._save(data)
-            return chat
+        with self._locks.hold(f"application:{application_id}"):
+            return self.backend.append_chat_message(application_id, role, content)
+
+    def append_chat_messages(self, application_id: str, messages: List[dict]) -> dict:
+        """按顺序追加多条消息，其他线程的消息不会插入其中"""
+        with self._locks.hold(f"application:{application_id}"):
+            return self.backend.append_chat_messages(application_id, messages)
+
+
+_store: Optional[RecruitStore] = None
+_store_lock = threading.Lock()
+
 
+def get_recruit_store() -> RecruitStore:
+    """进程内共享的 RecruitStore 实例"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RecruitStore()
+    return _store
@@ -0,0 +1,152 @@
+"""
+大师报告语料
+一次会话内所有大师报告的段落只切分、分类一次，聚合各阶段共用同一份段落数组与倒排索引
+"""
+
+import bisect
+import heapq
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple, Union
+
+from .paragraph_classifier import DIMENSION_KEYWORDS, ParagraphFeatures, classify_paragraph, paragraph_features
+
+
+class CandidatePool:
+    """某年份、某维度的候选段落池，每个会话只构建一次
+
+    entries 为 (段落, 大师) 列表，按原文顺序；by_master 为每位大师的候选下标（按大师首次出现的顺序）。
+    "段落前 50 字出现在已使用文本中" 的排除结果按已使用文本缓存，反复抽取时只需合并几个集合。
+    """
+
+    def __init__(self, entries: List[Tuple[str, str]]):
+        self.entries = entries
+        self.by_master: Dict[str, List[int]] = {}
+        for i, (_, master) in enumerate(entries):
+            self.by_master.setdefault(master, []).append(i)
+        self._prefixes = [para[:50] for para, _ in entries]
+        self._excluded_by_text: Dict[str, FrozenSet[int]] = {}
+
+    def excluded_by_texts(self, texts: Iterable[str]) -> Set[int]:
+        excluded: Set[int] = set()
+        for text in texts:
+            ids = self._excluded_by_text.get(text)
+            if ids is None:
+                ids = self._excluded_by_text[text] = frozenset(
+                    i for i, prefix in enumerate(self._prefixes) if prefix in text
+                )
+            excluded |= ids
+        return excluded
+
+    def available(
+        self,
+        exclude_texts: Iterable[str] = (),
+        exclude_masters: Iterable[str] = ()
+    ) -> Dict[str, List[int]]:
+        """去掉已使用的大师与文本后剩余的候选下标，按大师分组"""
+        excluded = self.excluded_by_texts(exclude_texts) if exclude_texts else None
+        blocked = set(exclude_masters)
+        result = {}
+        for master, ids in self.by_master.items():
+            if master in blocked:
+                continue
+            kept = [i for i in ids if i not in excluded] if excluded else ids
+            if kept:
+                result[master] = kept
+        return result
+
+
+class ReportCorpus:
+    """段落数组 + 按大师的偏移 + 维度/年份倒排索引
+
+    paragraphs、features 按大师到达顺序平铺存放，第 i 位大师的段落为 paragraphs[start:end]；
+    倒排索引记录每个维度、每个年份命中的段落下标（升序），
+    查询某维度某年份的候选段落时只合并两个有序列表，不再遍历全部段落。
+    """
+
+    def __init__(self):
+        self.paragraphs: List[str] = []
+        self.features: List[ParagraphFeatures] = []
+        # 每位大师的 (name, start, end)
+        self.reports: List[Tuple[str, int, int]] = []
+        self._starts: List[int] = []
+        # 同名大师以最后一份报告为准（与按名字建立映射的旧逻辑一致）
+        self._by_name: Dict[str, int] = {}
+        self._by_dimension: Dict[str, List[int]] = {dim: [] for dim in DIMENSION_KEYWORDS}
+        self._by_year: Dict[str, List[int]] = {}
+        self._texts: Dict[str, str] = {}
+        self._pools: Dict[Tuple[str, str, int], CandidatePool] = {}
+
+    @classmethod
+    def from_reports(cls, preprocessed_reports: Iterable[Dict[str, Any]]) -> "ReportCorpus":
+        """由 [{'name': ..., 'paragraphs': [...]}, ...] 形式的预处理报告构建"""
+        corpus = cls()
+        for report in preprocessed_reports:
+            corpus.add(report.get("name", "未知大师"), report.get("paragraphs", []), paragraph_features(report))
+        return corpus
+
+    @classmethod
+    def ensure(cls, source: Union["ReportCorpus", Iterable[Dict[str, Any]]]) -> "ReportCorpus":
+        return source if isinstance(source, cls) else cls.from_reports(source)
+
+    def add(self, name: str, paragraphs: List[str], features: List[ParagraphFeatures] = None) -> None:
+        if features is None:
+            features = [classify_paragraph(p) for p in paragraphs]
+        start = len(self.paragraphs)
+        self.paragraphs.extend(paragraphs)
+        self.features.extend(features)
+        for offset, f in enumerate(features):
+            index = start + offset
+            for dim, hits in f.dimension_hits.items():
+                if hits:
+                    self._by_dimension[dim].append(index)
+            for year in f.years:
+                self._by_year.setdefault(year, []).append(index)
+        self._by_name[name] = len(self.reports)
+        self.reports.append((name, start, len(self.paragraphs)))
+        self._starts.append(start)
+        self._texts.pop(name, None)
+        self._pools.clear()
+
+    def __len__(self) -> int:
+        return len(self.reports)
+
+    def master_of(self, index: int) -> str:
+        """段落下标对应的大师名"""
+        return self.reports[bisect.bisect_right(self._starts, index) - 1][0]
+
+    def has_master(self, name: str) -> bool:
+        return name in self._by_name
+
+    def master_text(self, name: str) -> str:
+        """该大师全部段落以空格连接的文本（缓存）"""
+        text = self._texts.get(name)
+        if text is None:
+            _, start, end = self.reports[self._by_name[name]]
+            text = self._texts[name] = " ".join(self.paragraphs[start:end])
+        return text
+
+    def relevant(self, dimension: str, year: str) -> List[int]:
+        """包含该维度关键词或提到该年份（形如 "2026年"）的段落下标，按原文顺序"""
+        by_dim = self._by_dimension.get(dimension, [])
+        by_year = self._by_year.get(year[:4], []) if year else []
+        if not by_year:
+            return by_dim
+        if not by_dim:
+            return by_year
+        merged = []
+        for index in heapq.merge(by_dim, by_year):
+            if not merged or merged[-1] != index:
+                merged.append(index)
+        return merged
+
+    def candidate_pool(self, dimension: str, year: str, min_length: int = 15) -> CandidatePool:
+        """相关且不短于 min_length 的段落组成的候选池（按维度、年份缓存，语料新增报告时失效）"""
+        key = (dimension, year[:4] if year else "", min_length)
+        pool = self._pools.get(key)
+        if pool is None:
+            paragraphs = self.paragraphs
+            pool = self._pools[key] = CandidatePool([
+                (paragraphs[i], self.master_of(i))
+                for i in self.relevant(dimension, year)
+                if len(paragraphs[i]) >= min_length
+            ])
+        return pool
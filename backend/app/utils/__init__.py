@@ -2,6 +2,6 @@
 工具模块
 """
 
-from .llm_client import LLMClient
+from .llm_client import AsyncLLMClient, LLMClient
 
-__all__ = ['LLMClient']
+__all__ = ['LLMClient', 'AsyncLLMClient']
@@ -0,0 +1,49 @@
+"""
+异步运行时
+进程内共享的后台事件循环，供同步代码（Flask 请求、后台线程）提交协程
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+from .logger import get_logger
+
+logger = get_logger('wannian.async_runtime')
+
+
+class AsyncRuntime:
+    """在守护线程中运行的事件循环"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="async-runtime", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """在事件循环中调度协程，返回可在任意线程等待的 Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """提交协程并阻塞等待结果（不能在事件循环线程内调用）"""
+        return self.submit(coro).result(timeout)
+
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_async_runtime() -> AsyncRuntime:
+    """进程内共享的异步运行时"""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = AsyncRuntime()
+                logger.info("异步运行时已启动")
+    return _runtime
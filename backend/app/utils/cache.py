@@ -0,0 +1,201 @@
+"""
+缓存工具
+按字节数限制容量的 LRU + TTL 内存缓存，可选 SQLite 磁盘层
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger('wannian.cache')
+
+
+class TieredCache:
+    """两级字符串缓存
+
+    - 内存层：按值的 UTF-8 字节数计算占用，超过 max_bytes 时淘汰最久未使用的条目
+    - 磁盘层（可选）：SQLite 文件，写入时同步写入，内存未命中时回读并提升到内存，进程重启后仍然有效
+    - 两层都按 ttl 秒过期；ttl 为 0 或负数表示不过期
+    """
+
+    # 每写入多少次清理一次磁盘层的过期条目
+    PURGE_EVERY = 256
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 0, disk_path: Optional[str] = None):
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = ttl
+        self.disk_path = disk_path or None
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, size)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._writes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "sets": 0}
+        self._local = threading.local()
+        if self.disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+            self._purge_disk()
+
+    # ------------------------------------------------------------------
+    # 磁盘层
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.disk_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key: str) -> Optional[Tuple[str, float]]:
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取磁盘缓存失败: {str(e)}")
+            return None
+        return (row[0], row[1]) if row else None
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"写入磁盘缓存失败: {str(e)}")
+
+    def _disk_delete(self, key: Optional[str] = None) -> None:
+        try:
+            with self._connect() as conn:
+                if key is None:
+                    conn.execute("DELETE FROM cache")
+                else:
+                    conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"删除磁盘缓存失败: {str(e)}")
+
+    def _purge_disk(self) -> None:
+        try:
+            with self._connect() as conn:
+                removed = conn.execute(
+                    "DELETE FROM cache WHERE expires_at > 0 AND expires_at <= ?", (time.time(),)
+                ).rowcount
+            if removed:
+                logger.info(f"已清理 {removed} 条过期的磁盘缓存")
+        except sqlite3.Error as e:
+            logger.warning(f"清理磁盘缓存失败: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # 内存层（调用方需持有 self._lock）
+    # ------------------------------------------------------------------
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _insert(self, key: str, value: str, expires_at: float) -> None:
+        if key in self._entries:
+            self._remove(key)
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl if self.ttl and self.ttl > 0 else 0
+
+    @staticmethod
+    def _expired(expires_at: float) -> bool:
+        return bool(expires_at) and expires_at <= time.time()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[0]
+                self._remove(key)
+                self._stats["expirations"] += 1
+
+        if self.disk_path:
+            found = self._disk_get(key)
+            if found is not None:
+                value, expires_at = found
+                if not self._expired(expires_at):
+                    with self._lock:
+                        self._insert(key, value, expires_at)
+                        self._stats["disk_hits"] += 1
+                    return value
+                self._disk_delete(key)
+                with self._lock:
+                    self._stats["expirations"] += 1
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = self._expires_at()
+        with self._lock:
+            self._insert(key, value, expires_at)
+            self._stats["sets"] += 1
+            self._writes += 1
+            purge = self._writes % self.PURGE_EVERY == 0
+        if self.disk_path:
+            self._disk_set(key, value, expires_at)
+            if purge:
+                self._purge_disk()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_path:
+            self._disk_delete()
+
+    def stats(self) -> Dict[str, object]:
+        """命中/未命中/淘汰等计数与当前占用"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk": bool(self.disk_path)
+            })
+        if self.disk_path:
+            try:
+                stats["disk_entries"] = self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            except sqlite3.Error:
+                stats["disk_entries"] = None
+        return stats
@@ -0,0 +1,56 @@
+"""
+响应压缩
+对较大的 JSON / 文本响应按 Accept-Encoding 进行 brotli（需安装 brotli）或 gzip 压缩
+"""
+
+import gzip
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # 未安装时只使用 gzip
+    brotli = None
+
+from ..config import Config
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def _accepts(encoding: str) -> bool:
+    return request.accept_encodings[encoding] > 0
+
+
+def compress_response(response: Response) -> Response:
+    """after_request 钩子：满足条件时压缩响应体（流式响应、304、已编码的响应不处理）"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in _COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.RESPONSE_COMPRESSION_MIN_SIZE:
+        return response
+
+    if brotli is not None and _accepts("br"):
+        body, encoding = brotli.compress(data, quality=Config.RESPONSE_COMPRESSION_LEVEL), "br"
+    elif _accepts("gzip"):
+        body, encoding = gzip.compress(data, compresslevel=Config.RESPONSE_COMPRESSION_LEVEL), "gzip"
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(body))
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    if Config.RESPONSE_COMPRESSION:
+        app.after_request(compress_response)
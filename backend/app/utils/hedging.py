@@ -0,0 +1,105 @@
+"""
+请求对冲
+按近期耗时的分位数识别慢请求，向加速端点补发一份相同请求，先成功返回者胜出
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional
+
+
+class HedgeCancelled(Exception):
+    """同一任务的另一份请求已经胜出，本次尝试提前结束"""
+
+
+class HedgeRace:
+    """同一任务的主请求与对冲请求之间的竞争
+
+    第一个成功返回的尝试胜出；决出胜者后 cancelled 被置位，
+    仍在流式输出的另一份请求在下一个增量处停止，尚在排队的直接取消。
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        # 主请求实际开始执行的时间（不含排队），由执行线程写入
+        self.started_at: Optional[float] = None
+        self.cached = False
+        self.hedged = False
+        self.winner: Optional[str] = None
+        self.futures: List[Future] = []
+
+    @property
+    def in_flight(self) -> int:
+        return sum(1 for f in self.futures if not f.done())
+
+    def settle(self, winner: str) -> None:
+        self.winner = winner
+        self.cancelled.set()
+        for future in self.futures:
+            future.cancel()
+
+
+class HedgePolicy:
+    """对冲策略与统计
+
+    对冲延迟取最近 window 次耗时的 percentile 分位数（不低于 min_delay），且不超过软截止时间 soft_deadline；
+    样本不足 min_samples 时直接使用软截止时间。超过硬截止时间 hard_deadline（0 表示不限）的任务不再等待。
+    """
+
+    def __init__(
+        self,
+        soft_deadline: float,
+        hard_deadline: float = 0,
+        percentile: float = 0.9,
+        min_delay: float = 5.0,
+        window: int = 200,
+        min_samples: int = 10
+    ):
+        self.soft_deadline = soft_deadline
+        self.hard_deadline = hard_deadline
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self._stats = {"hedged": 0, "hedge_wins": 0, "primary_wins": 0, "deadline_exceeded": 0}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def latency_percentile(self) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        observed = self.latency_percentile()
+        if observed is None:
+            return self.soft_deadline
+        return min(self.soft_deadline, max(self.min_delay, observed))
+
+    def note(self, event: str, **info: Any) -> None:
+        """记录对冲事件：hedged / hedge_wins / primary_wins / deadline_exceeded"""
+        with self._lock:
+            self._stats[event] += 1
+            if info:
+                self._recent.append({"event": event, **info})
+
+    def stats(self) -> Dict[str, Any]:
+        observed = self.latency_percentile()
+        delay = self.hedge_delay()
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "samples": len(self._samples),
+                f"p{int(self.percentile * 100)}_seconds": round(observed, 3) if observed is not None else None,
+                "hedge_delay_seconds": round(delay, 3),
+                "hard_deadline_seconds": self.hard_deadline,
+                "recent": list(self._recent)
+            })
+        return stats
@@ -3,12 +3,51 @@ LLM客户端封装
 统一使用OpenAI格式调用
 """
 
+import asyncio
+import hashlib
 import json
-from typing import Optional, Dict, Any, List
-from openai import OpenAI
+import re
+import time
+from typing import Optional, Dict, Any, List, AsyncIterator, Iterator
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import httpx
+except ImportError:  # 未安装时使用 openai SDK 默认的连接池
+    httpx = None
 
 from ..config import Config
-from .retry import retry_with_backoff
+from .rate_limiter import get_endpoint_limiter
+from .retry import retry_with_backoff, retry_with_backoff_async
+from .single_flight import SingleFlight, get_single_flight
+
+# 流式请求在开始输出前失败时的重试策略（与 chat 的 retry_with_backoff 参数一致）
+STREAM_MAX_RETRIES = 3
+STREAM_INITIAL_DELAY = 2.0
+STREAM_MAX_DELAY = 60.0
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _parse_json_response(response: str) -> Dict[str, Any]:
+    """解析 JSON 响应，兼容包裹在代码块或前后带有说明文字的情况"""
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        # 如果解析失败，尝试提取代码块中的JSON
+        json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(1))
+        
+        # 尝试提取最外层的 { }
+        json_match = re.search(r'(\{.*\})', response, re.DOTALL)
+        if json_match:
+            return json.loads(json_match.group(1))
+        
+        raise
 
 
 class LLMClient:
@@ -18,7 +57,8 @@ class LLMClient:
         self,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        single_flight: Optional[SingleFlight] = None
     ):
         self.api_key = api_key or Config.LLM_API_KEY
         self.base_url = base_url or Config.LLM_BASE_URL
@@ -42,19 +82,55 @@ class LLMClient:
                 base_url=boost_base_url,
                 timeout=300.0
             )
-    
-    @retry_with_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0, exceptions=(Exception,))
+
+        # 合并进行中的相同请求（LLM_SINGLE_FLIGHT），默认使用进程级共享的合并器
+        if single_flight is None and Config.LLM_SINGLE_FLIGHT:
+            single_flight = get_single_flight("llm")
+        self.single_flight = single_flight
+
+    def _request_key(self, messages: List[Dict[str, str]], **params: Any) -> str:
+        request = json.dumps(
+            {"base_url": self.base_url, "model": self.model, "messages": messages, **params},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.md5(request.encode("utf-8")).hexdigest()
+
     def chat(
         self,
         messages: List[Dict[str, str]],
         temperature: float = 0.7,
         max_tokens: int = 4096,
         response_format: Optional[Dict] = None,
-        use_boost: bool = False
+        use_boost: bool = False,
+        coalesce: Optional[bool] = None
     ) -> str:
         """
         发送聊天请求
+
+        配置了 single_flight 时，参数完全相同且仍在进行中的请求只发送一次，其余调用等待并共享同一个结果。
+        采样请求（temperature > 0）每次调用都应得到独立的采样，默认不合并；
+        coalesce=True 时显式合并（调用方接受共享同一份采样），coalesce=False 时总是单独发送
         """
+        if coalesce is None:
+            coalesce = temperature == 0
+        if self.single_flight is None or not coalesce:
+            return self._chat(messages, temperature, max_tokens, response_format, use_boost)
+        key = self._request_key(
+            messages, temperature=temperature, max_tokens=max_tokens,
+            response_format=response_format, use_boost=use_boost
+        )
+        result, _ = self.single_flight.do(key, self._chat, messages, temperature, max_tokens, response_format, use_boost)
+        return result
+
+    @retry_with_backoff(max_retries=3, initial_delay=2.0, max_delay=60.0, exceptions=(Exception,))
+    def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_format: Optional[Dict],
+        use_boost: bool
+    ) -> str:
         from openai import APIConnectionError, APITimeoutError
         
         # 如果指定使用加速模型且配置了加速模型，则尝试切换
@@ -70,7 +146,9 @@ class LLMClient:
                     kwargs["response_format"] = response_format
                 
                 # 加速模型使用更短的超时，如果慢就不用了
-                response = self.boost_client.chat.completions.create(**kwargs)
+                with get_endpoint_limiter("boost").limit(messages, max_tokens) as permit:
+                    response = self.boost_client.chat.completions.create(**kwargs)
+                    permit.used_tokens = _usage_tokens(response)
                 return response.choices[0].message.content
             except (APIConnectionError, APITimeoutError) as e:
                 from .logger import get_logger
@@ -93,7 +171,9 @@ class LLMClient:
             kwargs["response_format"] = response_format
         
         try:
-            response = self.client.chat.completions.create(**kwargs)
+            with get_endpoint_limiter("main").limit(messages, max_tokens) as permit:
+                response = self.client.chat.completions.create(**kwargs)
+                permit.used_tokens = _usage_tokens(response)
             return response.choices[0].message.content
         except APIConnectionError as e:
             from .logger import get_logger
@@ -102,6 +182,84 @@ class LLMClient:
             # 对于连接错误，重试可能没用，直接抛出以便上层触发 fallback
             raise
     
+    def _stream_from(
+        self,
+        client: OpenAI,
+        model: str,
+        endpoint: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> Iterator[str]:
+        with get_endpoint_limiter(endpoint).limit(messages, max_tokens) as permit:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            try:
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        permit.used_tokens = _usage_tokens(chunk)
+                    if chunk.choices:
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yield delta
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        use_boost: bool = False
+    ) -> Iterator[str]:
+        """
+        流式发送聊天请求，逐段产出增量文本
+
+        尚未产出任何内容时的失败与 chat 一样退避重试（加速模型失败则退回主模型）；
+        已经产出部分内容后出错直接抛出，避免调用方收到重复文本。
+        流式请求不经 single_flight 合并，每次调用都是独立的采样；需要共享结果的调用方自行合并
+        （如大师推演按报告缓存 key 合并，与报告缓存复用同一份采样的语义一致）。
+        """
+        from .logger import get_logger
+        logger = get_logger('wannian.llm')
+
+        if use_boost and self.boost_client:
+            started = False
+            try:
+                for delta in self._stream_from(
+                    self.boost_client, Config.LLM_BOOST_MODEL_NAME, "boost", messages, temperature, max_tokens
+                ):
+                    started = True
+                    yield delta
+                return
+            except Exception as e:
+                if started:
+                    raise
+                logger.warning(f"加速模型流式调用异常，正在退回到主模型: {str(e)}")
+
+        delay = STREAM_INITIAL_DELAY
+        for attempt in range(STREAM_MAX_RETRIES + 1):
+            started = False
+            try:
+                for delta in self._stream_from(self.client, self.model, "main", messages, temperature, max_tokens):
+                    started = True
+                    yield delta
+                return
+            except Exception as e:
+                if started or attempt == STREAM_MAX_RETRIES:
+                    logger.error(f"LLM 流式调用失败: {str(e)}")
+                    raise
+                logger.warning(f"LLM 流式调用第 {attempt + 1} 次尝试失败: {str(e)}, {delay:.1f}秒后重试...")
+                time.sleep(delay)
+                delay = min(delay * 2, STREAM_MAX_DELAY)
+
     def chat_json(
         self,
         messages: List[Dict[str, str]],
@@ -130,26 +288,222 @@ class LLMClient:
                 use_boost=use_boost
             )
             
-            # 尝试直接解析
+            return _parse_json_response(response)
+        except Exception as e:
+            from .logger import get_logger
+            logger = get_logger('wannian.llm')
+            logger.error(f"LLM JSON 解析失败: {str(e)}")
+            logger.error(f"原始响应内容: {response if 'response' in locals() else 'None'}")
+            raise
+
+
+class AsyncLLMClient:
+    """基于 AsyncOpenAI 的异步 LLM 客户端
+
+    同一个实例内的请求复用底层 HTTP 连接池（keep-alive），并发请求数由信号量限制为 max_concurrency，
+    大量并发调用只占用一个事件循环而不是每个请求一个线程。
+    连接池与信号量绑定首次使用它们的事件循环，实例不要跨事件循环共享。
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ):
+        self.api_key = api_key or Config.LLM_API_KEY
+        self.base_url = base_url or Config.LLM_BASE_URL
+        self.model = model or Config.LLM_MODEL_NAME
+        self.max_concurrency = max_concurrency or Config.LLM_MAX_CONCURRENCY
+
+        if not self.api_key:
+            raise ValueError("LLM_API_KEY 未配置")
+
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=300.0,
+            http_client=self._http_client()
+        )
+
+        self.boost_client = None
+        if Config.LLM_BOOST_API_KEY:
+            self.boost_client = AsyncOpenAI(
+                api_key=Config.LLM_BOOST_API_KEY,
+                base_url=Config.LLM_BOOST_BASE_URL or self.base_url,
+                timeout=300.0,
+                http_client=self._http_client()
+            )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _http_client(self):
+        if httpx is None:
+            return None
+        return httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_ASYNC_MAX_CONNECTIONS
+            ),
+            timeout=300.0
+        )
+
+    def _limit(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @retry_with_backoff_async(max_retries=3, initial_delay=2.0, max_delay=60.0, exceptions=(Exception,))
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        response_format: Optional[Dict] = None,
+        use_boost: bool = False
+    ) -> str:
+        """
+        发送聊天请求（异步）
+        """
+        from openai import APIConnectionError, APITimeoutError
+        from .logger import get_logger
+        logger = get_logger('wannian.llm')
+
+        async with self._limit():
+            if use_boost and self.boost_client:
+                try:
+                    kwargs = {
+                        "model": Config.LLM_BOOST_MODEL_NAME,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                    }
+                    if response_format:
+                        kwargs["response_format"] = response_format
+                    async with get_endpoint_limiter("boost").limit_async(messages, max_tokens) as permit:
+                        response = await self.boost_client.chat.completions.create(**kwargs)
+                        permit.used_tokens = _usage_tokens(response)
+                    return response.choices[0].message.content
+                except (APIConnectionError, APITimeoutError) as e:
+                    logger.warning(f"加速模型连接失败或超时，跳过加速: {str(e)}")
+                except Exception as e:
+                    logger.warning(f"加速模型调用异常，正在退回到主模型: {str(e)}")
+
+            kwargs = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            }
+            if response_format:
+                kwargs["response_format"] = response_format
+
             try:
-                return json.loads(response)
-            except json.JSONDecodeError:
-                # 如果解析失败，尝试提取代码块中的JSON
-                import re
-                json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group(1))
-                
-                # 尝试提取最外层的 { }
-                json_match = re.search(r'(\{.*\})', response, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group(1))
-                
+                async with get_endpoint_limiter("main").limit_async(messages, max_tokens) as permit:
+                    response = await self.client.chat.completions.create(**kwargs)
+                    permit.used_tokens = _usage_tokens(response)
+                return response.choices[0].message.content
+            except APIConnectionError as e:
+                logger.error(f"LLM 连接拒绝 (10061) 或网络不可达: {str(e)}")
                 raise
+
+    async def _stream_from(
+        self,
+        client: AsyncOpenAI,
+        model: str,
+        endpoint: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        async with self._limit(), get_endpoint_limiter(endpoint).limit_async(messages, max_tokens) as permit:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        permit.used_tokens = _usage_tokens(chunk)
+                    if chunk.choices:
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yield delta
+            finally:
+                close = getattr(stream, "close", None)
+                if close:
+                    await close()
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        use_boost: bool = False
+    ) -> AsyncIterator[str]:
+        """流式发送聊天请求（异步），重试与回退规则同 LLMClient.chat_stream"""
+        from .logger import get_logger
+        logger = get_logger('wannian.llm')
+
+        if use_boost and self.boost_client:
+            started = False
+            try:
+                async for delta in self._stream_from(
+                    self.boost_client, Config.LLM_BOOST_MODEL_NAME, "boost", messages, temperature, max_tokens
+                ):
+                    started = True
+                    yield delta
+                return
+            except Exception as e:
+                if started:
+                    raise
+                logger.warning(f"加速模型流式调用异常，正在退回到主模型: {str(e)}")
+
+        delay = STREAM_INITIAL_DELAY
+        for attempt in range(STREAM_MAX_RETRIES + 1):
+            started = False
+            try:
+                async for delta in self._stream_from(self.client, self.model, "main", messages, temperature, max_tokens):
+                    started = True
+                    yield delta
+                return
+            except Exception as e:
+                if started or attempt == STREAM_MAX_RETRIES:
+                    logger.error(f"LLM 流式调用失败: {str(e)}")
+                    raise
+                logger.warning(f"LLM 流式调用第 {attempt + 1} 次尝试失败: {str(e)}, {delay:.1f}秒后重试...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, STREAM_MAX_DELAY)
+
+    async def chat_json(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.3,
+        max_tokens: int = 4096,
+        use_boost: bool = False
+    ) -> Dict[str, Any]:
+        """发送聊天请求并返回JSON（异步）"""
+        response = None
+        try:
+            response = await self.chat(
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                use_boost=use_boost
+            )
+            return _parse_json_response(response)
         except Exception as e:
             from .logger import get_logger
             logger = get_logger('wannian.llm')
             logger.error(f"LLM JSON 解析失败: {str(e)}")
-            logger.error(f"原始响应内容: {response if 'response' in locals() else 'None'}")
+            logger.error(f"原始响应内容: {response}")
             raise
 
+    async def aclose(self) -> None:
+        await self.client.close()
+        if self.boost_client:
+            await self.boost_client.close()
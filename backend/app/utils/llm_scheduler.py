@@ -0,0 +1,205 @@
+"""
+LLM 调度器
+进程级的 LLM 任务队列：全局并发上限 + 按会话轮转的公平排队
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..config import Config
+from .logger import get_logger
+
+logger = get_logger('wannian.llm_scheduler')
+
+
+class LLMScheduler:
+    """固定数量的工作线程执行 LLM 任务
+
+    每个 key（通常是推演会话 id）有独立队列，工作线程按 key 轮转取任务：
+    一个会话提交 49 个任务时，其他会话的任务不必排在它们后面，而是交替执行。
+    submit() 返回 concurrent.futures.Future，可配合 as_completed 使用。
+    run_async() 供事件循环中的协程使用：与线程任务在同一组队列中排队、共享同一个并发上限，
+    轮到时占用一个名额在调用方的事件循环中执行，不占用工作线程。
+    """
+
+    def __init__(self, max_concurrency: int = 16):
+        self.max_concurrency = max(1, max_concurrency)
+        self._cond = threading.Condition()
+        # key -> 待执行任务队列；OrderedDict 的顺序即轮转顺序
+        self._queues: "OrderedDict[str, Deque[Tuple[Future, Callable, tuple, dict, float]]]" = OrderedDict()
+        self._workers = []
+        self._active = 0
+        self._queued = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._started = 0
+
+    def _ensure_workers(self) -> None:
+        """按需启动工作线程（调用方需持有 self._cond）"""
+        while len(self._workers) < min(self.max_concurrency, self._queued + self._active):
+            worker = threading.Thread(
+                target=self._work, name=f"llm-worker-{len(self._workers)}", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def submit(self, key: str, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._queues.setdefault(key, deque()).append((future, fn, args, kwargs, time.monotonic()))
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        """取出轮转顺序中第一个 key 的队首任务，并把该 key 移到末尾（调用方需持有 self._cond）"""
+        key, queue = next(iter(self._queues.items()))
+        item = queue.popleft()
+        del self._queues[key]
+        if queue:
+            self._queues[key] = queue
+        self._queued -= 1
+        return item
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                # 协程任务占用名额但不占用工作线程，名额用尽时空闲的工作线程也要等待
+                while not self._queues or self._active >= self.max_concurrency:
+                    self._cond.wait()
+                future, fn, args, kwargs, enqueued_at = self._next()
+                if not future.set_running_or_notify_cancel():
+                    self._stats["cancelled"] += 1
+                    continue
+                waited = time.monotonic() - enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                self._started += 1
+                self._active += 1
+                if fn is None:
+                    # 协程任务：通知等待中的协程开始执行，名额由 run_async 结束时释放
+                    loop, granted = args
+                    try:
+                        loop.call_soon_threadsafe(_grant, granted)
+                    except RuntimeError:
+                        # 事件循环已关闭
+                        self._active -= 1
+                        self._stats["cancelled"] += 1
+                    continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                ok = False
+            else:
+                future.set_result(result)
+                ok = True
+            with self._cond:
+                self._active -= 1
+                self._stats["completed" if ok else "failed"] += 1
+
+    async def run_async(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """以 key 排队取得一个并发名额后执行 await fn(*args, **kwargs)，结束时释放名额"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        ticket: Future = Future()
+        with self._cond:
+            self._queues.setdefault(key, deque()).append((ticket, None, (loop, granted), {}, time.monotonic()))
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+        try:
+            await granted
+        except asyncio.CancelledError:
+            # 仍在排队时直接撤销；已分到名额（通知尚未送达）时归还名额
+            if not ticket.cancel():
+                self._release(False)
+            raise
+        ok = False
+        try:
+            result = await fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            self._release(ok)
+
+    def _release(self, ok: bool) -> None:
+        with self._cond:
+            self._active -= 1
+            self._stats["completed" if ok else "failed"] += 1
+            self._cond.notify()
+
+    def executor(self, key: str) -> "KeyedExecutor":
+        """返回绑定 key 的执行器视图，用法与 ThreadPoolExecutor 相同"""
+        return KeyedExecutor(self, key)
+
+    def queue_depth(self, key: Optional[str] = None) -> int:
+        with self._cond:
+            if key is None:
+                return self._queued
+            return len(self._queues.get(key) or ())
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度、活跃任务数与排队等待时间"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "max_concurrency": self.max_concurrency,
+                "workers": len(self._workers),
+                "active": self._active,
+                "queue_depth": self._queued,
+                "queued_keys": len(self._queues),
+                "queue_depth_by_key": {k: len(q) for k, q in self._queues.items()},
+                "avg_wait_seconds": round(self._wait_total / self._started, 3) if self._started else 0.0,
+                "max_wait_seconds": round(self._wait_max, 3)
+            })
+        return stats
+
+
+def _grant(granted: "asyncio.Future") -> None:
+    if not granted.done():
+        granted.set_result(None)
+
+
+class KeyedExecutor:
+    """把任务以固定 key 提交给 LLMScheduler；with 块退出时等待本执行器提交的任务全部结束"""
+
+    def __init__(self, scheduler: LLMScheduler, key: str):
+        self.scheduler = scheduler
+        self.key = key
+        self._futures: List[Future] = []
+
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        future = self.scheduler.submit(self.key, fn, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def __enter__(self) -> "KeyedExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wait(self._futures)
+        return False
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """进程内共享的 LLM 调度器"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(Config.LLM_MAX_CONCURRENCY)
+                logger.info(f"LLM 调度器已启动，全局并发上限: {_scheduler.max_concurrency}")
+    return _scheduler
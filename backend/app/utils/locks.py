@@ -0,0 +1,93 @@
+"""
+锁工具
+按 key 分条的线程锁与跨进程文件锁
+"""
+
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class StripedLock:
+    """按 key 哈希到固定数量的锁上
+
+    不同 key 大概率落在不同的锁上，可以并行；同一 key 始终使用同一把锁。
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def lock_for(self, key: str) -> threading.RLock:
+        return self._locks[zlib.crc32(str(key).encode('utf-8')) % len(self._locks)]
+
+    @contextmanager
+    def hold(self, key: str):
+        lock = self.lock_for(key)
+        with lock:
+            yield
+
+
+class FileLock:
+    """基于锁文件的跨进程互斥锁（POSIX 使用 flock，Windows 使用 msvcrt.locking）
+
+    文件锁属于打开的文件描述，同一进程内的多个线程需要额外的线程锁来互斥，因此内部组合了一把 RLock，可重入。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self) -> None:
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                if self._fd is None:
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                self._lock_fd()
+            except Exception:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock_fd()
+        self._thread_lock.release()
+
+    def _lock_fd(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            return
+        while True:
+            try:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.01)
+
+    def _unlock_fd(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
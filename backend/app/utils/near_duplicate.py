@@ -0,0 +1,165 @@
+"""
+近似重复检测
+- NearDuplicateIndex：字符 n-gram 的 MinHash 签名 + LSH 分桶，只与落入同一桶的文本比较，再用精确 Jaccard 系数确认
+- ContainmentIndex：前缀集合 + n-gram 倒排的子串查询
+两者都避免每条文本与所有已有文本逐一比较
+"""
+
+import random
+import zlib
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+_MASK32 = 0xFFFFFFFF
+
+
+class TextSketch:
+    """文本的 n-gram 集合与 MinHash 签名"""
+
+    __slots__ = ("shingles", "signature")
+
+    def __init__(self, shingles: FrozenSet[int], signature: Tuple[int, ...]):
+        self.shingles = shingles
+        self.signature = signature
+
+
+def jaccard(a: TextSketch, b: TextSketch) -> float:
+    if not a.shingles or not b.shingles:
+        return 0.0
+    inter = len(a.shingles & b.shingles)
+    return inter / (len(a.shingles) + len(b.shingles) - inter)
+
+
+class NearDuplicateIndex:
+    """MinHash LSH 索引
+
+    签名采用单次置换 MinHash（one permutation hashing）：每个 n-gram 只哈希一次，按哈希值分入 num_perm 个槽取最小值，
+    空槽从右侧最近的非空槽借值（循环），计算量与文本长度成正比，而不是文本长度 × num_perm。
+    签名均分为 bands 段，任一段完全相同的文本落入同一个桶成为候选；每段 rows = num_perm / bands 行，
+    候选阈值约为 (1 / bands) ** (1 / rows)。默认 32 / 16（rows=2，约 0.25）略低于 threshold，尽量不漏召回，
+    误召回由精确 Jaccard 过滤。n-gram 使用 crc32 哈希，签名在不同进程间保持一致。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.3,
+        num_perm: int = 32,
+        bands: int = 16,
+        shingle_size: int = 2,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm({num_perm}) 必须能被 bands({bands}) 整除")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = max(1, shingle_size)
+        rng = random.Random(seed)
+        # 32 位上的双射 ((x ^ xor) * mul) mod 2^32（mul 为奇数），作为对 crc32 的随机置换
+        self._xor = rng.getrandbits(32)
+        self._mul = rng.getrandbits(32) | 1
+        # 借用空槽时按距离加上的偏移，保证借来的值大于任何原值
+        self._offset = (_MASK32 // num_perm) + 1
+        # 每段一个桶表：段签名 -> 落入该桶的 key（连续重复的 key 只记一次）
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+
+    def shingles(self, text: str) -> FrozenSet[int]:
+        n = self.shingle_size
+        if len(text) <= n:
+            return frozenset([zlib.crc32(text.encode("utf-8"))]) if text else frozenset()
+        return frozenset(zlib.crc32(text[i:i + n].encode("utf-8")) for i in range(len(text) - n + 1))
+
+    def sketch(self, text: str) -> TextSketch:
+        shingles = self.shingles(text)
+        k = self.num_perm
+        if not shingles:
+            return TextSketch(shingles, ())
+        xor, mul = self._xor, self._mul
+        slots: List[Optional[int]] = [None] * k
+        for x in shingles:
+            slot, value = divmod(((x ^ xor) * mul) & _MASK32, self._offset)
+            current = slots[slot]
+            if current is None or value < current:
+                slots[slot] = value
+        # 空槽从右侧最近的非空槽借值（循环），距离越远偏移越大
+        signature = list(slots)
+        for i in range(k):
+            if signature[i] is None:
+                for distance in range(1, k):
+                    borrowed = slots[(i + distance) % k]
+                    if borrowed is not None:
+                        signature[i] = borrowed + distance * self._offset
+                        break
+        return TextSketch(shingles, tuple(signature))
+
+    def _band_keys(self, sketch: TextSketch):
+        rows = self.rows
+        sig = sketch.signature
+        for band in range(self.bands):
+            yield band, sig[band * rows:(band + 1) * rows]
+
+    def add(self, key: int, sketch: TextSketch) -> None:
+        """同一个 key 可以多次加入（如一组内的多条文本），查询时只返回一次"""
+        if not sketch.shingles:
+            return
+        for band, band_key in self._band_keys(sketch):
+            bucket = self._buckets[band].setdefault(band_key, [])
+            if not bucket or bucket[-1] != key:
+                bucket.append(key)
+
+    def candidates(self, sketch: TextSketch) -> List[int]:
+        """与 sketch 至少有一段签名相同的 key，升序"""
+        if not sketch.shingles:
+            return []
+        found = set()
+        for band, band_key in self._band_keys(sketch):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                found.update(bucket)
+        return sorted(found)
+
+    def is_similar(self, a: TextSketch, b: TextSketch) -> bool:
+        return jaccard(a, b) >= self.threshold
+
+
+class ContainmentIndex:
+    """子串查询索引：判断查询串是否出现在任一已登记的文本中（等价于 any(query in t for t in texts)）
+
+    前缀集合命中（查询串恰好是某条文本的开头）直接返回；否则取查询串中倒排列表最短的 n-gram，
+    只在包含该 n-gram 的文本里确认子串关系。查询串中任一 n-gram 从未出现过即可直接判定不存在。
+    """
+
+    def __init__(self, prefix_len: int = 50, ngram: int = 4):
+        self.prefix_len = prefix_len
+        self.ngram = ngram
+        self._texts: List[str] = []
+        self._prefixes = set()
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, text: str) -> None:
+        text_id = len(self._texts)
+        self._texts.append(text)
+        self._prefixes.add(text[:self.prefix_len])
+        n = self.ngram
+        for gram in {text[i:i + n] for i in range(len(text) - n + 1)}:
+            self._postings.setdefault(gram, []).append(text_id)
+
+    def contains(self, query: str) -> bool:
+        if not self._texts:
+            return False
+        if query in self._prefixes:
+            return True
+        n = self.ngram
+        if len(query) < n:
+            return any(query in text for text in self._texts)
+        shortest = None
+        for i in range(len(query) - n + 1):
+            posting = self._postings.get(query[i:i + n])
+            if posting is None:
+                return False
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+        return any(query in self._texts[text_id] for text_id in shortest)
@@ -0,0 +1,284 @@
+"""
+LLM 限流
+按端点（main / boost）的 RPM、TPM 令牌桶 + AIMD 自适应并发，在请求发出前限速，而不是等 429 之后再退避
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from .logger import get_logger
+
+logger = get_logger('wannian.rate_limiter')
+
+
+class TokenBucket:
+    """令牌桶：每分钟补充 per_minute 个令牌，最多积攒 burst 个
+
+    reserve() 立即扣减（余额可以为负）并返回需要等待的秒数，调用方按返回值等待后再发请求，
+    这样同步线程和协程都能使用，且先到先得。per_minute <= 0 表示不限。
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount: float) -> None:
+        """归还多扣的令牌（amount 为负时补扣）"""
+        if self.unlimited or not amount:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def pause(self, seconds: float) -> None:
+        """服务端要求等待时（Retry-After），让接下来 seconds 秒内不再放行"""
+        if self.unlimited or seconds <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def available(self) -> float:
+        if self.unlimited:
+            return float('inf')
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class AdaptiveConcurrency:
+    """AIMD 并发上限
+
+    每次成功，上限增加 increase / limit（约等于每轮并发 +increase）；
+    遇到 429 / 超时，上限乘以 decrease。同一批并发请求常常一起失败，
+    所以两次下调之间至少间隔 cooldown 秒，避免一次限流把上限压到底。
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 2.0
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self, poll_interval: float = 0.05) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval)
+
+    def release(self, outcome: str = "success") -> None:
+        """outcome: success / throttled（429、超时）/ error、cancelled（其他错误或主动取消，不调整上限）"""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "success":
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            elif outcome == "throttled":
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            self._cond.notify_all()
+
+
+class Permit:
+    """一次 LLM 调用的限流凭证；调用方拿到响应后写入 used_tokens 以校正 TPM"""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.used_tokens: Optional[int] = None
+
+
+class EndpointLimiter:
+    """单个 LLM 端点的限流器
+
+    限制只在进程内生效；多个 worker 进程共享同一个账号时，应按进程数分摊 RPM / TPM。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency, max_concurrency)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "throttled": 0, "errors": 0, "cancelled": 0, "waited_seconds": 0.0}
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """粗略估算本次调用的 token 数：中英文混排按每 2 个字符 1 个 token，加上输出上限"""
+        chars = sum(len(m.get("content") or "") for m in messages)
+        return chars // 2 + max_tokens
+
+    @staticmethod
+    def classify(error: BaseException) -> str:
+        from openai import APITimeoutError, RateLimitError
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            # 调用方主动放弃（如对冲请求落选），不算端点错误
+            return "cancelled"
+        if isinstance(error, (RateLimitError, APITimeoutError)) or getattr(error, "status_code", None) == 429:
+            return "throttled"
+        return "error"
+
+    @staticmethod
+    def _retry_after(error: BaseException) -> float:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after") or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _reserve(self, messages: List[Dict[str, str]], max_tokens: int) -> Tuple[Permit, float]:
+        permit = Permit(self.estimate_tokens(messages, max_tokens))
+        wait = max(self.requests.reserve(1), self.tokens.reserve(permit.estimated_tokens))
+        return permit, wait
+
+    def _finish(self, permit: Permit, waited: float, error: Optional[BaseException] = None) -> None:
+        outcome = "success" if error is None else self.classify(error)
+        self.concurrency.release(outcome)
+        if permit.used_tokens is not None:
+            self.tokens.refund(permit.estimated_tokens - permit.used_tokens)
+        if outcome == "throttled":
+            retry_after = self._retry_after(error)
+            if retry_after:
+                self.requests.pause(retry_after)
+            logger.warning(
+                f"LLM 端点 {self.name} 被限流，并发上限降至 {int(self.concurrency.limit)}"
+                + (f"，{retry_after:.0f} 秒内暂停放行" if retry_after else "")
+            )
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["waited_seconds"] += waited
+            if outcome == "throttled":
+                self._stats["throttled"] += 1
+            elif outcome == "error":
+                self._stats["errors"] += 1
+            elif outcome == "cancelled":
+                self._stats["cancelled"] += 1
+
+    @contextmanager
+    def limit(self, messages: List[Dict[str, str]], max_tokens: int):
+        """with limiter.limit(messages, max_tokens) as permit: ...（阻塞等待额度）"""
+        started = time.monotonic()
+        permit, wait = self._reserve(messages, max_tokens)
+        if wait:
+            time.sleep(wait)
+        self.concurrency.acquire()
+        waited = time.monotonic() - started
+        try:
+            yield permit
+        except BaseException as e:
+            self._finish(permit, waited, e)
+            raise
+        self._finish(permit, waited)
+
+    @asynccontextmanager
+    async def limit_async(self, messages: List[Dict[str, str]], max_tokens: int):
+        """limit() 的异步版本，等待期间让出事件循环"""
+        started = time.monotonic()
+        permit, wait = self._reserve(messages, max_tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        await self.concurrency.acquire_async()
+        waited = time.monotonic() - started
+        try:
+            yield permit
+        except BaseException as e:
+            self._finish(permit, waited, e)
+            raise
+        self._finish(permit, waited)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["waited_seconds"] = round(stats["waited_seconds"], 3)
+        stats.update({
+            "rpm": self.requests.per_minute,
+            "tpm": self.tokens.per_minute,
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight
+        })
+        return stats
+
+
+_limiters: Dict[str, EndpointLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_endpoint_limiter(name: str) -> EndpointLimiter:
+    """进程内共享的端点限流器（main / boost）"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                if name == "boost":
+                    rpm, tpm = Config.LLM_BOOST_RPM, Config.LLM_BOOST_TPM
+                else:
+                    rpm, tpm = Config.LLM_RPM, Config.LLM_TPM
+                limiter = EndpointLimiter(
+                    name, rpm, tpm,
+                    max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                    min_concurrency=Config.LLM_MIN_CONCURRENCY
+                )
+                _limiters[name] = limiter
+                logger.info(f"LLM 端点 {name} 限流: RPM={rpm or '不限'}, TPM={tpm or '不限'}")
+    return limiter
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.stats() for name, limiter in list(_limiters.items())}
@@ -0,0 +1,156 @@
+"""
+并发请求合并（single-flight）
+同一 key 同时只执行一次：第一个调用者执行，期间到达的相同调用等待并共享它的结果，
+避免缓存写入前的并发请求各自重复计算
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from .logger import get_logger
+
+logger = get_logger('wannian.single_flight')
+
+
+class SingleFlight:
+    """按 key 合并进行中的调用
+
+    - 只合并进行中的调用，执行结束后立即移除；之后的结果复用由缓存负责
+    - 执行者抛出的异常同样传给所有等待者；异常类型属于 retry_on 时（如执行者被对冲取消），
+      等待者不共享该异常，而是重新竞争执行
+    - do 用于线程，do_async 用于同一个事件循环内的协程，两者的 key 互不相通；
+      begin / end 供不能在当前线程等待的调用方自行安排执行与等待（如先合并、再把执行者提交给调度器）
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: Dict[str, "asyncio.Future"] = {}
+        self._stats = {"executed": 0, "shared": 0, "retried": 0}
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """登记 key 的调用，返回 (future, leader)
+
+        没有进行中的调用时 leader 为 True，调用方负责执行并以 end() 结束；
+        否则返回执行者的 future，调用方不必占用执行资源，等待该 future 即可
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self._stats["executed"] += 1
+                return future, True
+            self._stats["shared"] += 1
+            return future, False
+
+    def end(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """执行者结束调用：移除登记，把结果或异常交给等待者"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        **kwargs: Any
+    ) -> Tuple[Any, bool]:
+        """执行或等待 fn(*args, **kwargs)，返回 (结果, shared)；shared 为 True 表示结果来自其他调用者的执行"""
+        while True:
+            future, leader = self.begin(key)
+            if leader:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    self.end(key, future, error=e)
+                    raise
+                self.end(key, future, result)
+                return result, False
+            try:
+                return future.result(), True
+            except retry_on:
+                self.note_retry(key)
+
+    async def do_async(
+        self,
+        key: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        **kwargs: Any
+    ) -> Tuple[Any, bool]:
+        """do 的协程版本；执行者被取消时等待者重新竞争执行，等待者自身被取消不影响执行者"""
+        while True:
+            with self._lock:
+                future = self._async_calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._async_calls[key] = asyncio.get_running_loop().create_future()
+                    self._stats["executed"] += 1
+                else:
+                    self._stats["shared"] += 1
+            if leader:
+                try:
+                    result = await fn(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    # 没有等待者时避免 "exception was never retrieved" 警告
+                    future.exception()
+                    raise
+                else:
+                    future.set_result(result)
+                    return result, False
+                finally:
+                    with self._lock:
+                        if self._async_calls.get(key) is future:
+                            del self._async_calls[key]
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            except retry_on:
+                pass
+            self.note_retry(key)
+
+    def note_retry(self, key: str) -> None:
+        """记录一次等待者在执行者失败或被取消后重新执行"""
+        with self._lock:
+            self._stats["retried"] += 1
+        logger.info(f"[{self.name}] 合并的调用未能给出结果，重新执行: {key}")
+
+    def stats(self) -> Dict[str, Any]:
+        """executed 为实际执行次数，shared 为等待并共享结果的次数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inflight"] = len(self._calls) + len(self._async_calls)
+        return stats
+
+
+_single_flights: Dict[str, SingleFlight] = {}
+_single_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """进程级共享的合并器（按名称区分，首次使用时创建）"""
+    flight = _single_flights.get(name)
+    if flight is None:
+        with _single_flights_lock:
+            flight = _single_flights.get(name)
+            if flight is None:
+                flight = _single_flights[name] = SingleFlight(name)
+    return flight
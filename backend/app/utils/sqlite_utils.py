@@ -0,0 +1,33 @@
+"""
+SQLite 工具
+多线程 / 多进程共享同一个数据库文件时使用的连接与事务辅助
+"""
+
+import sqlite3
+
+
+def connect_wal(path: str, synchronous: str = "NORMAL") -> sqlite3.Connection:
+    """打开 WAL 模式的连接（自动提交模式，事务由 ImmediateTransaction 显式控制）"""
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+class ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK 的上下文管理器"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
@@ -0,0 +1,52 @@
+"""
+Server-Sent Events 工具
+把 (event, data) 事件序列编码为 text/event-stream 响应
+"""
+
+import json
+import time
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from flask import Response, stream_with_context
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """编码单个事件；data 按 JSON 序列化（中文不转义）"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    payload = json.dumps(data, ensure_ascii=False)
+    lines.extend(f"data: {line}" for line in payload.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_response(events: Iterable[Optional[Tuple[str, Any]]], keepalive: float = 15.0) -> Response:
+    """把事件迭代器包装为 SSE 响应
+
+    events 产出 (event, data)；产出 None 表示本轮没有新事件，超过 keepalive 秒没有输出时发送注释行保持连接，
+    以免代理或浏览器因空闲断开。
+    """
+    def generate() -> Iterator[str]:
+        # 先发送一行注释，让代理和浏览器立即建立事件流
+        yield ": connected\n\n"
+        last_write = time.monotonic()
+        for item in events:
+            now = time.monotonic()
+            if item is None:
+                if now - last_write >= keepalive:
+                    last_write = now
+                    yield ": keepalive\n\n"
+                continue
+            event, data = item
+            last_write = now
+            yield format_sse(data, event)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # 关闭 nginx 的响应缓冲，事件才能即时到达
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,81 @@
+"""
+相似观点合并的耗时基准：逐组比较字符集合（旧实现）与 MinHash + LSH 分桶（_group_similar_candidates）
+用法: python benchmarks/bench_group_candidates.py [最大候选数]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fortune_aggregator import FortuneAggregator
+
+# 约 1500 个常用汉字区间内的字符，接近真实推演文本的字符分布；FILLER 为高频虚词
+CHARS = "".join(chr(0x4e00 + i) for i in range(0, 3000, 2))
+FILLER = "的了在是有和与之而其于以也则，"
+
+
+def make_candidates(count: int, seed: int = 7):
+    """约三分之一的候选由少量"母观点"改写约一成字符而来（近似重复），其余为随机文本"""
+    rng = random.Random(seed)
+
+    def text(low, high):
+        return "".join(rng.choice(FILLER) if rng.random() < 0.3 else rng.choice(CHARS) for _ in range(rng.randint(low, high)))
+
+    bases = [text(40, 90) for _ in range(max(1, count // 30))]
+    candidates = []
+    for i in range(count):
+        if i % 3 == 0:
+            base = list(rng.choice(bases))
+            for _ in range(len(base) // 10):
+                base[rng.randrange(len(base))] = rng.choice(FILLER)
+            para = "".join(base)
+        else:
+            para = text(30, 120)
+        candidates.append((para, f"大师{i % 49}"))
+    return candidates
+
+
+def group_by_char_sets(candidates):
+    """旧实现：每条候选与每个已有组构造字符集合比较"""
+    groups = []
+    for para, master in candidates:
+        found_group = False
+        for group in groups:
+            if master in group['masters']: continue
+            if len(set(para) & set(group['para'])) > 25:
+                group['masters'].append(master)
+                if len(para) > len(group['para']): group['para'] = para
+                found_group = True
+                break
+        if not found_group: groups.append({'para': para, 'masters': [master]})
+    return groups
+
+
+def timed(fn, candidates):
+    started = time.perf_counter()
+    groups = fn(candidates)
+    return time.perf_counter() - started, len(groups)
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    aggregator = FortuneAggregator(llm_client=object())
+    sizes = []
+    n = 250
+    while n <= limit:
+        sizes.append(n)
+        n *= 2
+
+    print(f"{'候选数':>8} {'旧实现(s)':>10} {'组数':>6} {'LSH(s)':>10} {'组数':>6} {'LSH 每千条(ms)':>14}")
+    for size in sizes:
+        candidates = make_candidates(size)
+        old_time, old_groups = timed(group_by_char_sets, candidates)
+        new_time, new_groups = timed(aggregator._group_similar_candidates, candidates)
+        print(f"{size:>8} {old_time:>10.3f} {old_groups:>6} {new_time:>10.3f} {new_groups:>6} {new_time / size * 1e6:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
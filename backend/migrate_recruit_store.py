@@ -0,0 +1,31 @@
+"""
+将旧版 data/recruit_store.json 一次性迁移到 SQLite
+用法: python migrate_recruit_store.py [data_dir]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import Config
+from app.services.recruit_backends import SqliteRecruitBackend, migrate_json_to_sqlite
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else Config.RECRUIT_DATA_DIR
+    json_path = os.path.join(data_dir, 'recruit_store.json')
+    db_path = os.path.join(data_dir, 'recruit_store.db')
+    if not os.path.exists(json_path):
+        print(f"未找到 {json_path}，无需迁移")
+        return
+
+    counts = migrate_json_to_sqlite(json_path, SqliteRecruitBackend(db_path))
+    if counts is None:
+        print(f"{db_path} 已完成过迁移，跳过")
+    else:
+        print(f"迁移完成: {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_aggregator import FortuneAggregator
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+from app.utils.async_runtime import AsyncRuntime
+from app.utils.llm_client import _parse_json_response
+
+
+REPORT = "2026年 事业上升，贵人相助。2027年 感情稳定，遇到正缘。2028年 财运亨通，注意健康。" * 3
+
+
+class FakeAsyncLLM:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_json(self, messages, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            if self.fail:
+                raise RuntimeError("LLM Timeout")
+            year = messages[0]["content"].split("年")[0][-4:]
+            return {"graph_data": {"nodes": [{
+                "id": f"n_{year}",
+                "labels": ["Event"],
+                "properties": {"name": "事业上升", "time": f"{year}年", "dimension": "career",
+                               "description": "贵人相助，事业上升"}
+            }], "edges": []}}
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncAggregation(unittest.TestCase):
+    def setUp(self):
+        self.llm = MagicMock()
+        self.llm.chat.return_value = "## 2026年\n- 事业上升。"
+        self.user_data = {"name": "张三", "future_years": 3}
+        self.reports = {f"agent_{i}": {"name": f"大师{i}", "content": REPORT} for i in range(5)}
+
+    def test_years_run_concurrently(self):
+        async_llm = FakeAsyncLLM()
+        aggregator = FortuneAggregator(self.llm, async_llm=async_llm)
+        result = asyncio.run(aggregator.aggregate_reports_async(self.user_data, self.reports))
+
+        self.assertEqual(async_llm.max_in_flight, 3)
+        self.assertTrue(result["graph_data"]["nodes"])
+
+    def test_llm_failure_falls_back(self):
+        progress = []
+        aggregator = FortuneAggregator(self.llm, async_llm=FakeAsyncLLM(fail=True))
+        result = asyncio.run(aggregator.aggregate_reports_async(
+            self.user_data, self.reports, on_progress=lambda p, msg: progress.append(p)
+        ))
+
+        self.assertTrue(result["graph_data"]["nodes"])
+        self.assertEqual(progress[-1], 100)
+
+    def test_runtime_runs_coroutines_from_threads(self):
+        runtime = AsyncRuntime()
+
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(runtime.run(add(1, 2), timeout=5), 3)
+
+    def test_async_orchestration_keeps_storage_off_the_event_loop(self):
+        class RecordingStore(FortuneSessionManager):
+            def __init__(self):
+                super().__init__(ttl=3600)
+                self.threads = set()
+
+            def _record(self):
+                self.threads.add(threading.current_thread().name)
+
+            def update(self, *args, **kwargs):
+                self._record()
+                super().update(*args, **kwargs)
+
+            def add_report(self, *args, **kwargs):
+                self._record()
+                super().add_report(*args, **kwargs)
+
+            def update_partial_report(self, *args, **kwargs):
+                self._record()
+                super().update_partial_report(*args, **kwargs)
+
+        class StreamingLLM(FakeAsyncLLM):
+            async def chat_stream(self, messages, **kwargs):
+                for part in REPORT.split("。"):
+                    await asyncio.sleep(0)
+                    yield part + "。"
+
+        store = RecordingStore()
+        service = FortuneService(llm_client=self.llm, agent_cache=TieredCache(), session_store=store)
+        service._async_llm = StreamingLLM(fail=True)
+        with patch("app.services.fortune_service.Config.FORTUNE_ORCHESTRATION", "async"), \
+                patch("app.services.fortune_service.Config.FORTUNE_STREAM_FLUSH_INTERVAL", 0):
+            session_id = service.analyze_fate("张三", "1990-01-01", "12:00", "北京", "男")["session_id"]
+            for _ in range(200):
+                if service.get_session_status(session_id)["status"] in ("completed", "failed"):
+                    break
+                time.sleep(0.05)
+        self.assertEqual(service.get_session_status(session_id)["reports_count"], 49)
+        self.assertTrue(store.threads)
+        self.assertNotIn("async-runtime", store.threads)
+
+    def test_parse_json_response(self):
+        self.assertEqual(_parse_json_response('{"a": 1}'), {"a": 1})
+        self.assertEqual(_parse_json_response('结果如下：\n```json\n{"a": 2}\n```'), {"a": 2})
+        self.assertEqual(_parse_json_response('说明 {"a": 3} 结束'), {"a": 3})
+
+
+if __name__ == '__main__':
+    unittest.main()
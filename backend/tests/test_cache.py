@@ -0,0 +1,52 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.cache import TieredCache
+
+
+class TestTieredCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_lru_eviction_by_bytes(self):
+        cache = TieredCache(max_bytes=30)
+        cache.set("a", "x" * 10)
+        cache.set("b", "y" * 10)
+        self.assertEqual(cache.get("a"), "x" * 10)
+        cache.set("c", "z" * 15)
+        # b 最久未使用，被淘汰
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["bytes"], 30)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 1))
+
+    def test_ttl_and_disk_tier(self):
+        path = os.path.join(self.dir, "cache.db")
+        cache = TieredCache(max_bytes=1024, ttl=60, disk_path=path)
+        cache.set("k", "报告")
+
+        restarted = TieredCache(max_bytes=1024, ttl=60, disk_path=path)
+        self.assertEqual(restarted.get("k"), "报告")
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+        self.assertEqual(restarted.get("k"), "报告")
+        self.assertEqual(restarted.stats()["hits"], 1)
+
+        with patch("app.utils.cache.time.time", return_value=10 ** 12):
+            self.assertIsNone(restarted.get("k"))
+        self.assertIsNone(TieredCache(disk_path=path).get("k"))
+
+
+if __name__ == '__main__':
+    unittest.main()
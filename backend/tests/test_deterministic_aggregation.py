@@ -0,0 +1,100 @@
+import sys
+import os
+import datetime
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_aggregator import FortuneAggregator, IncrementalAggregation
+from app.utils.cache import TieredCache
+
+
+YEAR = datetime.datetime.now().year
+USER_DATA = {"name": "张三", "birthday": "1990-01-01", "future_years": 1}
+
+
+def _reports():
+    reports = {}
+    for i in range(6):
+        reports[f"m{i}"] = {
+            "name": f"大师{i}",
+            "content": (
+                f"{YEAR}年 事业稳步上升，第{i}位大师认为贵人相助宜主动争取。"
+                f"{YEAR}年 财运起伏，投资需谨慎，若贸然扩张恐有破财之虞{i}。"
+                f"{YEAR}年 感情和睦，家庭美满，桃花渐旺需分辨真心{i}。"
+                f"{YEAR}年 身体需调养，注意作息规律与饮食平衡{i}。"
+            )
+        }
+    return reports
+
+
+def _llm(fail: bool = False):
+    llm = MagicMock()
+    if fail:
+        llm.chat_json.side_effect = RuntimeError("timeout")
+    else:
+        llm.chat_json.return_value = {"graph_data": {"nodes": [], "edges": []}, "consensus": [], "conflicts": []}
+    return llm
+
+
+class TestDeterministicAggregation(unittest.TestCase):
+    def test_seed_is_derived_from_input(self):
+        seed = FortuneAggregator.aggregation_seed(USER_DATA)
+        self.assertEqual(seed, FortuneAggregator.aggregation_seed(dict(reversed(list(USER_DATA.items())))))
+        self.assertNotEqual(seed, FortuneAggregator.aggregation_seed({**USER_DATA, "name": "李四"}))
+
+    def test_same_input_gives_same_graph_regardless_of_report_order(self):
+        reports = _reports()
+        shuffled = dict(reversed(list(reports.items())))
+        # 分年生成失败时走回退节点与补充逻辑，随机抽取与 impact 评分都由种子决定
+        first = FortuneAggregator(llm_client=_llm(fail=True), deterministic=True).aggregate_reports(USER_DATA, reports)
+        second = FortuneAggregator(llm_client=_llm(fail=True), deterministic=True).aggregate_reports(USER_DATA, shuffled)
+        self.assertTrue(first["graph_data"]["nodes"])
+        self.assertEqual(first, second)
+
+        other = FortuneAggregator(llm_client=_llm(fail=True), deterministic=True).aggregate_reports(
+            USER_DATA, reports, seed=12345
+        )
+        again = FortuneAggregator(llm_client=_llm(fail=True)).aggregate_reports(USER_DATA, reports, seed=12345)
+        self.assertEqual(other, again)
+
+    def test_result_cache_skips_aggregation(self):
+        cache = TieredCache(max_bytes=1024 * 1024)
+        reports = _reports()
+        first = FortuneAggregator(llm_client=_llm(), deterministic=True, result_cache=cache)
+        result = first.aggregate_reports(USER_DATA, reports)
+        self.assertEqual(first.llm.chat_json.call_count, 1)
+
+        second = FortuneAggregator(llm_client=_llm(), deterministic=True, result_cache=cache)
+        progress = []
+        self.assertEqual(second.aggregate_reports(USER_DATA, reports, on_progress=lambda p, m: progress.append(p)), result)
+        second.llm.chat_json.assert_not_called()
+        self.assertEqual(progress, [100])
+
+        # 报告内容不同则不命中
+        changed = dict(reports, m0={"name": "大师0", "content": f"{YEAR}年 事业平稳。"})
+        second.aggregate_reports(USER_DATA, changed)
+        self.assertEqual(second.llm.chat_json.call_count, 1)
+
+    def test_failed_years_and_unseeded_results_are_not_cached(self):
+        cache = TieredCache(max_bytes=1024 * 1024)
+        FortuneAggregator(llm_client=_llm(fail=True), deterministic=True, result_cache=cache).aggregate_reports(
+            USER_DATA, _reports()
+        )
+        FortuneAggregator(llm_client=_llm(), deterministic=False, result_cache=cache).aggregate_reports(
+            USER_DATA, _reports()
+        )
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_incremental_aggregation_waits_for_all_reports(self):
+        aggregator = FortuneAggregator(llm_client=_llm(), deterministic=True)
+        aggregation = IncrementalAggregation(aggregator, USER_DATA, total=6, quorum=3, deadline=0.01)
+        for agent_id, report in _reports().items():
+            aggregation.add(agent_id, report)
+        self.assertFalse(aggregation.started_early)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import os
+import gzip
+import json
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.api import fortune as fortune_api
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+
+
+class TestFortuneApi(unittest.TestCase):
+    def setUp(self):
+        self.store = FortuneSessionManager(ttl=3600)
+        fortune_api._fortune_service = FortuneService(
+            llm_client=MagicMock(), agent_cache=TieredCache(), session_store=self.store
+        )
+        self.client = create_app().test_client()
+        self.store.create("s0", {
+            "status": "processing", "status_msg": "", "progress": 0, "reports": {}, "summary": None,
+            "input": {"name": "张三"}, "created_at": "2026-01-01T00:00:00"
+        })
+
+    def tearDown(self):
+        fortune_api._fortune_service = None
+
+    def test_compact_status_and_summary(self):
+        self.store.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        self.store.finish("s0", status="completed", progress=100, summary={"summary_text": "总结" * 2000})
+
+        status = self.client.get("/api/fortune/status/s0").get_json()
+        self.assertNotIn("summary", status)
+        self.assertEqual((status["reports_count"], status["has_summary"]), (1, True))
+
+        summary = self.client.get("/api/fortune/summary/s0").get_json()
+        self.assertEqual(summary["summary"]["summary_text"], "总结" * 2000)
+
+    def test_etag_changes_with_version(self):
+        first = self.client.get("/api/fortune/report/s0")
+        etag = first.headers["ETag"]
+        self.assertEqual(
+            self.client.get("/api/fortune/report/s0", headers={"If-None-Match": etag}).status_code, 304
+        )
+
+        self.store.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        changed = self.client.get("/api/fortune/report/s0", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+        self.assertIn("a1", changed.get_json()["reports"])
+
+    def test_unknown_session_has_no_etag(self):
+        response = self.client.get("/api/fortune/status/missing")
+        self.assertFalse(response.get_json()["success"])
+        self.assertNotIn("ETag", response.headers)
+
+    def test_large_responses_are_gzipped(self):
+        self.store.add_report("s0", "a1", {"name": "甲", "content": "报告" * 5000})
+        response = self.client.get("/api/fortune/report/s0", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        body = json.loads(gzip.decompress(response.get_data()))
+        self.assertEqual(len(body["reports"]["a1"]["content"]), 10000)
+
+        small = self.client.get("/api/fortune/status/s0", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
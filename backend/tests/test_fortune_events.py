@@ -0,0 +1,82 @@
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+from app.utils.sse import format_sse
+
+
+class TestSessionEvents(unittest.TestCase):
+    def setUp(self):
+        self.store = FortuneSessionManager(ttl=3600)
+        self.service = FortuneService(llm_client=MagicMock(), agent_cache=TieredCache(), session_store=self.store)
+        self.store.create("s0", {
+            "status": "processing", "status_msg": "", "progress": 0, "reports": {}, "summary": None,
+            "created_at": "2026-01-01T00:00:00"
+        })
+
+    def _drive(self):
+        time.sleep(0.05)
+        self.store.update_partial_report("s0", "a1", {"name": "甲", "content": "事业"})
+        time.sleep(0.05)
+        self.store.update_partial_report("s0", "a1", {"name": "甲", "content": "事业上升"})
+        time.sleep(0.05)
+        self.store.add_report("s0", "a1", {"name": "甲", "content": "事业上升。"})
+        self.store.update("s0", progress=90, status_msg="已完成 1/1 位大师的推演...")
+        time.sleep(0.05)
+        self.store.finish("s0", status="completed", progress=100, summary={"summary_text": "总结"})
+
+    def test_events_are_sent_once(self):
+        driver = threading.Thread(target=self._drive)
+        driver.start()
+        events = [e for e in self.service.iter_session_events("s0", poll_interval=0.01) if e is not None]
+        driver.join()
+
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds[0], "status")
+        self.assertEqual(kinds[-2:], ["summary", "end"])
+        self.assertEqual(kinds.count("report"), 1)
+        self.assertEqual(kinds.count("summary"), 1)
+
+        partials = [data for kind, data in events if kind == "partial"]
+        self.assertEqual(partials[0], {"agent_id": "a1", "name": "甲", "offset": 0, "delta": "事业"})
+        if len(partials) > 1:
+            self.assertEqual((partials[1]["offset"], partials[1]["delta"]), (2, "上升"))
+        self.assertEqual(events[-1][1], {"status": "completed", "error": None})
+
+    def test_unknown_session(self):
+        self.assertEqual(
+            list(self.service.iter_session_events("missing", poll_interval=0.01)),
+            [("error", {"error": "未找到推演任务"})]
+        )
+
+    def test_session_removed_after_status_read(self):
+        from unittest.mock import patch
+
+        self.store.add_report("s0", "a1", {"name": "甲", "content": "事业上升。"})
+        with patch.object(self.store, "get", return_value=None):
+            events = [e for e in self.service.iter_session_events("s0", poll_interval=0.01) if e is not None]
+        self.assertEqual(events[-1], ("error", {"error": "未找到推演任务"}))
+
+        # 汇总在结束时单独读取
+        self.store.create("s1", {"status": "processing", "progress": 0, "reports": {}, "summary": None})
+        self.store.finish("s1", status="completed", progress=100, summary={"summary_text": "总结"})
+        with patch.object(self.store, "get", return_value=None):
+            events = [e for e in self.service.iter_session_events("s1", poll_interval=0.01) if e is not None]
+        self.assertNotIn("summary", [kind for kind, _ in events])
+        self.assertEqual(events[-1], ("error", {"error": "未找到推演任务"}))
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse({"a": "中文"}, "status"), 'event: status\ndata: {"a": "中文"}\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
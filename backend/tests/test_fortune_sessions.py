@@ -0,0 +1,186 @@
+import sys
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_sessions import FortuneSessionManager, SqliteSessionStore
+
+
+def _session(status="processing"):
+    return {"status": status, "progress": 0, "reports": {}, "summary": None}
+
+
+class TestFortuneSessionManager(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_finished_sessions_spill_to_disk(self):
+        manager = FortuneSessionManager(ttl=3600, max_sessions=2, spill_dir=self.dir)
+        for i in range(3):
+            manager.create(f"s{i}", _session())
+            manager.add_report(f"s{i}", "a1", {"name": "甲", "content": "报告"})
+        manager.finish("s0", status="completed", summary={"summary_text": "总结"})
+        manager.create("s3", _session())
+
+        # 进行中的会话不会被淘汰；结束的 s0 被转存
+        self.assertEqual(manager.stats()["in_memory"], 3)
+        self.assertEqual(manager.stats()["spilled"], 1)
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "s0.json.gz")))
+        restored = manager.get("s0")
+        self.assertEqual(restored["summary"]["summary_text"], "总结")
+        self.assertEqual(restored["reports"]["a1"]["content"], "报告")
+        self.assertIsNone(manager.get("missing"))
+
+    def test_ttl_eviction_without_spill_dir(self):
+        manager = FortuneSessionManager(ttl=0)
+        manager.create("s0", _session())
+        manager.update("s0", progress=50)
+        self.assertEqual(manager.get("s0")["progress"], 50)
+        manager.finish("s0", status="failed", error="x")
+        self.assertIsNone(manager.get("s0"))
+        self.assertEqual(manager.stats()["dropped"], 1)
+
+    def test_partial_reports_replaced_by_final(self):
+        manager = FortuneSessionManager(ttl=3600)
+        manager.create("s0", _session())
+        manager.update_partial_report("s0", "a1", {"name": "甲", "content": "生成"})
+        self.assertEqual(manager.get("s0")["partial_reports"]["a1"]["content"], "生成")
+        manager.add_report("s0", "a1", {"name": "甲", "content": "生成完毕"})
+        # 完成后迟到的中间结果不再写入
+        manager.update_partial_report("s0", "a1", {"name": "甲", "content": "生成"})
+        self.assertEqual(manager.get("s0")["partial_reports"], {})
+
+    def test_get_returns_copy_and_reused_id_drops_stale_bookkeeping(self):
+        manager = FortuneSessionManager(ttl=3600, max_sessions=1, spill_dir=self.dir)
+        manager.create("s0", _session())
+        snapshot = manager.get("s0")
+        manager.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        self.assertEqual(snapshot["reports"], {})
+        snapshot["status"] = "completed"
+        self.assertEqual(manager.get("s0")["status"], "processing")
+
+        # 复用仍在内存中的已结束会话：旧的结束记录不能让新会话被淘汰
+        manager.finish("s0", status="completed")
+        manager.create("s0", _session())
+        self.assertEqual(manager.stats()["finished_in_memory"], 0)
+        self.assertEqual(manager.stats()["finished_bytes"], 0)
+        manager.create("s1", _session())
+        self.assertEqual(manager.get("s0")["status"], "processing")
+
+        # 复用已转存的会话：旧的转存文件被删除
+        manager.finish("s0", status="completed")
+        self.assertTrue(os.path.exists(os.path.join(self.dir, "s0.json.gz")))
+        manager.create("s0", _session())
+        self.assertFalse(os.path.exists(os.path.join(self.dir, "s0.json.gz")))
+        self.assertEqual(manager.get("s0")["status"], "processing")
+
+
+class TestSqliteSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "sessions.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_shared_between_workers_and_orphan_claim(self):
+        worker_a = SqliteSessionStore(self.path, stale_after=0)
+        worker_b = SqliteSessionStore(self.path, stale_after=0)
+        session = _session()
+        session.update({"input": {"name": "张三"}, "future_years": 3, "created_at": "2026-01-01T00:00:00"})
+        worker_a.create("s0", session)
+        worker_a.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        worker_a.update("s0", progress=40, status_msg="进行中")
+
+        # 另一个 worker 能读到进度
+        status = worker_b.get("s0", include_reports=False)
+        self.assertEqual((status["progress"], status["reports_count"]), (40, 1))
+        self.assertEqual(status["input"]["name"], "张三")
+
+        # worker_a 心跳过期后由 worker_b 接管，已有报告随会话返回
+        claimed = worker_b.claim_orphaned()
+        self.assertEqual([s["id"] for s in claimed], ["s0"])
+        self.assertEqual(claimed[0]["reports"]["a1"]["content"], "报告")
+
+        worker_b.finish("s0", status="completed", summary={"summary_text": "总结"})
+        self.assertEqual(worker_a.get("s0")["summary"]["summary_text"], "总结")
+        self.assertEqual(worker_a.claim_orphaned(), [])
+
+    def test_heartbeat_only_covers_attached_sessions(self):
+        worker_a = SqliteSessionStore(self.path, stale_after=0.3, heartbeat_interval=0.05)
+        worker_b = SqliteSessionStore(self.path, stale_after=0.3)
+        worker_a.create("live", _session())
+        worker_a.create("dead", _session())
+        worker_a.attach("live")
+
+        # dead 的协调线程已不存在（未 attach），心跳过期后被接管；live 仍由 worker_a 维持
+        time.sleep(0.6)
+        self.assertEqual([s["id"] for s in worker_b.claim_orphaned()], ["dead"])
+        self.assertEqual(worker_a.stats()["attached"], 1)
+        worker_b.finish("dead", status="completed")
+
+        worker_a.detach("live")
+        time.sleep(0.6)
+        self.assertEqual([s["id"] for s in worker_b.claim_orphaned()], ["live"])
+
+    def test_status_projection_skips_summary_and_report_bodies(self):
+        from unittest.mock import patch
+
+        worker_a = SqliteSessionStore(self.path)
+        worker_b = SqliteSessionStore(self.path)
+        session = _session()
+        session.update({"input": {"name": "张三"}, "created_at": "2026-01-01T00:00:00"})
+        worker_a.create("s0", session)
+        worker_a.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        worker_a.update_partial_report("s0", "a2", {"name": "乙", "content": "生成中"})
+        worker_a.update("s0", progress=40, summary={"summary_text": "总结"})
+
+        with patch("app.services.fortune_sessions._unpack", side_effect=AssertionError("summary decoded")):
+            status = worker_b.get_status("s0")
+        self.assertEqual(
+            (status["progress"], status["reports_count"], status["partial_count"], status["has_summary"]),
+            (40, 1, 1, True)
+        )
+        self.assertEqual(status["version"], worker_b.version("s0"))
+        self.assertNotIn("input", status)
+        self.assertEqual(worker_b.get_partial_reports("s0")["a2"]["content"], "生成中")
+        self.assertIsNone(worker_b.get_status("missing"))
+        self.assertNotIn("missing", worker_b)
+
+        memory = FortuneSessionManager(ttl=3600)
+        memory.create("s0", _session())
+        memory.add_report("s0", "a1", {"name": "甲", "content": "报告"})
+        self.assertEqual(memory.get_status("s0")["reports_count"], 1)
+        self.assertFalse(memory.get_status("s0")["has_summary"])
+
+    def test_partial_reports_visible_across_workers(self):
+        worker_a = SqliteSessionStore(self.path)
+        worker_b = SqliteSessionStore(self.path)
+        worker_a.create("s0", _session())
+        worker_a.update_partial_report("s0", "a1", {"name": "甲", "content": "生成"})
+        worker_a.update_partial_report("s0", "a2", {"name": "乙", "content": "生成中"})
+        self.assertEqual(
+            worker_b.get("s0", include_reports=False)["partial_reports"]["a2"]["content"], "生成中"
+        )
+
+        version = worker_b.version("s0")
+        worker_a.add_report("s0", "a1", {"name": "甲", "content": "生成完毕"})
+        self.assertGreater(worker_b.version("s0"), version)
+        worker_a.update_partial_report("s0", "a1", {"name": "甲", "content": "生成"})
+        self.assertEqual(list(worker_b.get("s0")["partial_reports"]), ["a2"])
+        self.assertIsNone(worker_b.version("missing"))
+
+        worker_a.finish("s0", status="completed")
+        self.assertEqual(worker_b.get("s0")["partial_reports"], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
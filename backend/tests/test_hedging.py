@@ -0,0 +1,99 @@
+import sys
+import os
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_agents import MASTER_PERSONAS
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+from app.utils.hedging import HedgePolicy
+from app.utils.llm_scheduler import LLMScheduler
+
+
+class FakeLLM:
+    """slow_prompt 对应的主请求每 20ms 输出一段、持续数秒；boost_slow 时对冲请求同样很慢"""
+
+    def __init__(self, slow_prompt, boost_slow=False):
+        self.slow_prompt = slow_prompt
+        self.boost_slow = boost_slow
+        self.closed = []
+
+    def chat_stream(self, messages, temperature=0.7, use_boost=False):
+        slow = messages[0]["content"] == self.slow_prompt and (not use_boost or self.boost_slow)
+        try:
+            if slow:
+                for _ in range(250):
+                    time.sleep(0.02)
+                    yield "慢"
+            else:
+                yield "对冲结果" if use_boost else "结果"
+        except GeneratorExit:
+            self.closed.append(use_boost)
+            raise
+
+
+class TestHedgePolicy(unittest.TestCase):
+    def test_delay_follows_percentile_within_bounds(self):
+        policy = HedgePolicy(soft_deadline=60, min_delay=5, min_samples=10)
+        self.assertEqual(policy.hedge_delay(), 60)
+        for i in range(10):
+            policy.record(20 + i)
+        self.assertEqual(policy.hedge_delay(), 29)
+        for _ in range(10):
+            policy.record(1)
+        self.assertEqual(policy.hedge_delay(), 28)
+        for _ in range(100):
+            policy.record(100)
+        self.assertEqual(policy.hedge_delay(), 60)
+
+
+class TestHedgedAgents(unittest.TestCase):
+    def setUp(self):
+        self.personas = MASTER_PERSONAS[:3]
+        self.data = {"name": "张三"}
+        self.slow_prompt = FortuneService._agent_messages(self.personas[0], self.data, 3)[0]["content"]
+        self.store = FortuneSessionManager(ttl=3600)
+        self.store.create("s0", {"status": "processing", "progress": 0, "reports": {}, "summary": None})
+
+    def _run(self, llm, hard_deadline):
+        service = FortuneService(
+            llm_client=llm, agent_cache=TieredCache(), session_store=self.store, scheduler=LLMScheduler(8)
+        )
+        service.hedging = HedgePolicy(soft_deadline=0.1, hard_deadline=hard_deadline)
+        started = time.monotonic()
+        results = {
+            persona["id"]: future.result()[2]
+            for persona, future in service._hedged_results("s0", self.personas, self.data, 3)
+        }
+        return service, results, time.monotonic() - started
+
+    def test_first_response_wins_and_loser_is_cancelled(self):
+        llm = FakeLLM(self.slow_prompt)
+        service, results, elapsed = self._run(llm, hard_deadline=10)
+
+        self.assertEqual(results[self.personas[0]["id"]], "对冲结果")
+        self.assertEqual(results[self.personas[1]["id"]], "结果")
+        self.assertLess(elapsed, 2)
+        stats = service.hedging.stats()
+        self.assertEqual((stats["hedged"], stats["hedge_wins"]), (1, 1))
+        self.assertEqual(stats["recent"][0]["name"], self.personas[0]["name"])
+        # 落选的主请求在下一个增量处停止
+        time.sleep(0.1)
+        self.assertEqual(llm.closed, [False])
+
+    def test_hard_deadline_stops_waiting(self):
+        llm = FakeLLM(self.slow_prompt, boost_slow=True)
+        service, results, elapsed = self._run(llm, hard_deadline=0.3)
+
+        self.assertIn("超过", results[self.personas[0]["id"]])
+        self.assertLess(elapsed, 2)
+        self.assertEqual(service.hedging.stats()["deadline_exceeded"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
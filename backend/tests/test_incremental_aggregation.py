@@ -0,0 +1,96 @@
+import sys
+import os
+import datetime
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_aggregator import FortuneAggregator, IncrementalAggregation, ReportAccumulator
+
+
+YEAR = datetime.datetime.now().year
+
+
+def _report(i):
+    return {"name": f"大师{i}", "content": f"{YEAR}年 事业上升，贵人相助。闲谈一句\n{YEAR + 1}年 宜静守！"}
+
+
+class TestReportAccumulator(unittest.TestCase):
+    def test_indexes_reports_on_arrival(self):
+        accumulator = ReportAccumulator({"name": "张三", "future_years": 2})
+        accumulator.add("a1", _report(1))
+        accumulator.add("a2", {"name": "大师2", "content": "闲谈"})
+
+        self.assertEqual(accumulator.count, 2)
+        self.assertEqual(
+            accumulator.corpus.paragraphs[:3],
+            [f"{YEAR}年 事业上升，贵人相助", "闲谈一句", f"{YEAR + 1}年 宜静守"]
+        )
+        tasks = dict(accumulator.year_tasks())
+        self.assertEqual(list(tasks), [f"{YEAR}年", f"{YEAR + 1}年"])
+        # 含关键词的段落进入每一年，只含年份的段落只进入对应年份，无关段落被过滤
+        this_year = tasks[f"{YEAR}年"]
+        self.assertIn(f"【大师1】 ---\n{YEAR}年 事业上升，贵人相助。\n", this_year)
+        self.assertNotIn("宜静守", this_year)
+        self.assertIn("宜静守", tasks[f"{YEAR + 1}年"])
+        self.assertNotIn("大师2", this_year)
+
+
+class TestIncrementalAggregation(unittest.TestCase):
+    def setUp(self):
+        self.aggregator = FortuneAggregator(llm_client=MagicMock())
+        self.aggregator.submit_year_graphs = MagicMock(return_value={})
+        self.aggregator.aggregate_accumulated = MagicMock(return_value={"summary_text": "ok"})
+
+    def test_quorum_starts_year_graphs_once(self):
+        aggregation = IncrementalAggregation(self.aggregator, {"future_years": 1}, total=5, quorum=3)
+        for i in range(2):
+            aggregation.add(f"a{i}", _report(i))
+        self.assertFalse(aggregation.started_early)
+        for i in range(2, 5):
+            aggregation.add(f"a{i}", _report(i))
+        self.assertEqual(self.aggregator.submit_year_graphs.call_count, 1)
+        self.assertEqual(aggregation.started_with, 3)
+
+        self.assertEqual(aggregation.finish(), {"summary_text": "ok"})
+        kwargs = self.aggregator.aggregate_accumulated.call_args.kwargs
+        self.assertEqual(kwargs["year_jobs"], {})
+        # 迟到的报告也在累计结果中，参与最终聚合
+        self.assertEqual(aggregation.accumulator.count, 5)
+
+    def test_without_quorum_waits_for_all(self):
+        aggregation = IncrementalAggregation(self.aggregator, {"future_years": 1}, total=3, quorum=0)
+        for i in range(3):
+            aggregation.add(f"a{i}", _report(i))
+        aggregation.finish()
+        self.aggregator.submit_year_graphs.assert_not_called()
+        self.assertIsNone(self.aggregator.aggregate_accumulated.call_args.kwargs["year_jobs"])
+
+    def test_deadline_needs_half_of_reports(self):
+        aggregation = IncrementalAggregation(self.aggregator, {"future_years": 1}, total=4, deadline=0.05)
+        aggregation.add("a0", _report(0))
+        time.sleep(0.15)
+        self.assertFalse(aggregation.started_early)
+        aggregation.add("a1", _report(1))
+        self.assertTrue(aggregation.started_early)
+        aggregation.finish()
+
+    def test_early_year_jobs_run_with_real_aggregator(self):
+        llm = MagicMock()
+        llm.chat_json.side_effect = RuntimeError("LLM Timeout")
+        llm.chat.return_value = "总结"
+        aggregator = FortuneAggregator(llm_client=llm)
+        aggregation = IncrementalAggregation(aggregator, {"name": "张三", "future_years": 2}, total=4, quorum=2)
+        for i in range(4):
+            aggregation.add(f"a{i}", _report(i))
+        result = aggregation.finish()
+        self.assertEqual(aggregation.started_with, 2)
+        self.assertTrue(result["graph_data"]["nodes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import asyncio
+import threading
+import unittest
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.llm_scheduler import LLMScheduler
+
+
+class TestLLMScheduler(unittest.TestCase):
+    def test_round_robin_across_keys(self):
+        scheduler = LLMScheduler(max_concurrency=1)
+        gate = threading.Event()
+        started = threading.Event()
+        order = []
+
+        def block():
+            started.set()
+            gate.wait(timeout=10)
+
+        # 先占住唯一的工作线程，让后续任务全部排队
+        blocker = scheduler.submit("warmup", block)
+        self.assertTrue(started.wait(timeout=5))
+        with scheduler.executor("big") as big, scheduler.executor("small") as small:
+            for i in range(5):
+                big.submit(order.append, f"big{i}")
+            small.submit(order.append, "small0")
+            self.assertEqual(scheduler.stats()["queue_depth"], 6)
+            self.assertEqual(scheduler.queue_depth("big"), 5)
+            gate.set()
+        blocker.result()
+
+        # small 的任务不必等 big 的 5 个任务全部执行完
+        self.assertEqual(order[:2], ["big0", "small0"])
+        stats = scheduler.stats()
+        self.assertEqual((stats["completed"], stats["queue_depth"], stats["active"]), (7, 0, 0))
+
+    def test_exceptions_propagate(self):
+        scheduler = LLMScheduler(max_concurrency=2)
+        future = scheduler.submit("s", lambda: 1 / 0)
+        with self.assertRaises(ZeroDivisionError):
+            future.result(timeout=5)
+        self.assertEqual(scheduler.stats()["failed"], 1)
+
+    def test_coroutines_share_the_concurrency_limit(self):
+        scheduler = LLMScheduler(max_concurrency=2)
+        gate = threading.Event()
+        started = threading.Event()
+        blocker = scheduler.submit("threads", lambda: (started.set(), gate.wait(timeout=10)))
+        self.assertTrue(started.wait(timeout=5))
+
+        running = []
+        peak = []
+
+        async def call(i):
+            running.append(i)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(i)
+            return i
+
+        async def main():
+            tasks = [asyncio.ensure_future(scheduler.run_async("coro", call, i)) for i in range(4)]
+            await asyncio.sleep(0.1)
+            # 工作线程占用一个名额，协程同时只能运行一个
+            self.assertEqual(max(peak), 1)
+            gate.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(main()), [0, 1, 2, 3])
+        blocker.result(timeout=5)
+        self.assertLessEqual(max(peak), 2)
+        stats = scheduler.stats()
+        self.assertEqual((stats["completed"], stats["active"], stats["queue_depth"]), (5, 0, 0))
+
+    def test_cancelled_coroutine_releases_its_slot(self):
+        scheduler = LLMScheduler(max_concurrency=1)
+
+        async def main():
+            task = asyncio.ensure_future(scheduler.run_async("s", asyncio.sleep, 10))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return await scheduler.run_async("s", asyncio.sleep, 0, result="ok")
+
+        self.assertEqual(asyncio.run(main()), "ok")
+        self.assertEqual(scheduler.stats()["active"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
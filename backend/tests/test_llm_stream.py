@@ -0,0 +1,49 @@
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.llm_client import LLMClient
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+
+
+class TestChatStream(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient(api_key="test", base_url="http://llm.invalid/v1", model="m")
+        self.client.client = MagicMock()
+
+    def test_yields_deltas(self):
+        self.client.client.chat.completions.create.return_value = iter(
+            [_chunk("甲"), _chunk(None), _chunk("乙")]
+        )
+        self.assertEqual(list(self.client.chat_stream([{"role": "user", "content": "hi"}])), ["甲", "乙"])
+        self.assertTrue(self.client.client.chat.completions.create.call_args.kwargs["stream"])
+
+    @patch("app.utils.llm_client.time.sleep")
+    def test_retries_only_before_first_delta(self, _sleep):
+        def broken_stream():
+            yield _chunk("甲")
+            raise ConnectionError("reset")
+
+        create = self.client.client.chat.completions.create
+        create.side_effect = [ConnectionError("refused"), iter([_chunk("好")])]
+        self.assertEqual(list(self.client.chat_stream([{"role": "user", "content": "hi"}])), ["好"])
+
+        # 已输出部分内容后出错不再重试，避免重复文本
+        create.side_effect = [broken_stream(), iter([_chunk("好")])]
+        received = []
+        with self.assertRaises(ConnectionError):
+            for delta in self.client.chat_stream([{"role": "user", "content": "hi"}]):
+                received.append(delta)
+        self.assertEqual(received, ["甲"])
+
+
+if __name__ == '__main__':
+    unittest.main()
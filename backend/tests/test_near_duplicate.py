@@ -0,0 +1,70 @@
+import sys
+import os
+import random
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_aggregator import FortuneAggregator
+from app.utils.near_duplicate import ContainmentIndex, NearDuplicateIndex, jaccard
+
+A = "2026年事业运势上升，贵人相助，宜主动争取晋升机会，但需防范小人暗中作梗，凡事留有余地"
+A2 = "2026年事业运势上升，贵人相助，宜主动争取升职机会，但需防范小人暗中作梗，凡事留些余地"
+B = "健康方面需注意肠胃调养，作息规律，少食生冷，秋冬之交尤其要防范呼吸系统疾病的困扰"
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def test_similar_texts_share_a_bucket(self):
+        index = NearDuplicateIndex(threshold=0.5)
+        a, a2, b = index.sketch(A), index.sketch(A2), index.sketch(B)
+        index.add(0, a)
+        index.add(1, b)
+        self.assertEqual(index.candidates(a2), [0])
+        self.assertTrue(index.is_similar(a2, a))
+        self.assertFalse(index.is_similar(b, a))
+        self.assertGreater(jaccard(a, a2), 0.6)
+        self.assertEqual(index.candidates(index.sketch("")), [])
+
+    def test_signature_is_deterministic(self):
+        self.assertEqual(NearDuplicateIndex().sketch(A).signature, NearDuplicateIndex().sketch(A).signature)
+        self.assertEqual(len(NearDuplicateIndex(num_perm=64, bands=16).sketch(A).signature), 64)
+        with self.assertRaises(ValueError):
+            NearDuplicateIndex(num_perm=30, bands=16)
+
+
+class TestContainmentIndex(unittest.TestCase):
+    def test_matches_linear_substring_scan(self):
+        rng = random.Random(3)
+        alphabet = "事业财运感情健康平稳上升"
+        texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80))) for _ in range(60)]
+        index = ContainmentIndex(prefix_len=50, ngram=4)
+        self.assertFalse(index.contains(""))
+        for i, text in enumerate(texts):
+            index.add(text)
+            seen = texts[:i + 1]
+            for _ in range(20):
+                source = rng.choice(texts)
+                start = rng.randrange(len(source) + 1)
+                query = source[start:start + rng.randint(0, 50)]
+                self.assertEqual(index.contains(query), any(query in t for t in seen), query)
+        self.assertEqual(len(index), 60)
+
+
+class TestGroupSimilarCandidates(unittest.TestCase):
+    def test_groups_near_duplicates_from_different_masters(self):
+        aggregator = FortuneAggregator(llm_client=MagicMock())
+        groups = aggregator._group_similar_candidates([
+            (A, "甲"), (B, "乙"), (A2, "丙"), (A2, "甲"), (A + "，切记", "丁")
+        ])
+        self.assertEqual(len(groups), 3)
+        self.assertEqual(groups[0]["masters"], ["甲", "丙", "丁"])
+        self.assertEqual(groups[0]["para"], A + "，切记")
+        self.assertEqual(groups[1]["masters"], ["乙"])
+        # 同一位大师不会在同一组出现两次
+        self.assertEqual(groups[2], {"para": A2, "masters": ["甲"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import sys
+import os
+import random
+import unittest
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.paragraph_classifier import (
+    DIMENSION_KEYWORDS, DIMENSION_NAMES, STRICT_VARIABLE_KEYWORDS, YEAR_CONTEXT_KEYWORDS,
+    KeywordMatcher, classify_paragraph, paragraph_features
+)
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(["机遇", "机遇与风险并存", "金", "金钱", "钱财"])
+        self.assertEqual(matcher.find("机遇与风险并存，金钱财运"), {"机遇", "机遇与风险并存", "金", "金钱", "钱财"})
+        self.assertEqual(matcher.find("平淡"), frozenset())
+
+
+class TestClassifyParagraph(unittest.TestCase):
+    def test_matches_naive_substring_checks(self):
+        rng = random.Random(7)
+        pieces = (
+            [k for kws in DIMENSION_KEYWORDS.values() for k in kws]
+            + STRICT_VARIABLE_KEYWORDS + YEAR_CONTEXT_KEYWORDS
+            + ["2026年", "20271", "career", "平淡", "，", "之"]
+        )
+        for _ in range(500):
+            para = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+            features = classify_paragraph(para)
+            for dim, kws in DIMENSION_KEYWORDS.items():
+                self.assertEqual(features.dimension_hits[dim], sum(1 for k in kws if k in para), para)
+                for year in ("2026年", "2027年", "2028年"):
+                    self.assertEqual(features.relevant(dim, year), any(k in para for k in kws) or year[:4] in para)
+            self.assertEqual(features.variable, any(k in para for k in STRICT_VARIABLE_KEYWORDS))
+            self.assertEqual(features.year_context, any(k in para for k in YEAR_CONTEXT_KEYWORDS))
+            expected_dim = next(
+                (d for d, name in DIMENSION_NAMES.items() if name in para or d in para), "career"
+            )
+            self.assertEqual(features.named_dimension, expected_dim)
+
+    def test_features_filled_for_hand_built_reports(self):
+        report = {"name": "甲", "paragraphs": ["2026年 事业上升", "闲谈"]}
+        features = paragraph_features(report)
+        self.assertIs(report["features"], features)
+        self.assertTrue(features[0].relevant("career", "2026年"))
+        self.assertFalse(features[1].relevant("career", "2026年"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import sys
+import os
+import asyncio
+import unittest
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.rate_limiter import AdaptiveConcurrency, EndpointLimiter, TokenBucket
+
+
+class FakeRateLimitError(Exception):
+    """与 openai.RateLimitError 相同的 status_code / response.headers 结构"""
+
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)} if retry_after else {}})()
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_returns_wait_after_burst(self):
+        bucket = TokenBucket(per_minute=60)  # 每秒 1 个
+        waits = [bucket.reserve(1) for _ in range(62)]
+        self.assertEqual(waits[:60], [0.0] * 60)
+        self.assertAlmostEqual(waits[60], 1.0, delta=0.05)
+        self.assertAlmostEqual(waits[61], 2.0, delta=0.05)
+
+    def test_refund_and_unlimited(self):
+        bucket = TokenBucket(per_minute=600)
+        bucket.reserve(600)
+        bucket.refund(300)
+        self.assertAlmostEqual(bucket.available(), 300, delta=1)
+        self.assertEqual(TokenBucket(0).reserve(10 ** 9), 0.0)
+
+    def test_pause(self):
+        bucket = TokenBucket(per_minute=60)
+        bucket.pause(5)
+        self.assertAlmostEqual(bucket.reserve(1), 6.0, delta=0.05)
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_aimd(self):
+        limiter = AdaptiveConcurrency(initial=8, minimum=2, maximum=8, cooldown=60)
+        for _ in range(8):
+            self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+
+        # 同一批请求连续限流只下调一次
+        limiter.release("throttled")
+        limiter.release("throttled")
+        self.assertEqual(int(limiter.limit), 4)
+
+        for _ in range(6):
+            limiter.release("success")
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertGreater(limiter.limit, 4)
+        self.assertLessEqual(limiter.limit, 8)
+
+        limiter.limit = 2.5
+        limiter._last_decrease = 0
+        self.assertTrue(limiter.try_acquire())
+        limiter.release("throttled")
+        self.assertEqual(limiter.limit, 2)
+
+
+class TestEndpointLimiter(unittest.TestCase):
+    def test_throttled_call_shrinks_concurrency_and_honours_retry_after(self):
+        limiter = EndpointLimiter("main", rpm=600, tpm=0, max_concurrency=8)
+        with self.assertRaises(FakeRateLimitError):
+            with limiter.limit([{"role": "user", "content": "你好"}], 16):
+                raise FakeRateLimitError(retry_after=3)
+
+        stats = limiter.stats()
+        self.assertEqual((stats["requests"], stats["throttled"], stats["concurrency_limit"]), (1, 1, 4))
+        self.assertGreater(limiter.requests.reserve(0), 2.5)
+
+    def test_usage_corrects_token_budget(self):
+        limiter = EndpointLimiter("main", rpm=0, tpm=10000, max_concurrency=4)
+        messages = [{"role": "user", "content": "x" * 2000}]
+        with limiter.limit(messages, 1000) as permit:
+            self.assertEqual(permit.estimated_tokens, 2000)
+            permit.used_tokens = 500
+        self.assertAlmostEqual(limiter.tokens.available(), 9500, delta=5)
+
+    def test_async_limit_waits_for_slot(self):
+        limiter = EndpointLimiter("boost", max_concurrency=2, min_concurrency=1)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.limit_async([{"role": "user", "content": "hi"}], 8):
+                peak = max(peak, limiter.concurrency.in_flight)
+                await asyncio.sleep(0.02)
+
+        async def main():
+            await asyncio.gather(*(call() for _ in range(6)))
+
+        asyncio.run(main())
+        self.assertEqual(peak, 2)
+        self.assertEqual(limiter.stats()["requests"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
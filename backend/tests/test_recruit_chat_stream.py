@@ -0,0 +1,56 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.recruit_chat_service import RecruitChatService
+from app.services.recruit_store import RecruitStore, create_backend
+
+
+class TestRecruitChatStream(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.store = RecruitStore(create_backend("sqlite", self.data_dir))
+        self.store.upsert_resume("r1", {"basics": {"name": "A", "title": "后端工程师"}})
+        self.app = self.store.create_application("r1", {"id": "aurora-labs", "name": "Aurora Labs"})
+        with patch("app.services.recruit_chat_service.LLMClient"):
+            self.service = RecruitChatService(store=self.store)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_streams_deltas_and_persists_once(self):
+        self.service.llm.chat_stream.return_value = iter(["您好，", "方便聊聊", "项目经历吗？ "])
+        events = list(self.service.send_stream(self.app["id"], "你好"))
+
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds, ["meta", "delta", "delta", "delta", "done"])
+        self.assertEqual(events[-1][1]["message"], "您好，方便聊聊项目经历吗？")
+        messages = self.store.list_chat_messages(self.app["id"])
+        self.assertEqual(
+            [(m["role"], m["content"]) for m in messages],
+            [("user", "你好"), ("assistant", "您好，方便聊聊项目经历吗？")]
+        )
+
+    def test_failed_generation_is_not_persisted(self):
+        def broken(**kwargs):
+            yield "您好"
+            raise ConnectionError("reset")
+
+        self.service.llm.chat_stream.side_effect = broken
+        events = list(self.service.send_stream(self.app["id"], "你好"))
+        self.assertEqual(events[-1], ("error", {"error": "reset"}))
+        self.assertEqual(self.store.list_chat_messages(self.app["id"]), [])
+
+    def test_unknown_application_fails_before_streaming(self):
+        with self.assertRaises(ValueError):
+            self.service.send_stream("missing", "你好")
+
+
+if __name__ == '__main__':
+    unittest.main()
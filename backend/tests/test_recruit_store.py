@@ -0,0 +1,303 @@
+import sys
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.chat_journal import ChatJournal
+from app.services.recruit_store import RecruitStore, create_backend
+
+
+COMPANY = {"id": "aurora-labs", "name": "Aurora Labs"}
+
+
+class TestRecruitStore(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.backend.flush()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def _store(self, kind):
+        store = RecruitStore(create_backend(kind, self.data_dir))
+        self.stores.append(store)
+        return store
+
+    def _exercise(self, store):
+        store.upsert_resume("r1", {"basics": {"name": "A"}})
+        first = store.get_resume("r1")
+        store.upsert_resume("r1", {"basics": {"name": "B"}})
+        self.assertEqual(store.get_resume("r1")["resume"]["basics"]["name"], "B")
+        self.assertEqual(store.get_resume("r1")["created_at"], first["created_at"])
+
+        app = store.create_application("r1", COMPANY)
+        other = store.create_application("r2", COMPANY)
+        self.assertEqual(store.get_application(app["id"])["company_name"], "Aurora Labs")
+        self.assertEqual([a["id"] for a in store.list_applications("r1")], [app["id"]])
+        self.assertEqual(len(store.list_applications()), 2)
+
+        chat = store.get_or_create_chat(app)
+        self.assertEqual(store.get_or_create_chat(app)["id"], chat["id"])
+        store.append_chat_message(app["id"], "user", "你好")
+        store.append_chat_message(app["id"], "assistant", "您好")
+        messages = store.list_chat_messages(app["id"])
+        self.assertEqual([m["role"] for m in messages], ["user", "assistant"])
+        self.assertEqual(store.list_chat_messages(other["id"]), [])
+        self.assertEqual([m["content"] for m in store.list_chat_messages(app["id"], limit=1)], ["您好"])
+
+        with self.assertRaises(ValueError):
+            store.append_chat_message("missing", "user", "hi")
+
+    def _exercise_pagination(self, store):
+        from app.services.recruit_store import encode_cursor
+        backend = store.backend
+        for i in range(7):
+            backend.insert_application({
+                "id": f"a{i}", "resume_id": "r1" if i % 2 == 0 else "r2", "company_id": "c",
+                "company_name": "C", "contact_type": "hr", "status": "applied",
+                "created_at": 100 + i // 2, "updated_at": 100
+            })
+        expected = [a["id"] for a in store.list_applications("r1")]
+        self.assertEqual(expected, ["a6", "a4", "a2", "a0"])
+
+        pages, cursor = [], None
+        while True:
+            page = store.list_applications("r1", limit=3, before=cursor)
+            pages.extend(a["id"] for a in page)
+            if len(page) < 3:
+                break
+            cursor = encode_cursor(page[-1])
+        self.assertEqual(pages, expected)
+        self.assertEqual([a["id"] for a in store.list_applications(limit=2)], ["a6", "a5"])
+        with self.assertRaises(ValueError):
+            store.list_applications("r1", limit=1, before="bogus")
+
+    def test_pagination(self):
+        for kind in ("json", "sqlite"):
+            with self.subTest(kind=kind):
+                store = RecruitStore(create_backend(kind, os.path.join(self.data_dir, kind)))
+                self.stores.append(store)
+                self._exercise_pagination(store)
+
+    def test_json_backend(self):
+        self._exercise(self._store("json"))
+
+    def test_sqlite_backend(self):
+        self._exercise(self._store("sqlite"))
+
+    def test_sqlite_migrates_legacy_json_once(self):
+        legacy = {
+            "resumes": {"r1": {"id": "r1", "resume": {"summary": "x"}, "created_at": 1, "updated_at": 2}},
+            "applications": {"a1": {
+                "id": "a1", "resume_id": "r1", "company_id": "c", "company_name": "C",
+                "contact_type": "hr", "status": "applied", "created_at": 3, "updated_at": 3
+            }},
+            "chats": {"a1": {
+                "id": "c1", "application_id": "a1", "company_id": "c", "company_name": "C",
+                "contact_type": "hr", "created_at": 4,
+                "messages": [{"role": "user", "content": "hi", "ts": 5}]
+            }}
+        }
+        with open(os.path.join(self.data_dir, "recruit_store.json"), "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        store = self._store("sqlite")
+        self.assertEqual(store.get_resume("r1")["resume"], {"summary": "x"})
+        self.assertEqual(store.list_applications("r1")[0]["id"], "a1")
+        self.assertEqual(store.list_chat_messages("a1"), [{"role": "user", "content": "hi", "ts": 5}])
+
+        # 再次打开不会重复导入
+        store = self._store("sqlite")
+        self.assertEqual(len(store.list_chat_messages("a1")), 1)
+
+    def test_sqlite_migrates_journal_backed_json(self):
+        # 当前版本的 json 后端把消息写在消息日志里，JSON 文件中不再内嵌 messages
+        store = self._store("json")
+        store.upsert_resume("r1", {"summary": "x"})
+        app = store.create_application("r1", COMPANY)
+        store.get_or_create_chat(app)
+        store.append_chat_message(app["id"], "user", "你好")
+        store.append_chat_message(app["id"], "assistant", "您好")
+        store.backend.flush()
+        with open(os.path.join(self.data_dir, "recruit_store.json"), encoding="utf-8") as f:
+            self.assertNotIn("messages", json.load(f)["chats"][app["id"]])
+
+        store = self._store("sqlite")
+        self.assertEqual(
+            [(m["role"], m["content"]) for m in store.list_chat_messages(app["id"])],
+            [("user", "你好"), ("assistant", "您好")]
+        )
+
+    def test_json_backend_moves_embedded_messages_to_journal(self):
+        legacy = {
+            "resumes": {},
+            "applications": {"a1": {"id": "a1", "resume_id": "r1", "company_id": "c", "created_at": 1}},
+            "chats": {"a1": {"id": "c1", "application_id": "a1", "created_at": 1,
+                             "messages": [{"role": "user", "content": "hi", "ts": 2}]}}
+        }
+        path = os.path.join(self.data_dir, "recruit_store.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f)
+
+        store = self._store("json")
+        self.assertEqual(store.list_chat_messages("a1"), [{"role": "user", "content": "hi", "ts": 2}])
+        with open(path, encoding="utf-8") as f:
+            self.assertNotIn("messages", json.load(f)["chats"]["a1"])
+
+        store = self._store("json")
+        self.assertEqual(len(store.list_chat_messages("a1")), 1)
+
+    def test_json_backend_serves_reads_from_memory_and_writes_behind(self):
+        from unittest.mock import patch
+        from app.services.recruit_backends import JsonRecruitBackend
+
+        path = os.path.join(self.data_dir, "recruit_store.json")
+        backend = JsonRecruitBackend(path, journal=ChatJournal(os.path.join(self.data_dir, "j")),
+                                     durability="relaxed", flush_interval=60, stat_interval=60)
+        store = RecruitStore(backend)
+        store.upsert_resume("r1", {"summary": "x"})
+        app = store.create_application("r1", COMPANY)
+        self.assertFalse(os.path.exists(path))
+
+        with patch.object(backend, "_read_file", side_effect=AssertionError("disk read")):
+            self.assertEqual(store.get_application(app["id"])["resume_id"], "r1")
+            self.assertEqual(len(store.list_applications("r1")), 1)
+
+        backend.flush()
+        with open(path, encoding="utf-8") as f:
+            self.assertIn(app["id"], json.load(f)["applications"])
+
+        strict = JsonRecruitBackend(os.path.join(self.data_dir, "strict.json"),
+                                    journal=ChatJournal(os.path.join(self.data_dir, "j2")), durability="strict")
+        strict.upsert_resume("r2", {})
+        with open(strict.path, encoding="utf-8") as f:
+            self.assertIn("r2", json.load(f)["resumes"])
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        import threading
+        from app.services.recruit_backends import JsonRecruitBackend
+
+        # 两个后端实例共享同一文件与消息日志目录，模拟两个进程
+        path = os.path.join(self.data_dir, "recruit_store.json")
+        journal_dir = os.path.join(self.data_dir, "j")
+        a = JsonRecruitBackend(path, journal=ChatJournal(journal_dir, refresh_interval=0), stat_interval=0)
+        b = JsonRecruitBackend(path, journal=ChatJournal(journal_dir, refresh_interval=0), stat_interval=0)
+        a.upsert_resume("r1", {})
+        a.flush()
+        b.upsert_resume("r2", {})
+        a.upsert_resume("r3", {})
+        b.flush()
+        a.flush()
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(set(json.load(f)["resumes"]), {"r1", "r2", "r3"})
+
+        app = RecruitStore(a).create_application("r1", COMPANY)
+        a.flush()
+        store_a, store_b = RecruitStore(a), RecruitStore(b)
+
+        def send(store, tag):
+            for i in range(20):
+                store.append_chat_messages(app["id"], [
+                    {"role": "user", "content": f"{tag}{i}"},
+                    {"role": "assistant", "content": f"{tag}{i}"}
+                ])
+
+        threads = [threading.Thread(target=send, args=(s, t)) for s, t in ((store_a, "a"), (store_b, "b"), (store_a, "c"))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        messages = store_b.list_chat_messages(app["id"])
+        self.assertEqual(len(messages), 120)
+        # 一问一答成组写入，不会与其他写入交错
+        for user, assistant in zip(messages[::2], messages[1::2]):
+            self.assertEqual((user["role"], assistant["role"]), ("user", "assistant"))
+            self.assertEqual(user["content"], assistant["content"])
+        a.flush()
+        b.flush()
+
+
+class TestChatJournal(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_rotation_compaction_and_recovery(self):
+        journal = ChatJournal(self.dir, segment_max_bytes=200, fsync_batch=4, compact_segments=3)
+        for i in range(40):
+            journal.append(f"app{i % 3}", "user", f"消息{i}", i)
+        self.assertEqual([m["ts"] for m in journal.read("app1", limit=2)], [34, 37])
+        self.assertEqual([m["ts"] for m in journal.read("app0")], list(range(0, 40, 3)))
+        segments = [n for n in os.listdir(self.dir) if n.startswith("segment-")]
+        self.assertLess(len(segments), 10)
+        journal.close()
+
+        # 模拟最后一行写入不完整
+        last = sorted(segments)[-1]
+        with open(os.path.join(self.dir, last), "ab") as f:
+            f.write(b'{"application_id": "app0", "ro')
+
+        reopened = ChatJournal(self.dir, segment_max_bytes=200, compact_segments=3)
+        self.assertEqual([m["ts"] for m in reopened.read("app0")], list(range(0, 40, 3)))
+        reopened.append("app0", "assistant", "ok", 99)
+        self.assertEqual(reopened.read("app0", limit=1)[0]["content"], "ok")
+        reopened.close()
+
+    def test_history_cache_decodes_only_new_records(self):
+        from unittest.mock import patch
+
+        a = ChatJournal(self.dir, refresh_interval=0)
+        b = ChatJournal(self.dir, refresh_interval=0)
+        a.append_many("app", [{"role": "user", "content": "q1"}, {"role": "assistant", "content": "a1"}], 1)
+        self.assertEqual(len(b.read("app")), 2)
+
+        a.append("app", "user", "q2", 2)
+        with patch.object(b, "_read_entries", wraps=b._read_entries) as read_entries:
+            self.assertEqual([m["content"] for m in b.read("app")], ["q1", "a1", "q2"])
+            self.assertEqual(len(read_entries.call_args[0][1]), 1)
+            # 本实例的追加直接更新缓存，不再读取段文件
+            b.append("app", "assistant", "a2", 3)
+            self.assertEqual([m["content"] for m in b.read("app", limit=2)], ["q2", "a2"])
+            self.assertEqual(read_entries.call_count, 1)
+        # 返回的是副本，修改不影响缓存
+        b.read("app")[0]["content"] = "x"
+        self.assertEqual(b.read("app")[0]["content"], "q1")
+        a.close()
+        b.close()
+
+
+class TestSqliteHistoryCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_history_cache_sees_appends_from_other_connections(self):
+        from app.services.recruit_backends import SqliteRecruitBackend
+
+        path = os.path.join(self.dir, "recruit_store.db")
+        a = RecruitStore(SqliteRecruitBackend(path))
+        b = RecruitStore(SqliteRecruitBackend(path))
+        app = a.create_application("r1", COMPANY)
+        a.append_chat_messages(app["id"], [{"role": "user", "content": "q1"}, {"role": "assistant", "content": "a1"}])
+        self.assertEqual([m["content"] for m in b.list_chat_messages(app["id"])], ["q1", "a1"])
+
+        a.append_chat_message(app["id"], "user", "q2")
+        self.assertEqual([m["content"] for m in b.list_chat_messages(app["id"])], ["q1", "a1", "q2"])
+        self.assertEqual([m["content"] for m in b.list_chat_messages(app["id"], limit=1)], ["q2"])
+        self.assertEqual(len(b.backend._history[app["id"]][1]), 3)
+        self.assertEqual(b.list_chat_messages(app["id"], limit=0), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
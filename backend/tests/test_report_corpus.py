@@ -0,0 +1,89 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_aggregator import FortuneAggregator
+from app.services.paragraph_classifier import DIMENSION_KEYWORDS
+from app.services.report_corpus import ReportCorpus
+
+
+REPORTS = [
+    {"name": "甲", "paragraphs": ["2026年 事业上升，贵人相助，宜把握机会", "闲谈", "财运平稳，2027年 投资需谨慎，切勿冒进，守住本金方能细水长流"]},
+    {"name": "乙", "paragraphs": []},
+    {"name": "丙", "paragraphs": ["2027年 身体需调养，注意作息规律与饮食", "婚姻和睦，家庭美满，感情稳定长久"]},
+]
+
+
+def naive_relevant(reports, dimension, year):
+    return [
+        (para, report["name"])
+        for report in reports
+        for para in report["paragraphs"]
+        if len(para) >= 15 and (year[:4] in para or any(k in para for k in DIMENSION_KEYWORDS[dimension]))
+    ]
+
+
+class TestReportCorpus(unittest.TestCase):
+    def test_index_matches_linear_scan(self):
+        corpus = ReportCorpus.from_reports(REPORTS)
+        aggregator = FortuneAggregator(llm_client=MagicMock())
+        self.assertEqual(corpus.reports, [("甲", 0, 3), ("乙", 3, 3), ("丙", 3, 5)])
+        self.assertEqual(corpus.master_of(3), "丙")
+        for dim in DIMENSION_KEYWORDS:
+            for year in ("2026年", "2027年", "2030年"):
+                self.assertEqual(
+                    aggregator._extract_all_relevant_paragraphs(corpus, dim, year),
+                    naive_relevant(REPORTS, dim, year)
+                )
+        # 也接受旧的预处理报告列表
+        self.assertEqual(
+            aggregator._extract_all_relevant_paragraphs(REPORTS, "health", "2027年"),
+            naive_relevant(REPORTS, "health", "2027年")
+        )
+
+    def test_master_text_and_source_quotes(self):
+        corpus = ReportCorpus.from_reports(REPORTS)
+        self.assertEqual(corpus.master_text("甲"), " ".join(REPORTS[0]["paragraphs"]))
+        self.assertFalse(corpus.has_master("丁"))
+
+        aggregator = FortuneAggregator(llm_client=MagicMock())
+        nodes = [
+            {"id": "n1", "properties": {"name": "事业", "description": "事业上升", "source_master": "甲"}},
+            {"id": "n2", "properties": {"name": "财运", "description": "财运平稳", "source_master": "甲"}},
+        ]
+        aggregator._attach_source_quotes(nodes, corpus)
+        for node in nodes:
+            self.assertEqual(node["properties"]["source_quote"], corpus.master_text("甲"))
+
+    def test_candidate_pool_is_memoized_and_masks_exclusions(self):
+        corpus = ReportCorpus.from_reports(REPORTS)
+        pool = corpus.candidate_pool("health", "2027年")
+        self.assertIs(corpus.candidate_pool("health", "2027"), pool)
+        self.assertEqual(pool.entries, naive_relevant(REPORTS, "health", "2027年"))
+        self.assertEqual(list(pool.available()), ["甲", "丙"])
+        self.assertEqual(list(pool.available(exclude_masters=["甲"])), ["丙"])
+        used = "前文：" + REPORTS[2]["paragraphs"][0]
+        self.assertEqual(pool.available(exclude_texts=[used]), {"甲": pool.by_master["甲"]})
+
+        # 新增报告后候选池重建
+        corpus.add("丁", ["2027年 平安顺遂，注意劳逸结合即可"])
+        self.assertIsNot(corpus.candidate_pool("health", "2027年"), pool)
+        self.assertIn("丁", corpus.candidate_pool("health", "2027年").by_master)
+
+    def test_multiple_descriptions_use_distinct_masters(self):
+        corpus = ReportCorpus.from_reports(REPORTS)
+        aggregator = FortuneAggregator(llm_client=MagicMock())
+        descriptions = aggregator._extract_multiple_descriptions(corpus, "health", "2027年", 2)
+        self.assertEqual(sorted(master for _, master in descriptions), ["丙", "甲"])
+        # 所有大师都已使用时从已排除的大师中兜底
+        text, master = aggregator._extract_rich_description(corpus, "health", "2027年", exclude_masters=["甲", "丙"])
+        self.assertIn(master, ("甲", "丙"))
+        self.assertTrue(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
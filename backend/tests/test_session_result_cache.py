@@ -0,0 +1,118 @@
+import sys
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.fortune_agents import MASTER_PERSONAS
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+from app.utils.llm_scheduler import LLMScheduler
+
+CHART = ("张三", "1990-01-01", "12:00", "北京", "男")
+
+
+class FakeLLM:
+    """大师推演在 gate 打开前阻塞；分年图谱生成失败，走回退节点"""
+
+    def __init__(self, fail: bool = False):
+        self.gate = threading.Event()
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat(self, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return "2026年 事业上升，财运亨通。2027年 感情稳定，家庭和睦。"
+
+    def chat_stream(self, messages, **kwargs):
+        yield self.chat(messages, **kwargs)
+
+    def chat_json(self, messages, **kwargs):
+        raise RuntimeError("no graph")
+
+
+class TestSessionResultCache(unittest.TestCase):
+    def _service(self, llm):
+        return FortuneService(
+            llm_client=llm,
+            agent_cache=TieredCache(),
+            session_store=FortuneSessionManager(ttl=3600),
+            scheduler=LLMScheduler(16),
+            result_cache=TieredCache()
+        )
+
+    def _wait(self, service, session_id):
+        for _ in range(200):
+            status = service.get_session_status(session_id)
+            if status["status"] in ("completed", "failed"):
+                return status
+            time.sleep(0.05)
+        self.fail("推演未在预期时间内结束")
+
+    def test_concurrent_requests_share_one_session_and_later_ones_hit_cache(self):
+        llm = FakeLLM()
+        service = self._service(llm)
+        first = service.analyze_fate(*CHART)
+        second = service.analyze_fate(*CHART)
+        self.assertEqual(second["session_id"], first["session_id"])
+        # 指定 session_id 的请求不合并
+        other = service.analyze_fate(*CHART, session_id="explicit")
+        self.assertEqual(other["session_id"], "explicit")
+
+        llm.gate.set()
+        self.assertEqual(self._wait(service, first["session_id"])["status"], "completed")
+        self._wait(service, other["session_id"])
+        calls = llm.calls
+        # 合并的请求不重复推演（指定 session_id 的会话可能命中大师报告缓存）
+        self.assertLess(calls, len(MASTER_PERSONAS) * 3)
+
+        third = service.analyze_fate(*CHART)
+        self.assertEqual(third["status"], "completed")
+        self.assertNotEqual(third["session_id"], first["session_id"])
+        # 两个会话输入相同，缓存的是后完成的那一个
+        self.assertIn(
+            service.get_session_summary(third["session_id"])["summary"],
+            [service.get_session_summary(sid)["summary"] for sid in (first["session_id"], "explicit")]
+        )
+        self.assertEqual(len(service.get_full_report(third["session_id"])["reports"]), len(MASTER_PERSONAS))
+        self.assertEqual(llm.calls, calls)
+        self.assertEqual(service.get_cache_stats()["data"]["results"]["inflight"], 0)
+
+    def test_sessions_with_failed_masters_are_not_cached(self):
+        llm = FakeLLM(fail=True)
+        llm.gate.set()
+        service = self._service(llm)
+        first = service.analyze_fate(*CHART)
+        self._wait(service, first["session_id"])
+
+        second = service.analyze_fate(*CHART)
+        self.assertEqual(second["status"], "processing")
+        self.assertNotEqual(second["session_id"], first["session_id"])
+        self._wait(service, second["session_id"])
+
+    def test_failed_start_releases_inflight_key(self):
+        llm = FakeLLM()
+        llm.gate.set()
+        service = self._service(llm)
+        with patch.object(service.sessions, "create", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                service.analyze_fate(*CHART)
+        self.assertEqual(service.get_cache_stats()["data"]["results"]["inflight"], 0)
+
+        # 之后相同输入的请求正常启动新会话
+        retry = service.analyze_fate(*CHART)
+        self.assertEqual(self._wait(service, retry["session_id"])["status"], "completed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# Add backend to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import Config
+from app.services.fortune_agents import MASTER_PERSONAS
+from app.services.fortune_service import FortuneService
+from app.services.fortune_sessions import FortuneSessionManager
+from app.utils.cache import TieredCache
+from app.utils.hedging import HedgeCancelled
+from app.utils.llm_client import LLMClient
+from app.utils.llm_scheduler import LLMScheduler
+from app.utils.single_flight import SingleFlight
+
+
+def _run_threads(n, target):
+    results = [None] * n
+
+    def run(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return "结果"
+
+        results = _run_threads(5, lambda: flight.do("k", work))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], ["结果"] * 5)
+        self.assertEqual(sum(1 for r in results if r[1]), 4)
+        self.assertEqual(flight.stats()["inflight"], 0)
+        # 执行结束后不再合并
+        self.assertEqual(flight.do("k", work), ("结果", False))
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_are_shared_unless_retryable(self):
+        flight = SingleFlight()
+        attempts = []
+
+        def fail(exc):
+            attempts.append(exc)
+            time.sleep(0.1)
+            if len(attempts) == 1:
+                raise exc
+            return "重试成功"
+
+        def call(exc, retry_on=()):
+            try:
+                return flight.do("k", fail, exc, retry_on=retry_on)[0]
+            except Exception as e:
+                return type(e).__name__
+
+        self.assertEqual(_run_threads(3, lambda: call(ValueError("bad"))), ["ValueError"] * 3)
+
+        attempts.clear()
+        results = _run_threads(3, lambda: call(HedgeCancelled(), retry_on=(HedgeCancelled,)))
+        # 执行者被取消后，等待者重新竞争，其中一个重新执行，其余共享其结果
+        self.assertEqual(sorted(results), ["HedgeCancelled", "重试成功", "重试成功"])
+        self.assertEqual(len(attempts), 2)
+
+    def test_async_calls_share_and_survive_leader_cancellation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        async def main():
+            shared = await asyncio.gather(*(flight.do_async("k", work) for _ in range(4)))
+            leader = asyncio.ensure_future(flight.do_async("c", work))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do_async("c", work))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return shared, await follower
+
+        shared, follower = asyncio.run(main())
+        self.assertEqual([r[0] for r in shared], [1] * 4)
+        self.assertEqual(follower, (3, False))
+
+
+class TestLLMClientSingleFlight(unittest.TestCase):
+    def test_only_deterministic_or_opted_in_requests_are_coalesced(self):
+        client = LLMClient(api_key="test", base_url="http://llm.invalid/v1", model="m", single_flight=SingleFlight())
+        client.client = MagicMock()
+
+        def create(**kwargs):
+            time.sleep(0.1)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="好"))], usage=None)
+
+        client.client.chat.completions.create.side_effect = create
+        create_calls = client.client.chat.completions.create
+        messages = [{"role": "user", "content": "hi"}]
+        self.assertEqual(_run_threads(4, lambda: client.chat(messages, temperature=0)), ["好"] * 4)
+        self.assertEqual(create_calls.call_count, 1)
+
+        # 参数不同的请求不合并
+        _run_threads(2, lambda: client.chat(messages, temperature=0.1, coalesce=True))
+        client.chat(messages, temperature=0.2, coalesce=True)
+        self.assertEqual(create_calls.call_count, 3)
+
+        # 采样请求默认各自发送
+        _run_threads(3, lambda: client.chat(messages))
+        self.assertEqual(create_calls.call_count, 6)
+
+
+class TestAgentSingleFlight(unittest.TestCase):
+    def _service(self, llm, scheduler=None):
+        store = FortuneSessionManager(ttl=3600)
+        for sid in ("s1", "s2"):
+            store.create(sid, {"status": "processing", "progress": 0, "reports": {}, "summary": None})
+        return FortuneService(
+            llm_client=llm, agent_cache=TieredCache(), session_store=store, scheduler=scheduler or LLMScheduler(4)
+        )
+
+    def test_followers_wait_outside_scheduler_and_receive_partials(self):
+        gate = threading.Event()
+        llm = MagicMock()
+
+        def stream(messages, **kwargs):
+            yield "2026年 事业上升。"
+            gate.wait(5)
+            yield "2027年 财运亨通。"
+
+        llm.chat_stream.side_effect = stream
+        scheduler = LLMScheduler(2)
+        service = self._service(llm, scheduler)
+        persona = MASTER_PERSONAS[0]
+        data = {"name": "张三", "future_years": 3}
+
+        with patch.object(Config, "FORTUNE_STREAM_FLUSH_INTERVAL", 0):
+            leader = service._submit_agent("s1", persona, data, 3)
+            follower = service._submit_agent("s2", persona, data, 3)
+            # 等待方没有提交任务：另一个执行槽仍可立即执行其他会话的调用
+            self.assertEqual(scheduler.submit("other", lambda: "空闲").result(2), "空闲")
+            for _ in range(100):
+                if service.sessions.get("s2").get("partial_reports"):
+                    break
+                time.sleep(0.02)
+            self.assertEqual(
+                service.sessions.get("s2")["partial_reports"][persona["id"]]["content"], "2026年 事业上升。"
+            )
+            gate.set()
+            results = [leader.result(5), follower.result(5)]
+
+        self.assertEqual(llm.chat_stream.call_count, 1)
+        self.assertEqual([r[2] for r in results], ["2026年 事业上升。2027年 财运亨通。"] * 2)
+        stats = service.get_scheduler_stats()["data"]["single_flight"]
+        self.assertEqual((stats["executed"], stats["shared"], stats["inflight"]), (1, 1, 0))
+        self.assertEqual(service._flight_sessions, {})
+
+    def test_followers_check_cache_before_retrying_a_failed_leader(self):
+        llm = MagicMock()
+        llm.chat_stream.side_effect = lambda messages, **kwargs: iter(["重新推演"])
+        service = self._service(llm)
+        persona = MASTER_PERSONAS[0]
+        data = {"name": "张三", "future_years": 3}
+        cache_key = service._get_cache_key(persona["id"], data)
+
+        # 执行者被对冲取消，胜出的报告已在缓存中：等待方直接使用缓存
+        flight, leader = service.agent_flights.begin(cache_key)
+        self.assertTrue(leader)
+        follower = service._submit_agent("s2", persona, data, 3)
+        service.agent_cache.set(cache_key, "对冲胜出的报告")
+        service.agent_flights.end(cache_key, flight, error=HedgeCancelled())
+        self.assertEqual(follower.result(5)[2], "对冲胜出的报告")
+        llm.chat_stream.assert_not_called()
+
+        # 缓存未命中时等待方自行推演
+        service.agent_cache = TieredCache()
+        flight, _ = service.agent_flights.begin(cache_key)
+        follower = service._submit_agent("s2", persona, data, 3)
+        service.agent_flights.end(cache_key, flight, error=RuntimeError("upstream error"))
+        self.assertEqual(follower.result(5)[2], "重新推演")
+        self.assertEqual(llm.chat_stream.call_count, 1)
+        self.assertEqual(service.agent_flights.stats()["retried"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,5 +6,15 @@ const api = axios.create({
 
 export const analyzeFate = (data) => api.post('/analyze', data).then(res => res.data)
 export const getStatus = (sessionId) => api.get(`/status/${sessionId}`).then(res => res.data)
+export const getSummary = (sessionId) => api.get(`/summary/${sessionId}`).then(res => res.data)
 export const getReport = (sessionId) => api.get(`/report/${sessionId}`).then(res => res.data)
+
+// 条件请求：带上次响应的 ETag，会话版本未变时服务端返回 304，此时结果为 null
+const getIfChanged = (url, etag) => api.get(url, {
+  headers: etag ? { 'If-None-Match': etag } : {},
+  validateStatus: (code) => (code >= 200 && code < 300) || code === 304
+}).then(res => (res.status === 304 ? null : { data: res.data, etag: res.headers.etag || null }))
+
+export const getStatusIfChanged = (sessionId, etag) => getIfChanged(`/status/${sessionId}`, etag)
+export const getReportIfChanged = (sessionId, etag) => getIfChanged(`/report/${sessionId}`, etag)
 export const listMasters = () => api.get('/masters').then(res => res.data)
@@ -28,11 +28,15 @@ export const applyToCompany = ({ resume_id, company_id }) => {
   })
 }
 
-export const listApplications = ({ resume_id } = {}) => {
+export const listApplications = ({ resume_id, limit, before } = {}) => {
+  const params = {}
+  if (resume_id) params.resume_id = resume_id
+  if (limit) params.limit = limit
+  if (before) params.before = before
   return service({
     url: '/api/recruit/applications',
     method: 'get',
-    params: resume_id ? { resume_id } : undefined
+    params: Object.keys(params).length ? params : undefined
   })
 }
 
@@ -51,3 +55,37 @@ export const sendChatMessage = ({ application_id, message }) => {
     data: { application_id, message }
   })
 }
+
+// 流式发送：服务端以 SSE 推送 meta / delta / done / error 事件，onEvent(event, data) 逐个回调
+export const streamChatMessage = async ({ application_id, message }, onEvent) => {
+  const res = await fetch(`${import.meta.env.VITE_API_BASE_URL || ''}/api/recruit/chat/send/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ application_id, message })
+  })
+  if (!res.ok || !res.body) {
+    const data = await res.json().catch(() => ({}))
+    throw new Error(data.error || `请求失败 (${res.status})`)
+  }
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let event = 'message'
+      const dataLines = []
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart())
+      }
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')))
+    }
+  }
+}